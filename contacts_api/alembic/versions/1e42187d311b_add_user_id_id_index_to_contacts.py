@@ -0,0 +1,26 @@
+"""Add (user_id, id) index to contacts
+
+Revision ID: 1e42187d311b
+Revises: ff3929e02793
+Create Date: 2026-10-18 10:04:17.280611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e42187d311b'
+down_revision: Union[str, None] = 'ff3929e02793'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
@@ -0,0 +1,47 @@
+"""Add contact counters
+
+Revision ID: 3b8e5d0c7a21
+Revises: 6c1f2a9d4b7e
+Create Date: 2026-10-18 17:40:52.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e5d0c7a21'
+down_revision: Union[str, None] = '6c1f2a9d4b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'contact_counters',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('name', sa.String(length=255), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+    )
+
+    # Count the existing contacts like app.repository.contacts.counter_names: total, month:<1-12>
+    # and domain:<part after the last @, lowercased>. The reconcile job (python -m app.core.counters)
+    # repairs any counter a write races with while this runs.
+    if op.get_bind().dialect.name == 'sqlite':
+        month = "'month:' || CAST(strftime('%m', birthday) AS INTEGER)"
+        domain = "'domain:' || lower(substr(email, length(rtrim(email, replace(email, '@', ''))) + 1))"
+    else:
+        month = "'month:' || EXTRACT(MONTH FROM birthday)::int"
+        domain = "'domain:' || lower(substring(email from '@([^@]*)$'))"
+    for name, condition in (("'total'", "TRUE"), (month, "birthday IS NOT NULL"), (domain, "email LIKE '%@%'")):
+        op.execute(
+            f"INSERT INTO contact_counters (user_id, name, count) "
+            f"SELECT user_id, {name}, COUNT(*) FROM contacts "
+            f"WHERE user_id IS NOT NULL AND {condition} GROUP BY user_id, {name}"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('contact_counters')
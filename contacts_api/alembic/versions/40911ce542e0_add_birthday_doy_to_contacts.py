@@ -0,0 +1,42 @@
+"""Add birthday_doy to contacts
+
+Revision ID: 40911ce542e0
+Revises: 1e42187d311b
+Create Date: 2026-10-18 11:21:53.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '40911ce542e0'
+down_revision: Union[str, None] = '1e42187d311b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_doy', sa.SmallInteger(), nullable=True))
+
+    # Day of year counted in a leap year (2000) so 29 February is always 60
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "UPDATE contacts SET birthday_doy = CAST(strftime('%j', '2000-' || strftime('%m-%d', birthday)) AS INTEGER) "
+            "WHERE birthday IS NOT NULL"
+        )
+    else:
+        op.execute(
+            "UPDATE contacts SET birthday_doy = EXTRACT(DOY FROM make_date(2000, "
+            "EXTRACT(MONTH FROM birthday)::int, EXTRACT(DAY FROM birthday)::int)) "
+            "WHERE birthday IS NOT NULL"
+        )
+
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.drop_column('contacts', 'birthday_doy')
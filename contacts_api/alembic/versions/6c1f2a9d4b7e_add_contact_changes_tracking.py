@@ -0,0 +1,51 @@
+"""Add contact changes tracking
+
+Revision ID: 6c1f2a9d4b7e
+Revises: 40911ce542e0
+Create Date: 2026-10-18 15:02:17.331840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1f2a9d4b7e'
+down_revision: Union[str, None] = '40911ce542e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing contacts count as changed now, so every client picks them up on its first sync.
+    # The time is naive UTC like the ORM's utcnow(), whatever the session time zone.
+    if op.get_bind().dialect.name == 'sqlite':
+        # In the ORM's storage format, '%Y-%m-%d %H:%M:%S.%f', since SQLite compares them as strings
+        op.execute("UPDATE contacts SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'")
+        with op.batch_alter_table('contacts') as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+    else:
+        op.execute("UPDATE contacts SET updated_at = timezone('utc', now())")
+        op.alter_column('contacts', 'updated_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_contacts_user_id_updated_at', 'contacts', ['user_id', 'updated_at', 'id'])
+
+    op.create_table(
+        'contact_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('contact_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_contact_tombstones_user_id_deleted_at', 'contact_tombstones',
+                    ['user_id', 'deleted_at', 'contact_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_tombstones_user_id_deleted_at', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_user_id_updated_at', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
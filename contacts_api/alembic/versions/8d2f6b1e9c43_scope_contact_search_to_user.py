@@ -0,0 +1,62 @@
+"""Scope contact search to user
+
+Revision ID: 8d2f6b1e9c43
+Revises: 3b8e5d0c7a21
+Create Date: 2026-10-18 21:16:05.227391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f6b1e9c43'
+down_revision: Union[str, None] = '3b8e5d0c7a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def create_fts(columns: Sequence[str], definitions: Sequence[str]) -> None:
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    op.execute(
+        f"CREATE VIRTUAL TABLE contacts_fts USING fts5({', '.join(definitions)}, "
+        "content='contacts', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+        f"INSERT INTO contacts_fts(rowid, {names}) VALUES (new.id, {new}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+        f"INSERT INTO contacts_fts(contacts_fts, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+        f"INSERT INTO contacts_fts(contacts_fts, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO contacts_fts(rowid, {names}) VALUES (new.id, {new}); END"
+    )
+    op.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+
+
+def drop_fts() -> None:
+    for trigger in ('contacts_fts_ai', 'contacts_fts_ad', 'contacts_fts_au'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS contacts_fts")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        # Matches are filtered on the owner inside the FTS5 table rather than after joining every tenant's rows
+        drop_fts()
+        create_fts(('first_name', 'last_name', 'email', 'user_id'),
+                   ('first_name', 'last_name', 'email', 'user_id UNINDEXED'))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        drop_fts()
+        create_fts(('first_name', 'last_name', 'email'), ('first_name', 'last_name', 'email'))
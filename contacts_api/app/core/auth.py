@@ -1,22 +1,46 @@
-from typing import Optional, Union
-from jose import JWTError, jwt
-import bcrypt
+from typing import Optional, Tuple, Union
+from jose import JWTError
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
+from app.db.models import User
 from app.core.config import settings
+from app.core.cache import principal_cache
+from app.core.tokens import token_codec
+from app.core.password_pool import PasswordWorkerPool
 from app.repository import users as repository_users
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+def credentials_exception() -> HTTPException:
+    """
+    Build the 401 error raised for a missing, invalid or unknown bearer token.
+
+    :return: The exception to raise.
+    :rtype: HTTPException
+    """
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 class Auth:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.pwd_context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto",
+            bcrypt__rounds=settings.BCRYPT_ROUNDS, bcrypt__ident="2b",
+        )
+        self.password_pool = PasswordWorkerPool(workers=settings.PASSWORD_WORKERS, queue_size=settings.PASSWORD_QUEUE_SIZE)
         self.SECRET_KEY = settings.SECRET_KEY
         self.ALGORITHM = settings.ALGORITHM
+        self.token_codec = token_codec
 
     def verify_password(self, plain_password, hashed_password):
         """
@@ -29,7 +53,20 @@ class Auth:
         :return: True if the plain password matches the hashed password, False otherwise.
         :rtype: bool
         """
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return self.pwd_context.verify(plain_password, hashed_password)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and rehash it if the stored hash uses outdated settings.
+
+        :param plain_password: The plain password to verify.
+        :type plain_password: str
+        :param hashed_password: The hashed password stored in the database.
+        :type hashed_password: str
+        :return: Whether the password matches, and a new hash to store when the work factor changed.
+        :rtype: Tuple[bool, Optional[str]]
+        """
+        return self.pwd_context.verify_and_update(plain_password, hashed_password)
 
     def get_password_hash(self, password: str) -> str:
         """
@@ -40,7 +77,19 @@ class Auth:
         :return: The hashed password.
         :rtype: str
         """
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return self.pwd_context.hash(password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        """
+        Hash a password on the bounded password worker pool.
+
+        :param password: The plain password to hash.
+        :type password: str
+        :raises HTTPException: 503 when the password pool is saturated.
+        :return: The hashed password.
+        :rtype: str
+        """
+        return await self.password_pool.run(self.get_password_hash, password)
 
     def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         """
@@ -59,7 +108,7 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=150)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
-        encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_access_token = self.token_codec.encode(to_encode)
         return encoded_access_token
 
     def create_refresh_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -79,7 +128,7 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"})
-        encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_refresh_token = self.token_codec.encode(to_encode)
         return encoded_refresh_token
 
     def decode_refresh_token(self, refresh_token: str):
@@ -93,7 +142,7 @@ class Auth:
         :rtype: str
         """
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.token_codec.decode(refresh_token, cache=False)
             if payload['scope'] == 'refresh_token':
                 email = payload['sub']
                 return email
@@ -101,44 +150,84 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
+    def _access_token_subject(self, token: str) -> str:
+        """
+        Decode an access token and return its subject.
+
+        Verified claims come from the token cache, so a token is only checked
+        cryptographically on its first request (including the rate limiter's check).
+
+        :param token: The access token.
+        :type token: str
+        :raises HTTPException: If the token is invalid or not an access token.
+        :return: The email address the token was issued for.
+        :rtype: str
+        """
+        try:
+            payload = self.token_codec.decode(token)
+            if payload['scope'] == 'access_token':
+                email = payload["sub"]
+                if email is None:
+                    raise credentials_exception()
+            else:
+                raise credentials_exception()
+        except JWTError:
+            raise credentials_exception()
+        return email
+
     def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
         """
         Get the current user based on the access token.
 
+        The user is looked up in the principal cache first, so repeated requests with
+        the same subject do not hit the users table until the entry expires or is invalidated.
+
         :param token: The access token obtained from the Authorization header.
         :type token: str
         :param db: The database session.
         :type db: Session
         :raises HTTPException: If the token is invalid or the user does not exist.
         :return: The current user.
-        :rtype: User
+        :rtype: Principal
         """
-        credentials_exception = HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError:
-            raise credentials_exception
+        email = self._access_token_subject(token)
+        principal = principal_cache.get(email)
+        if principal is not None:
+            return principal
 
         user = repository_users.get_user_by_email(email, db)
         if user is None:
-            raise credentials_exception
-        return user
+            raise credentials_exception()
+        return principal_cache.set(email, user)
+
+    async def get_current_user_async(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+        """
+        Async counterpart of :meth:`get_current_user` for routes on the async database stack.
+
+        :param token: The access token obtained from the Authorization header.
+        :type token: str
+        :param db: The async database session.
+        :type db: AsyncSession
+        :raises HTTPException: If the token is invalid or the user does not exist.
+        :return: The current user.
+        :rtype: Principal
+        """
+        email = self._access_token_subject(token)
+        principal = await principal_cache.get_async(email)
+        if principal is not None:
+            return principal
+
+        user = await db.scalar(select(User).where(User.email == email))
+        if user is None:
+            raise credentials_exception()
+        return await principal_cache.set_async(email, user)
 
     def authenticate_user(self, db: Session, username: str, password: str):
         """
         Authenticate a user based on username and password.
 
+        A hash made with an outdated work factor is replaced on successful login.
+
         :param db: The database session.
         :type db: Session
         :param username: The username (email) of the user.
@@ -151,8 +240,38 @@ class Auth:
         user = repository_users.get_user_by_email(username, db)
         if not user:
             return False
-        if not self.verify_password(password, user.password):
+        valid, new_hash = self.verify_and_update(password, user.password)
+        if not valid:
+            return False
+        if new_hash:
+            repository_users.update_password(user, new_hash, db)
+        return user
+
+    async def authenticate_user_async(self, db: Session, username: str, password: str):
+        """
+        Authenticate a user without tying up the request threadpool during bcrypt.
+
+        Database access runs in the threadpool, password verification on the bounded
+        password worker pool.
+
+        :param db: The database session.
+        :type db: Session
+        :param username: The username (email) of the user.
+        :type username: str
+        :param password: The user's password.
+        :type password: str
+        :raises HTTPException: 503 when the password pool is saturated.
+        :return: The authenticated user if successful, False otherwise.
+        :rtype: Union[User, bool]
+        """
+        user = await run_in_threadpool(repository_users.get_user_by_email, username, db)
+        if not user:
+            return False
+        valid, new_hash = await self.password_pool.run(self.verify_and_update, password, user.password)
+        if not valid:
             return False
+        if new_hash:
+            await run_in_threadpool(repository_users.update_password, user, new_hash, db)
         return user
 
 auth_service = Auth()
@@ -0,0 +1,221 @@
+import io
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy.orm import Session
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it avatars are uploaded as sent
+    Image = None
+
+from app.core.cloudinary import get_cloudinary
+from app.core.config import settings
+from app.core.jobs import jobs
+from app.db.models import User
+from app.repository import users as repository_users
+from app.schemas import AvatarJob
+
+# Room for the boundaries and part headers around the file in a multipart body
+MULTIPART_OVERHEAD = 16 * 1024
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Identify an image from its first bytes, whatever the client claims it is.
+
+    :param head: At least the first 12 bytes of the file.
+    :type head: bytes
+    :return: The image MIME type, or None if the bytes are not a supported image.
+    :rtype: str, optional
+    """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Avatar must not exceed {settings.AVATAR_MAX_BYTES} bytes")
+
+
+def _unsupported() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                         detail="Avatar must be a JPEG, PNG, GIF or WebP image")
+
+
+async def _limited(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large()
+        yield chunk
+
+
+async def read_avatar(request: Request) -> bytes:
+    """
+    Read an avatar from a request body, rejecting it as soon as a limit is broken.
+
+    The body is either the image itself (``Content-Type: image/*``) or a multipart form
+    with a ``file`` field. It is streamed and the upload aborted with 413 once it
+    exceeds ``AVATAR_MAX_BYTES`` (or straight away from ``Content-Length``). Raw bodies
+    are type-checked from their first bytes, multipart ones once the file is read.
+
+    :param request: The upload request.
+    :type request: Request
+    :raises HTTPException 413: If the avatar is too large.
+    :raises HTTPException 415: If the avatar is not a supported image.
+    :raises HTTPException 400: If the multipart body is malformed or has no file.
+    :return: The image bytes.
+    :rtype: bytes
+    """
+    content_type = request.headers.get('content-type', '')
+    multipart = content_type.startswith('multipart/form-data')
+    limit = settings.AVATAR_MAX_BYTES + (MULTIPART_OVERHEAD if multipart else 0)
+    length = request.headers.get('content-length', '')
+    if length.isdigit() and int(length) > limit:
+        raise _too_large()
+
+    if multipart:
+        try:
+            form = await MultiPartParser(request.headers, _limited(request.stream(), limit),
+                                         max_files=1, max_fields=8).parse()
+        except MultiPartException as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+        file = form.get('file')
+        if not isinstance(file, UploadFile):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing file field")
+        try:
+            data = await file.read(settings.AVATAR_MAX_BYTES + 1)
+        finally:
+            await form.close()
+    else:
+        if content_type and not content_type.startswith(('image/', 'application/octet-stream')):
+            raise _unsupported()
+        buffer = bytearray()
+        async for chunk in _limited(request.stream(), limit):
+            buffer += chunk
+            if len(buffer) >= 12 and len(buffer) - len(chunk) < 12 and sniff_image_type(bytes(buffer[:12])) is None:
+                raise _unsupported()
+        data = bytes(buffer)
+
+    if len(data) > settings.AVATAR_MAX_BYTES:
+        raise _too_large()
+    if sniff_image_type(data[:12]) is None:
+        raise _unsupported()
+    return data
+
+
+def downsize_image(data: bytes) -> Tuple[bytes, str]:
+    """
+    Shrink an avatar to at most ``AVATAR_MAX_SIDE`` pixels per side before upload.
+
+    The image is rotated according to its EXIF orientation, metadata is dropped, and
+    it is saved as PNG when it has transparency and as JPEG otherwise. Without Pillow
+    the image is returned unchanged.
+
+    :param data: The image bytes.
+    :type data: bytes
+    :raises HTTPException 422: If the image cannot be decoded or has too many pixels.
+    :return: The image bytes and their MIME type.
+    :rtype: Tuple[bytes, str]
+    """
+    if Image is None:
+        return data, sniff_image_type(data[:12])
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Avatar has too many pixels")
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((settings.AVATAR_MAX_SIDE, settings.AVATAR_MAX_SIDE))
+            output = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.save(output, format='PNG', optimize=True)
+                return output.getvalue(), 'image/png'
+            image.convert('RGB').save(output, format='JPEG', quality=85, optimize=True)
+            return output.getvalue(), 'image/jpeg'
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Avatar could not be decoded")
+
+
+class CloudinaryUploader:
+    """
+    Stores avatars on Cloudinary, one image per user overwritten on every upload.
+    """
+
+    def upload(self, data: bytes, public_id: str) -> str:
+        """
+        Upload an image.
+
+        :param data: The image bytes.
+        :type data: bytes
+        :param public_id: Stable name of the image.
+        :type public_id: str
+        :return: The HTTPS URL of the stored image.
+        :rtype: str
+        """
+        result = get_cloudinary().uploader.upload(io.BytesIO(data), public_id=public_id, overwrite=True)
+        return result["secure_url"]
+
+
+_uploader = CloudinaryUploader()
+
+
+def get_avatar_uploader() -> CloudinaryUploader:
+    """
+    Dependency returning the avatar uploader; override it to swap Cloudinary out.
+
+    :return: The uploader.
+    :rtype: CloudinaryUploader
+    """
+    return _uploader
+
+
+def process_avatar_upload(job: AvatarJob, data: bytes, user_id: int, bind, uploader: CloudinaryUploader) -> None:
+    """
+    Upload an avatar and save its URL on the user, recording the outcome on ``job``.
+
+    Runs as a background task after the response has been sent, so it opens its own
+    session on ``bind``.
+
+    :param job: The job reported by the status endpoint.
+    :type job: AvatarJob
+    :param data: The downsized image.
+    :type data: bytes
+    :param user_id: ID of the user.
+    :type user_id: int
+    :param bind: Engine to save the URL with.
+    :type bind: Engine
+    :param uploader: Where the image is stored.
+    :type uploader: CloudinaryUploader
+    """
+    job.status = "running"
+    jobs.save(user_id, job)
+    try:
+        url = uploader.upload(data, public_id=f"ContactsAPI/avatars/{user_id}")
+        with Session(bind=bind) as db:
+            user = db.get(User, user_id)
+            if user is None:
+                raise LookupError("User no longer exists")
+            repository_users.update_avatar(user, url, db)
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e) or type(e).__name__
+        jobs.save(user_id, job)
+        return
+    job.url = url
+    job.status = "completed"
+    jobs.save(user_id, job)
@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from typing import Iterator, Union
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.repository import contacts as repository_contacts
+from app.schemas import User
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _ndjson(keys: list, rows: list) -> str:
+    return "".join(json.dumps(dict(zip(keys, row)), default=str) + "\n" for row in rows)
+
+
+def _csv(rows: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def export_contacts(bind: Union[Engine, Connection], user: User, fmt: str) -> Iterator[bytes]:
+    """
+    Serialise every contact of a user as NDJSON or CSV, one batch of rows per chunk.
+
+    The generator opens its own session on ``bind`` because it outlives the request's
+    session dependency; rows are streamed ``EXPORT_BATCH_SIZE`` at a time, so memory
+    use does not grow with the number of contacts. The CSV header uses the
+    ``ContactCreate`` field names, so an export can be fed back to the bulk import.
+
+    :param bind: Engine or connection to read from.
+    :type bind: Union[Engine, Connection]
+    :param user: The authenticated user.
+    :type user: User
+    :param fmt: ``"ndjson"`` or ``"csv"``.
+    :type fmt: str
+    :return: The encoded chunks of the export.
+    :rtype: Iterator[bytes]
+    """
+    with Session(bind=bind) as db:
+        result = repository_contacts.stream_contacts(db, user, batch_size=settings.EXPORT_BATCH_SIZE)
+        keys = list(result.keys())
+        if fmt == 'csv':
+            yield _csv([keys]).encode()
+        for rows in result.partitions():
+            yield (_csv(rows) if fmt == 'csv' else _ndjson(keys, rows)).encode()
@@ -0,0 +1,183 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.jobs import jobs
+from app.repository import contacts as repository_contacts
+from app.schemas import BulkImportJob, BulkRowError, ContactCreate, User
+
+FORMATS = ('ndjson', 'csv')
+
+
+class LineTooLong(ValueError):
+    """
+    A line of a streamed body is longer than allowed.
+    """
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Split a streamed UTF-8 body into lines without buffering the whole body.
+
+    :param chunks: The body chunks, e.g. ``request.stream()``.
+    :type chunks: AsyncIterator[bytes]
+    :param max_length: Longest line allowed in characters, so a body without line breaks cannot fill memory.
+    :type max_length: int, optional
+    :raises UnicodeDecodeError: If the body is not valid UTF-8.
+    :raises LineTooLong: If a line is longer than ``max_length``.
+    :return: The lines, without line terminators.
+    :rtype: AsyncIterator[str]
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            if max_length is not None and len(line) > max_length:
+                raise LineTooLong(f"Lines must not be longer than {max_length} characters")
+            yield line.rstrip('\r')
+        if max_length is not None and len(buffer) > max_length:
+            raise LineTooLong(f"Lines must not be longer than {max_length} characters")
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer.rstrip('\r')
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Union[dict, str]]]:
+    """
+    Parse a streamed NDJSON or CSV body into raw records.
+
+    NDJSON has one JSON object per line. CSV starts with a header row naming the
+    ``ContactCreate`` fields; empty cells are read as missing values and quoted cells
+    may span lines.
+
+    :param chunks: The body chunks.
+    :type chunks: AsyncIterator[bytes]
+    :param fmt: ``"ndjson"`` or ``"csv"``.
+    :type fmt: str
+    :raises LineTooLong: If a line, or a CSV record, is longer than ``BULK_MAX_LINE_LENGTH``.
+    :return: Pairs of the line number where a record starts and either the record or a parse error.
+    :rtype: AsyncIterator[Tuple[int, Union[dict, str]]]
+    """
+    max_length = settings.BULK_MAX_LINE_LENGTH
+    line_no = 0
+    header = None
+    record, start = None, 0
+
+    async for line in iter_lines(chunks, max_length):
+        line_no += 1
+        if fmt == 'ndjson':
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                yield line_no, "Invalid JSON"
+                continue
+            yield line_no, value if isinstance(value, dict) else "Expected a JSON object"
+            continue
+
+        if record is None:
+            record, start = line, line_no
+        else:
+            record += '\n' + line
+            if len(record) > max_length:
+                raise LineTooLong(f"Records must not be longer than {max_length} characters")
+        # An odd number of quotes means a quoted cell continues on the next line
+        if record.count('"') % 2:
+            continue
+        text, record = record, None
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield start, {name: value for name, value in zip(header, values) if value != ''}
+
+    if record is not None:
+        yield start, "Unterminated quoted field"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+
+
+async def import_contacts(chunks: AsyncIterator[bytes], fmt: str, db: Session, user: User,
+                          job: BulkImportJob) -> BulkImportJob:
+    """
+    Stream contacts from an NDJSON or CSV body into the database.
+
+    Records are validated with ``ContactCreate`` and inserted ``BULK_CHUNK_SIZE`` at a
+    time, each chunk in its own transaction, so memory stays flat whatever the size of
+    the body. ``job`` is saved to the job registry after every chunk and can be polled
+    meanwhile.
+
+    :param chunks: The body chunks.
+    :type chunks: AsyncIterator[bytes]
+    :param fmt: ``"ndjson"`` or ``"csv"``.
+    :type fmt: str
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param job: The job tracking progress and per-row errors.
+    :type job: BulkImportJob
+    :return: The finished job.
+    :rtype: BulkImportJob
+    """
+
+    def fail(line: int, error: str) -> None:
+        job.failed += 1
+        if len(job.errors) < settings.BULK_MAX_ERRORS:
+            job.errors.append(BulkRowError(line=line, error=error))
+
+    batch: List[Tuple[int, ContactCreate]] = []
+
+    async def flush() -> None:
+        errors = await run_in_threadpool(
+            repository_contacts.bulk_create_contacts, db, [contact for _, contact in batch], user,
+            settings.BULK_USE_COPY,
+        )
+        for index, (line, _) in enumerate(batch):
+            if index in errors:
+                fail(line, errors[index])
+        job.inserted += len(batch) - len(errors)
+        job.processed += len(batch)
+        batch.clear()
+        jobs.save(user.id, job)
+
+    try:
+        async for line, record in iter_records(chunks, fmt):
+            if isinstance(record, str):
+                job.processed += 1
+                fail(line, record)
+                continue
+            try:
+                batch.append((line, ContactCreate.model_validate(record)))
+            except ValidationError as e:
+                job.processed += 1
+                fail(line, _validation_message(e))
+                continue
+            if len(batch) >= settings.BULK_CHUNK_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    except Exception:
+        job.status = "failed"
+        jobs.save(user.id, job)
+        raise
+    job.status = "completed"
+    job.errors.sort(key=lambda error: error.line)
+    jobs.save(user.id, job)
+    return job
@@ -0,0 +1,278 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+try:
+    from redis import RedisError
+except ImportError:  # redis is an optional dependency
+    RedisError = OSError
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_redis
+from app.schemas import Principal
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a time-to-live.
+
+    :param maxsize: Maximum number of entries kept before the least recently used one is evicted.
+    :type maxsize: int
+    :param ttl: Default lifetime of an entry in seconds.
+    :type ttl: float
+    :param timer: Monotonic clock used for expiry, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value stored under ``key`` if present and not expired.
+
+        :param key: The cache key.
+        :type key: Hashable
+        :param default: Value returned on a miss.
+        :type default: Any
+        :return: The cached value or ``default``.
+        :rtype: Any
+        """
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at <= self.timer():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store ``value`` under ``key``, evicting the least recently used entry when full.
+
+        :param key: The cache key.
+        :type key: Hashable
+        :param value: The value to store.
+        :type value: Any
+        :param ttl: Lifetime in seconds, defaults to the cache TTL.
+        :type ttl: float, optional
+        """
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove ``key`` from the cache if present.
+
+        :param key: The cache key.
+        :type key: Hashable
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PrincipalCache:
+    """
+    Cache of authenticated principals keyed by the token subject (the user's email).
+
+    Entries live in an in-process :class:`TTLCache` or, when ``backend`` is ``"redis"``,
+    in Redis so that every worker sees the same invalidations. When Redis fails the
+    cache is bypassed, and principals are loaded from the database, for ``redis_retry``
+    seconds; an invalidation lost to the failure expires with its entry after ``ttl``.
+
+    :param enabled: Whether lookups are served from the cache at all.
+    :type enabled: bool
+    :param ttl: Lifetime of an entry in seconds.
+    :type ttl: int
+    :param maxsize: Maximum number of in-process entries.
+    :type maxsize: int
+    :param backend: ``"memory"`` or ``"redis"``.
+    :type backend: str
+    :param redis_retry: Seconds the cache is bypassed after Redis fails.
+    :type redis_retry: float
+    :param timer: Monotonic clock, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    prefix = "principal:"
+
+    def __init__(self, enabled: bool = True, ttl: int = 60, maxsize: int = 1024, backend: str = "memory",
+                 redis_retry: float = 5.0, timer: Callable[[], float] = time.monotonic):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.backend = backend
+        self.redis_retry = redis_retry
+        self.timer = timer
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis_down_until = 0.0
+
+    def _redis(self):
+        return get_redis() if self.backend == "redis" else None
+
+    def _async_redis(self):
+        return get_async_redis() if self.backend == "redis" else None
+
+    def _redis_up(self) -> bool:
+        return self._redis_down_until <= self.timer()
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning("Principal cache cannot reach Redis, bypassing it for %ss: %s", self.redis_retry, error)
+        self._redis_down_until = self.timer() + self.redis_retry
+
+    def get(self, subject: str) -> Optional[Principal]:
+        """
+        Return the cached principal for a token subject.
+
+        :param subject: The token subject.
+        :type subject: str
+        :return: The cached principal, or None on a miss.
+        :rtype: Principal, optional
+        """
+        if not self.enabled:
+            return None
+        client = self._redis()
+        if client is not None:
+            if not self._redis_up():
+                return None
+            try:
+                raw = client.get(self.prefix + subject)
+            except RedisError as e:
+                self._redis_failed(e)
+                return None
+            return Principal.model_validate_json(raw) if raw else None
+        return self.local.get(subject)
+
+    def set(self, subject: str, user) -> Principal:
+        """
+        Snapshot a user into a principal and cache it under its token subject.
+
+        :param subject: The token subject.
+        :type subject: str
+        :param user: The user loaded from the database.
+        :type user: User
+        :return: The cached principal.
+        :rtype: Principal
+        """
+        principal = Principal.model_validate(user)
+        if self.enabled:
+            client = self._redis()
+            if client is not None:
+                if self._redis_up():
+                    try:
+                        client.set(self.prefix + subject, principal.model_dump_json(), ex=self.ttl)
+                    except RedisError as e:
+                        self._redis_failed(e)
+            else:
+                self.local.set(subject, principal)
+        return principal
+
+    def invalidate(self, subject: str) -> None:
+        """
+        Drop the cached principal for a token subject.
+
+        Called after the user's row is committed, so a Redis failure is logged rather than raised.
+
+        :param subject: The token subject.
+        :type subject: str
+        """
+        self.local.delete(subject)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.delete(self.prefix + subject)
+            except RedisError as e:
+                self._redis_failed(e)
+
+    async def get_async(self, subject: str) -> Optional[Principal]:
+        """
+        Async counterpart of :meth:`get` for the async authentication dependency.
+
+        :param subject: The token subject.
+        :type subject: str
+        :return: The cached principal, or None on a miss.
+        :rtype: Principal, optional
+        """
+        client = self._async_redis() if self.enabled else None
+        if client is None:
+            return self.get(subject)
+        if not self._redis_up():
+            return None
+        try:
+            raw = await client.get(self.prefix + subject)
+        except RedisError as e:
+            self._redis_failed(e)
+            return None
+        return Principal.model_validate_json(raw) if raw else None
+
+    async def set_async(self, subject: str, user) -> Principal:
+        """
+        Async counterpart of :meth:`set`.
+
+        :param subject: The token subject.
+        :type subject: str
+        :param user: The user loaded from the database.
+        :type user: User
+        :return: The cached principal.
+        :rtype: Principal
+        """
+        client = self._async_redis() if self.enabled else None
+        if client is None:
+            return self.set(subject, user)
+        principal = Principal.model_validate(user)
+        if self._redis_up():
+            try:
+                await client.set(self.prefix + subject, principal.model_dump_json(), ex=self.ttl)
+            except RedisError as e:
+                self._redis_failed(e)
+        return principal
+
+    async def invalidate_async(self, subject: str) -> None:
+        """
+        Async counterpart of :meth:`invalidate`.
+
+        :param subject: The token subject.
+        :type subject: str
+        """
+        self.local.delete(subject)
+        client = self._async_redis()
+        if client is not None:
+            try:
+                await client.delete(self.prefix + subject)
+            except RedisError as e:
+                self._redis_failed(e)
+
+
+principal_cache = PrincipalCache(
+    enabled=settings.PRINCIPAL_CACHE_ENABLED,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    backend=settings.PRINCIPAL_CACHE_BACKEND,
+    redis_retry=settings.PRINCIPAL_CACHE_REDIS_RETRY,
+)
@@ -1,10 +1,26 @@
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 from app.core.config import settings
 
-cloudinary.config(
-    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
-    api_key=settings.CLOUDINARY_API_KEY,
-    api_secret=settings.CLOUDINARY_API_SECRET
-)
\ No newline at end of file
+_cloudinary = None
+
+
+def get_cloudinary():
+    """
+    Return the Cloudinary SDK, importing and configuring it on first use.
+
+    The SDK is only needed to store avatars, so it is kept out of application startup.
+
+    :return: The configured ``cloudinary`` module.
+    :rtype: module
+    """
+    global _cloudinary
+    if _cloudinary is None:
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET
+        )
+        _cloudinary = cloudinary
+    return _cloudinary
@@ -1,15 +1,53 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     REDIS_URL: str
 
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PGBOUNCER: bool = False
+    DB_CREATE_SCHEMA: bool = True
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None
+
+    BULK_CHUNK_SIZE: int = 1000
+    BULK_MAX_ERRORS: int = 1000
+    BULK_USE_COPY: bool = True
+    BULK_MAX_LINE_LENGTH: int = 65536
+    JOB_REGISTRY_BACKEND: str = 'memory'
+    JOB_REGISTRY_TTL: int = 3600
+    JOB_REGISTRY_SIZE: int = 10000
+    BATCH_MAX_OPERATIONS: int = 500
+    CHANGES_PAGE_SIZE: int = 500
+    CHANGES_SETTLE_SECONDS: float = 5.0
+    CHANGES_RETENTION_DAYS: int = 30
+    COUNTERS_RECONCILE_BATCH: int = 500
+    EXPORT_BATCH_SIZE: int = 1000
+
     POSTGRES_DB: str
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
 
     SECRET_KEY: str
     ALGORITHM: str
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None
+    JWT_KEY_ID: Optional[str] = None
+    JWT_PUBLIC_KEYS_FILE: Optional[str] = None
+    JWT_LEGACY_ALGORITHM: Optional[str] = None
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_SIZE: int = 10000
+
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_WORKERS: int = 2
+    PASSWORD_QUEUE_SIZE: int = 32
 
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
@@ -18,6 +56,17 @@ class Settings(BaseSettings):
     MAIL_SERVER: str
     MAIL_TLS: bool
     MAIL_SSL: bool
+    MAIL_USE_CREDENTIALS: bool = True
+    MAIL_DEFAULT_LOCALE: str = 'en'
+    MAIL_TIMEOUT: float = 30
+    MAIL_POOL_SIZE: int = 2
+    MAIL_QUEUE_BACKEND: str = 'memory'
+    MAIL_QUEUE_CONSUMER: Optional[str] = None
+    MAIL_WORKER_ENABLED: bool = True
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BACKOFF: float = 2.0
+    MAIL_DEAD_LETTER_SIZE: int = 1000
 
     REDIS_HOST: str = 'localhost'
     REDIS_PORT: int = 6379
@@ -26,6 +75,40 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
 
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024
+    AVATAR_MAX_PIXELS: int = 40_000_000
+    AVATAR_MAX_SIDE: int = 512
+
+    GRAVATAR_ENABLED: bool = True
+    GRAVATAR_VERIFY: bool = False
+    GRAVATAR_TIMEOUT: float = 2.0
+    GRAVATAR_CONCURRENCY: int = 16
+    GRAVATAR_CACHE_TTL: int = 86400
+    GRAVATAR_CACHE_SIZE: int = 10000
+    GRAVATAR_PREWARM_BATCH: int = 500
+
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 60
+    RESPONSE_CACHE_SIZE: int = 10000
+    RESPONSE_CACHE_BACKEND: str = 'memory'
+    RESPONSE_CACHE_REDIS_RETRY: float = 5.0
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = 'redis'
+    RATE_LIMIT_IP_FACTOR: int = 5
+    RATE_LIMIT_LOCAL_PRECHECK: bool = True
+    RATE_LIMIT_REDIS_RETRY: float = 5.0
+
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_BACKEND: str = 'memory'
+    PRINCIPAL_CACHE_REDIS_RETRY: float = 5.0
+
+    REFRESH_TOKEN_BACKEND: str = 'redis'
+    REFRESH_TOKEN_TTL: int = 604800
+    REFRESH_TOKEN_REDIS_RETRY: float = 5.0
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,48 @@
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import User
+from app.repository import contacts as repository_contacts
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_all(bind, batch_size: int = 500) -> int:
+    """
+    Recount the contacts of every user and repair the counters behind ``GET /api/contacts/stats``.
+
+    Users are reconciled in batches of ``batch_size`` by ascending ID, one transaction
+    per batch, so the job can run next to the API.
+
+    :param bind: Engine to read and repair the counters with.
+    :type bind: Engine
+    :param batch_size: Number of users per batch.
+    :type batch_size: int
+    :return: Number of counters corrected.
+    :rtype: int
+    """
+    after_id, corrected = 0, 0
+    while True:
+        with Session(bind=bind) as db:
+            user_ids = db.scalars(select(User.id).where(User.id > after_id).order_by(User.id).limit(batch_size)).all()
+            if not user_ids:
+                return corrected
+            corrected += repository_contacts.reconcile_counters(db, user_ids)
+        after_id = user_ids[-1]
+
+
+def run_reconcile() -> None:
+    """
+    Repair drifted contact counters from the command line: ``python -m app.core.counters``.
+    """
+    from app.db.database import engine
+    corrected = reconcile_all(engine, settings.COUNTERS_RECONCILE_BATCH)
+    logger.info("Corrected %d contact counters", corrected)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_reconcile()
@@ -1,8 +1,9 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from typing import Iterable, List, Optional, Tuple
 from pydantic import BaseModel, EmailStr
-from app.core.config import settings
-import asyncio
-from pathlib import Path  # Import Path from pathlib module
+from app.core.mail_queue import MailMessage, mail_dispatcher
+from app.core.templates import email_templates
+
+VERIFY_EMAIL_URL = "http://localhost:8000/api/auth/verify-email"
 
 class EmailSchema(BaseModel):
     """
@@ -13,36 +14,55 @@ class EmailSchema(BaseModel):
     """
     email: EmailStr
 
-# Define the necessary fields for ConnectionConfig based on your settings
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).resolve().parent.parent / 'templates',
-)
-
-def send_email(email: EmailSchema, token: str):
+async def send_email(email: EmailSchema, token: str, fullname: Optional[str] = None, locale: Optional[str] = None):
     """
-    Send an email for email verification.
+    Queue an email for email verification.
+
+    The message is rendered from the precompiled ``email_template.html`` in the
+    recipient's locale and only enqueued; delivery, retries and dead-lettering happen
+    in the background worker of :data:`app.core.mail_queue.mail_dispatcher`.
 
     :param email: The email schema containing the recipient's email address.
     :type email: EmailSchema
     :param token: The verification token to include in the email link.
     :type token: str
+    :param fullname: The name used to greet the recipient.
+    :type fullname: str, optional
+    :param locale: The recipient's locale, e.g. ``uk``.
+    :type locale: str, optional
     """
-    message = MessageSchema(
+    body = email_templates.render(
+        "email_template.html", locale=locale,
+        fullname=fullname or email.email, verification_link=f"{VERIFY_EMAIL_URL}?token={token}",
+    )
+    message = MailMessage(
         subject="Email Verification",
         recipients=[email.email],
-        body=f"Click on the link to verify your email: http://localhost:8000/api/auth/verify-email?token={token}",
+        body=body,
         subtype="html"
     )
-    fm = FastMail(conf)
-    asyncio.run(fm.send_message(message))
+    await mail_dispatcher.enqueue(message)
 
+async def send_birthday_reminders(reminders: Iterable[Tuple[str, str, list]], locale: Optional[str] = None) -> int:
+    """
+    Queue birthday reminder emails for many users at once.
 
+    The template is resolved once and rendered for every recipient in one batch.
+
+    :param reminders: ``(email, fullname, contacts)`` per recipient, where ``contacts``
+        are the contacts with an upcoming birthday.
+    :type reminders: Iterable[Tuple[str, str, list]]
+    :param locale: Locale of the reminders.
+    :type locale: str, optional
+    :return: Number of emails queued.
+    :rtype: int
+    """
+    reminders: List[Tuple[str, str, list]] = [reminder for reminder in reminders if reminder[2]]
+    bodies = email_templates.render_many(
+        "birthday_reminder.html",
+        ({"fullname": fullname, "contacts": contacts} for _, fullname, contacts in reminders),
+        locale=locale,
+    )
+    for (email, _, _), body in zip(reminders, bodies):
+        await mail_dispatcher.enqueue(MailMessage(subject="Upcoming Birthdays", recipients=[email], body=body))
+    return len(bodies)
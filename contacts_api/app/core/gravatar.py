@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from libgravatar import Gravatar
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import TTLCache, principal_cache
+from app.core.config import settings
+from app.repository import users as repository_users
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class GravatarResolver:
+    """
+    Resolves Gravatar avatar URLs, caching the outcome by email hash.
+
+    With ``verify`` enabled the URL is checked with a ``HEAD`` request (``d=404``) and
+    emails without a Gravatar resolve to None; that answer is cached as well. Failed
+    checks are not cached, so they are retried on the next lookup.
+
+    :param ttl: Lifetime of a cached result in seconds.
+    :type ttl: int
+    :param maxsize: Maximum number of cached results.
+    :type maxsize: int
+    :param verify: Whether to check that the Gravatar exists.
+    :type verify: bool
+    :param timeout: Timeout of the check in seconds.
+    :type timeout: float
+    :param concurrency: Maximum number of checks in flight in :meth:`resolve_many`.
+    :type concurrency: int
+    :param transport: HTTP transport of the check, replaceable in tests.
+    :type transport: httpx.AsyncBaseTransport, optional
+    """
+
+    def __init__(self, ttl: int = 86400, maxsize: int = 10000, verify: bool = False,
+                 timeout: float = 2.0, concurrency: int = 16, transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.verify = verify
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.transport = transport
+
+    def _client(self) -> "httpx.AsyncClient":
+        # httpx is only needed with verify, so it is imported on first use rather than at startup
+        import httpx
+
+        return httpx.AsyncClient(timeout=self.timeout, transport=self.transport)
+
+    @staticmethod
+    def email_hash(email: str) -> str:
+        """
+        Return the Gravatar hash of an email address.
+
+        :param email: The email address.
+        :type email: str
+        :return: The hex digest Gravatar identifies the address by.
+        :rtype: str
+        """
+        return Gravatar(email).email_hash
+
+    async def _exists(self, client: "httpx.AsyncClient", url: str) -> bool:
+        response = await client.head(url, params={"d": "404"})
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def resolve(self, email: str, client: Optional["httpx.AsyncClient"] = None) -> Optional[str]:
+        """
+        Return the avatar URL of an email address.
+
+        :param email: The email address.
+        :type email: str
+        :param client: HTTP client to verify with, one is opened when omitted.
+        :type client: httpx.AsyncClient, optional
+        :return: The avatar URL, or None if there is no Gravatar or it could not be checked.
+        :rtype: str, optional
+        """
+        gravatar = Gravatar(email)
+        cached = self.cache.get(gravatar.email_hash, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        url = gravatar.get_image()
+        if self.verify:
+            import httpx
+
+            try:
+                if client is None:
+                    async with self._client() as client:
+                        exists = await self._exists(client, url)
+                else:
+                    exists = await self._exists(client, url)
+            except httpx.HTTPError as e:
+                logger.warning("Gravatar lookup for %s failed: %s", gravatar.email_hash, e)
+                return None
+            url = url if exists else None
+        self.cache.set(gravatar.email_hash, url)
+        return url
+
+    async def resolve_many(self, emails: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolve many email addresses, at most ``concurrency`` at a time over one client.
+
+        :param emails: The email addresses.
+        :type emails: Iterable[str]
+        :return: The avatar URL (or None) of every address.
+        :rtype: Dict[str, str | None]
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        emails = list(emails)
+        async with self._client() as client:
+            async def resolve_one(email: str) -> Optional[str]:
+                async with semaphore:
+                    return await self.resolve(email, client)
+            urls = await asyncio.gather(*(resolve_one(email) for email in emails))
+        return dict(zip(emails, urls))
+
+
+def _save_avatars(bind, avatars: Dict[int, str]) -> int:
+    with Session(bind=bind) as db:
+        return repository_users.set_missing_avatars(avatars, db)
+
+
+async def assign_avatar(user_id: int, email: str, bind, resolver: Optional[GravatarResolver] = None) -> None:
+    """
+    Resolve the Gravatar of a newly created user and save it, unless they already have an avatar.
+
+    Runs as a background task after signup has answered, so it opens its own session on ``bind``.
+
+    :param user_id: ID of the user.
+    :type user_id: int
+    :param email: Email address of the user.
+    :type email: str
+    :param bind: Engine to save the URL with.
+    :type bind: Engine
+    :param resolver: Resolver to use, defaults to :data:`gravatar_resolver`.
+    :type resolver: GravatarResolver, optional
+    """
+    url = await (resolver or gravatar_resolver).resolve(email)
+    if url and await run_in_threadpool(_save_avatars, bind, {user_id: url}):
+        await principal_cache.invalidate_async(email)
+
+
+async def prewarm_avatars(bind, batch_size: int = 500, resolver: Optional[GravatarResolver] = None) -> int:
+    """
+    Fill in the Gravatar of every user that has no avatar yet, e.g. after users were bulk created.
+
+    Users are read in batches of ``batch_size`` by ascending ID and each batch is
+    resolved concurrently and saved with one statement.
+
+    :param bind: Engine to read and save the users with.
+    :type bind: Engine
+    :param batch_size: Number of users per batch.
+    :type batch_size: int
+    :param resolver: Resolver to use, defaults to :data:`gravatar_resolver`.
+    :type resolver: GravatarResolver, optional
+    :return: Number of users given an avatar.
+    :rtype: int
+    """
+    resolver = resolver or gravatar_resolver
+    after_id, updated = 0, 0
+    while True:
+        with Session(bind=bind) as db:
+            batch = await run_in_threadpool(repository_users.get_users_without_avatar, db, after_id, batch_size)
+        if not batch:
+            return updated
+        after_id = batch[-1][0]
+        urls = await resolver.resolve_many(email for _, email in batch)
+        avatars = {user_id: urls[email] for user_id, email in batch if urls[email]}
+        if avatars:
+            updated += await run_in_threadpool(_save_avatars, bind, avatars)
+            for user_id, email in batch:
+                if user_id in avatars:
+                    await principal_cache.invalidate_async(email)
+
+
+gravatar_resolver = GravatarResolver(
+    ttl=settings.GRAVATAR_CACHE_TTL,
+    maxsize=settings.GRAVATAR_CACHE_SIZE,
+    verify=settings.GRAVATAR_VERIFY,
+    timeout=settings.GRAVATAR_TIMEOUT,
+    concurrency=settings.GRAVATAR_CONCURRENCY,
+)
+
+
+async def run_prewarm() -> None:
+    """
+    Fill in missing avatars from the command line: ``python -m app.core.gravatar``.
+    """
+    from app.db.database import engine
+    updated = await prewarm_avatars(engine, settings.GRAVATAR_PREWARM_BATCH)
+    logger.info("Gravatar set for %d users", updated)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_prewarm())
@@ -0,0 +1,128 @@
+import logging
+import uuid
+from typing import Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+try:
+    from redis import RedisError
+except ImportError:  # redis is an optional dependency
+    RedisError = OSError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+Job = TypeVar("Job", bound=BaseModel)
+
+
+class JobRegistry:
+    """
+    Registry of background and long-running jobs, for status endpoints.
+
+    Jobs are pydantic status models updated by their worker, which publishes each
+    update with :meth:`save`, and dropped ``ttl`` seconds after they were last saved.
+    With ``backend="redis"`` they are stored in Redis, so a status request may land on
+    any worker; the in-process ``"memory"`` backend only suits a single worker. When
+    Redis fails, jobs are kept in process until it is back.
+
+    :param maxsize: Maximum number of jobs remembered in process.
+    :type maxsize: int
+    :param ttl: Seconds a job stays visible.
+    :type ttl: int
+    :param backend: ``"memory"`` or ``"redis"``.
+    :type backend: str
+    """
+
+    prefix = "job:"
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 3600, backend: str = "memory"):
+        self.ttl = ttl
+        self.backend = backend
+        self._jobs = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def _redis(self):
+        return get_redis() if self.backend == "redis" else None
+
+    @staticmethod
+    def _key(model: Type[BaseModel], user_id: int, job_id: str) -> str:
+        return f"{model.__name__}:{user_id}:{job_id}"
+
+    def register(self, user_id: int, job: BaseModel) -> bool:
+        """
+        Make a new job visible to its owner.
+
+        :param user_id: ID of the user who owns the job.
+        :type user_id: int
+        :param job: The job status model, with a ``job_id`` attribute.
+        :type job: BaseModel
+        :return: False if the user already has a job of this type and ID, which is kept.
+        :rtype: bool
+        """
+        key = self._key(type(job), user_id, job.job_id)
+        client = self._redis()
+        if client is not None:
+            try:
+                return bool(client.set(self.prefix + key, job.model_dump_json(), ex=self.ttl, nx=True))
+            except RedisError as e:
+                logger.warning("Job registry cannot reach Redis, keeping job %s in process: %s", job.job_id, e)
+        if self._jobs.get(key) is not None:
+            return False
+        self._jobs.set(key, job)
+        return True
+
+    def save(self, user_id: int, job: BaseModel) -> None:
+        """
+        Publish the current state of a registered job.
+
+        :param user_id: ID of the user who owns the job.
+        :type user_id: int
+        :param job: The job status model.
+        :type job: BaseModel
+        """
+        key = self._key(type(job), user_id, job.job_id)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.set(self.prefix + key, job.model_dump_json(), ex=self.ttl)
+                return
+            except RedisError as e:
+                logger.warning("Job registry cannot reach Redis, keeping job %s in process: %s", job.job_id, e)
+        self._jobs.set(key, job)
+
+    def get(self, job_id: str, user_id: int, model: Type[Job]) -> Optional[Job]:
+        """
+        Return a job if it exists and belongs to the user.
+
+        :param job_id: The job ID.
+        :type job_id: str
+        :param user_id: ID of the requesting user.
+        :type user_id: int
+        :param model: The job status model class.
+        :type model: Type[BaseModel]
+        :return: The job status model, or None.
+        :rtype: BaseModel, optional
+        """
+        key = self._key(model, user_id, job_id)
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = client.get(self.prefix + key)
+                if raw is not None:
+                    return model.model_validate_json(raw)
+            except RedisError as e:
+                logger.warning("Job registry cannot reach Redis, looking job %s up in process: %s", job_id, e)
+        return self._jobs.get(key)
+
+
+jobs = JobRegistry(
+    maxsize=settings.JOB_REGISTRY_SIZE,
+    ttl=settings.JOB_REGISTRY_TTL,
+    backend=settings.JOB_REGISTRY_BACKEND,
+)
@@ -0,0 +1,469 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import socket
+import time
+import uuid
+from collections import deque
+from email.message import EmailMessage
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiosmtplib
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+
+class MailMessage(BaseModel):
+    """
+    An email waiting for delivery.
+
+    :param id: Unique ID of the message.
+    :type id: str
+    :param recipients: Recipient addresses.
+    :type recipients: List[str]
+    :param subject: Subject line.
+    :type subject: str
+    :param body: Message body.
+    :type body: str
+    :param subtype: ``html`` or ``plain``.
+    :type subtype: str
+    :param attempts: Number of failed delivery attempts so far.
+    :type attempts: int
+    :param last_error: Error of the last failed attempt.
+    :type last_error: str, optional
+    """
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    recipients: List[str]
+    subject: str
+    body: str
+    subtype: str = "html"
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+
+class SMTPConnectionPool:
+    """
+    Persistent SMTP connections shared by the delivery worker.
+
+    Connections are opened (and logged into) on first use and kept for later
+    messages, so a batch pays for one handshake per connection instead of one per
+    message. A connection that failed below the SMTP level is dropped.
+
+    :param hostname: SMTP server.
+    :type hostname: str
+    :param port: SMTP port.
+    :type port: int
+    :param username: Login, or None to send without authentication.
+    :type username: str, optional
+    :param password: Password for ``username``.
+    :type password: str, optional
+    :param use_tls: Connect over implicit TLS.
+    :type use_tls: bool
+    :param start_tls: Upgrade with STARTTLS after connecting.
+    :type start_tls: bool
+    :param size: Maximum number of open connections.
+    :type size: int
+    :param timeout: Seconds before an SMTP command times out.
+    :type timeout: float
+    """
+
+    IDLE_CHECK_AFTER = 30
+
+    def __init__(self, hostname: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = False, start_tls: bool = False, size: int = 2, timeout: float = 30):
+        self.options = dict(hostname=hostname, port=port, username=username, password=password,
+                            use_tls=use_tls, start_tls=start_tls, timeout=timeout)
+        self.size = size
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            smtp, idle_since = self._idle.pop()
+            if not smtp.is_connected:
+                continue
+            if time.monotonic() - idle_since < self.IDLE_CHECK_AFTER:
+                return smtp
+            # Servers drop idle sessions; probe before reusing an old one
+            try:
+                await smtp.noop()
+                return smtp
+            except (aiosmtplib.SMTPException, OSError):
+                smtp.close()
+        smtp = aiosmtplib.SMTP(**self.options)
+        await smtp.connect()
+        return smtp
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        """
+        Borrow a connected client, waiting while ``size`` are in use.
+
+        :return: The SMTP client.
+        :rtype: AsyncIterator[aiosmtplib.SMTP]
+        """
+        async with self._semaphore:
+            smtp = await self._checkout()
+            try:
+                yield smtp
+            except aiosmtplib.SMTPResponseException:
+                # The server answered, so the connection itself is still usable
+                self._idle.append((smtp, time.monotonic()))
+                raise
+            except BaseException:
+                smtp.close()
+                raise
+            else:
+                self._idle.append((smtp, time.monotonic()))
+
+    async def close(self) -> None:
+        """
+        Close every idle connection.
+        """
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            with contextlib.suppress(aiosmtplib.SMTPException, OSError):
+                await smtp.quit()
+
+
+class MemoryMailQueue:
+    """
+    In-process mail queue; messages are lost when the process exits.
+
+    :param dead_letter_size: Number of dead letters kept.
+    :type dead_letter_size: int
+    """
+
+    def __init__(self, dead_letter_size: int = 1000):
+        self._ready = deque()
+        self._delayed = []
+        self._dead = deque(maxlen=dead_letter_size)
+        self._counter = itertools.count()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _promote(self) -> None:
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._ready.append(heapq.heappop(self._delayed)[2])
+
+    async def push(self, message: MailMessage) -> None:
+        self._ready.append(message)
+        self._wake()
+
+    async def push_delayed(self, message: MailMessage, due: float) -> None:
+        heapq.heappush(self._delayed, (due, next(self._counter), message))
+        self._wake()
+
+    async def pop_batch(self, size: int, timeout: float) -> List[MailMessage]:
+        self._promote()
+        if not self._ready:
+            if self._delayed:
+                timeout = min(timeout, max(0.0, self._delayed[0][0] - time.time()))
+            self._waiter = asyncio.get_running_loop().create_future()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._waiter, timeout)
+            self._waiter = None
+            self._promote()
+        return [self._ready.popleft() for _ in range(min(size, len(self._ready)))]
+
+    async def ack(self, message: MailMessage) -> None:
+        pass
+
+    async def recover(self) -> int:
+        return 0
+
+    async def push_dead(self, message: MailMessage) -> None:
+        self._dead.append(message)
+
+    async def dead_letters(self) -> List[MailMessage]:
+        return list(self._dead)
+
+    async def pending(self) -> int:
+        return len(self._ready) + len(self._delayed)
+
+
+class RedisMailQueue:
+    """
+    Mail queue in Redis, shared by every worker process and surviving restarts.
+
+    Ready messages live in a list, retries waiting for their backoff in a sorted set
+    scored by due time, and dead letters in a capped list.
+
+    Popped messages are moved atomically (``LMOVE``) to the consumer's processing list
+    and only removed from it by :meth:`ack`, once they were delivered, rescheduled or
+    dead-lettered. Messages a crashed or cancelled worker left there are put back in
+    the queue by :meth:`recover` when the consumer starts again, so they are delivered
+    at least once. Each running worker needs its own ``consumer`` name, stable across
+    its restarts.
+
+    :param client: asyncio Redis client, defaults to the shared one.
+    :type client: redis.asyncio.Redis, optional
+    :param prefix: Key prefix.
+    :type prefix: str
+    :param dead_letter_size: Number of dead letters kept.
+    :type dead_letter_size: int
+    :param consumer: Name of the worker popping messages, defaults to the host name.
+    :type consumer: str, optional
+    """
+
+    def __init__(self, client=None, prefix: str = "mail:", dead_letter_size: int = 1000,
+                 consumer: Optional[str] = None):
+        self._client = client
+        self.ready_key = prefix + "queue"
+        self.delayed_key = prefix + "delayed"
+        self.dead_key = prefix + "dead"
+        self.processing_key = f"{prefix}processing:{consumer or socket.gethostname()}"
+        self.dead_letter_size = dead_letter_size
+        # Message ID -> the exact item in the processing list, for LREM
+        self._in_flight: Dict[str, str] = {}
+
+    @property
+    def client(self):
+        return self._client or get_async_redis()
+
+    async def _promote(self) -> None:
+        for raw in await self.client.zrangebyscore(self.delayed_key, 0, time.time()):
+            # ZREM decides which worker moves the message when several race for it
+            if await self.client.zrem(self.delayed_key, raw):
+                await self.client.lpush(self.ready_key, raw)
+
+    async def push(self, message: MailMessage) -> None:
+        await self.client.lpush(self.ready_key, message.model_dump_json())
+
+    async def push_delayed(self, message: MailMessage, due: float) -> None:
+        await self.client.zadd(self.delayed_key, {message.model_dump_json(): due})
+
+    async def pop_batch(self, size: int, timeout: float) -> List[MailMessage]:
+        await self._promote()
+        first = await self.client.blmove(self.ready_key, self.processing_key, timeout, "RIGHT", "LEFT")
+        if first is None:
+            return []
+        raw = [first]
+        if size > 1:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for _ in range(size - 1):
+                    pipe.lmove(self.ready_key, self.processing_key, "RIGHT", "LEFT")
+                raw += [item for item in await pipe.execute() if item is not None]
+        batch = []
+        for item in raw:
+            message = MailMessage.model_validate_json(item)
+            self._in_flight[message.id] = item
+            batch.append(message)
+        return batch
+
+    async def ack(self, message: MailMessage) -> None:
+        raw = self._in_flight.pop(message.id, None)
+        if raw is not None:
+            await self.client.lrem(self.processing_key, 1, raw)
+
+    async def recover(self) -> int:
+        """
+        Put the messages left in this consumer's processing list back in the queue, oldest first in line.
+
+        :return: Number of messages recovered.
+        :rtype: int
+        """
+        recovered = 0
+        while await self.client.lmove(self.processing_key, self.ready_key, "LEFT", "RIGHT") is not None:
+            recovered += 1
+        self._in_flight.clear()
+        return recovered
+
+    async def push_dead(self, message: MailMessage) -> None:
+        await self.client.lpush(self.dead_key, message.model_dump_json())
+        await self.client.ltrim(self.dead_key, 0, self.dead_letter_size - 1)
+
+    async def dead_letters(self) -> List[MailMessage]:
+        return [MailMessage.model_validate_json(item) for item in await self.client.lrange(self.dead_key, 0, -1)]
+
+    async def pending(self) -> int:
+        return await self.client.llen(self.ready_key) + await self.client.zcard(self.delayed_key)
+
+
+def is_permanent(error: Exception) -> bool:
+    """
+    Tell whether a delivery error will not go away by retrying (an SMTP 5xx reply).
+
+    :param error: The delivery error.
+    :type error: Exception
+    :return: True if the message should go straight to the dead letters.
+    :rtype: bool
+    """
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+
+class MailDispatcher:
+    """
+    Background delivery of queued emails.
+
+    Request handlers only :meth:`enqueue`; a worker task pops up to ``batch_size``
+    messages at a time and sends them concurrently over the SMTP connection pool.
+    Transient failures are retried with exponential backoff, permanent ones (5xx)
+    and messages out of attempts go to the dead letters. A message is acknowledged
+    to the queue only once one of these happened.
+
+    :param queue: Where messages wait, see :class:`MemoryMailQueue` and :class:`RedisMailQueue`.
+    :type queue: MemoryMailQueue | RedisMailQueue
+    :param pool: SMTP connections used for delivery.
+    :type pool: SMTPConnectionPool
+    :param sender: The From address.
+    :type sender: str
+    :param batch_size: Messages popped per round.
+    :type batch_size: int
+    :param max_attempts: Attempts before a message is dead-lettered.
+    :type max_attempts: int
+    :param backoff: Seconds before the first retry, doubled on each further one.
+    :type backoff: float
+    """
+
+    def __init__(self, queue, pool: SMTPConnectionPool, sender: str, batch_size: int = 50,
+                 max_attempts: int = 5, backoff: float = 2.0):
+        self.queue = queue
+        self.pool = pool
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.sent = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def enqueue(self, message: MailMessage) -> None:
+        """
+        Queue a message for delivery.
+
+        :param message: The message.
+        :type message: MailMessage
+        """
+        await self.queue.push(message)
+
+    def _email(self, message: MailMessage) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = ", ".join(message.recipients)
+        email["Subject"] = message.subject
+        email.set_content(message.body, subtype=message.subtype)
+        return email
+
+    async def _deliver(self, message: MailMessage) -> None:
+        try:
+            async with self.pool.connection() as smtp:
+                await smtp.send_message(self._email(message))
+        except Exception as e:
+            message.attempts += 1
+            message.last_error = f"{type(e).__name__}: {e}"
+            if is_permanent(e) or message.attempts >= self.max_attempts:
+                logger.warning("Email %s dead-lettered: %s", message.id, message.last_error)
+                await self.queue.push_dead(message)
+            else:
+                await self.queue.push_delayed(message, time.time() + self.backoff * 2 ** (message.attempts - 1))
+        else:
+            self.sent += 1
+        await self.queue.ack(message)
+
+    async def run_once(self, timeout: float = 1.0) -> int:
+        """
+        Deliver one batch, waiting up to ``timeout`` seconds for messages.
+
+        :param timeout: Seconds to wait for the first message.
+        :type timeout: float
+        :return: Number of messages attempted.
+        :rtype: int
+        """
+        batch = await self.queue.pop_batch(self.batch_size, timeout)
+        await asyncio.gather(*(self._deliver(message) for message in batch))
+        return len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email worker failed, retrying")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """
+        Start the worker task on the running event loop, after requeueing the
+        messages a previous run of this consumer left undelivered.
+        """
+        if self._task is None:
+            recovered = await self.queue.recover()
+            if recovered:
+                logger.warning("Requeued %d emails left undelivered by a previous worker", recovered)
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Let the current batch finish, stop the worker and close the SMTP connections.
+
+        :param timeout: Seconds to wait for the worker before cancelling it.
+        :type timeout: float
+        """
+        if self._task is not None:
+            self._stopping = True
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+        await self.pool.close()
+
+
+def build_dispatcher() -> MailDispatcher:
+    """
+    Build the dispatcher described by the ``MAIL_*`` settings.
+
+    :return: The mail dispatcher.
+    :rtype: MailDispatcher
+    """
+    if settings.MAIL_QUEUE_BACKEND == 'redis':
+        queue = RedisMailQueue(dead_letter_size=settings.MAIL_DEAD_LETTER_SIZE, consumer=settings.MAIL_QUEUE_CONSUMER)
+    else:
+        queue = MemoryMailQueue(dead_letter_size=settings.MAIL_DEAD_LETTER_SIZE)
+    pool = SMTPConnectionPool(
+        hostname=settings.MAIL_SERVER,
+        port=settings.MAIL_PORT,
+        username=settings.MAIL_USERNAME if settings.MAIL_USE_CREDENTIALS else None,
+        password=settings.MAIL_PASSWORD if settings.MAIL_USE_CREDENTIALS else None,
+        use_tls=settings.MAIL_SSL,
+        start_tls=settings.MAIL_TLS and not settings.MAIL_SSL,
+        size=settings.MAIL_POOL_SIZE,
+        timeout=settings.MAIL_TIMEOUT,
+    )
+    return MailDispatcher(queue, pool, sender=settings.MAIL_FROM, batch_size=settings.MAIL_BATCH_SIZE,
+                          max_attempts=settings.MAIL_MAX_ATTEMPTS, backoff=settings.MAIL_RETRY_BACKOFF)
+
+
+mail_dispatcher = build_dispatcher()
+
+
+async def run_worker() -> None:
+    """
+    Run the delivery worker on its own, for deployments with ``MAIL_WORKER_ENABLED=False``
+    on the web processes and a shared ``redis`` queue.
+    """
+    await mail_dispatcher.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await mail_dispatcher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
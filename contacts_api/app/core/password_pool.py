@@ -0,0 +1,81 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+
+class PasswordWorkerPool:
+    """
+    Bounded worker pool for password hashing and verification.
+
+    bcrypt releases the GIL, so a few dedicated threads keep hashing off the event loop
+    and off Starlette's shared threadpool. At most ``workers + queue_size`` jobs are
+    admitted at once; beyond that callers get a 503 with a ``Retry-After`` estimate
+    instead of queueing without limit.
+
+    :param workers: Number of hashing threads.
+    :type workers: int
+    :param queue_size: Number of jobs allowed to wait for a free thread.
+    :type queue_size: int
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 32):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self.average_seconds = 0.25
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    def retry_after(self) -> int:
+        """
+        Estimate in seconds until the current backlog has drained.
+
+        :return: Seconds to wait before retrying.
+        :rtype: int
+        """
+        return max(1, math.ceil(self.pending * self.average_seconds / self.workers))
+
+    def _timed(self, func: Callable, *args) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.average_seconds = 0.9 * self.average_seconds + 0.1 * elapsed
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run ``func(*args)`` on a password worker.
+
+        :param func: The hashing or verification function.
+        :type func: Callable
+        :raises HTTPException: 503 with ``Retry-After`` when the admission queue is full.
+        :return: The function's result.
+        :rtype: Any
+        """
+        with self._lock:
+            if self.pending >= self.capacity:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent sign-ins, please retry later",
+                    headers={"Retry-After": str(self.retry_after())},
+                )
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._timed, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
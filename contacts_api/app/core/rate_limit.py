@@ -0,0 +1,402 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError
+from limits import parse
+
+try:
+    from redis import RedisError
+except ImportError:  # redis is an optional dependency
+    RedisError = OSError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_redis
+from app.core.tokens import token_codec
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window log over one sorted set per key, scored by the Redis server clock in
+# milliseconds. The request is admitted only if every key is under its limit, and is
+# then recorded under all of them, so concurrent workers can never overshoot a quota.
+#
+# KEYS: the rate-limit keys
+# ARGV[1]: window in milliseconds, ARGV[2]: unique member, ARGV[3..]: limit of each key
+# Returns {1, remaining} when admitted, {0, retry_after_ms} when rejected.
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+local retry_after = 0
+local remaining = -1
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    local limit = tonumber(ARGV[i + 2])
+    if count >= limit then
+        local oldest = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now, 1)
+    elseif remaining < 0 or limit - count - 1 < remaining then
+        remaining = limit - count - 1
+    end
+end
+if retry_after > 0 then
+    return {0, retry_after}
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, window)
+end
+return {1, remaining}
+"""
+
+Keys = List[Tuple[str, int]]
+
+
+class LocalBuckets:
+    """
+    Per-process token buckets used as a pre-check in front of the shared counters.
+
+    Each key gets a bucket holding ``limit`` tokens, refilled at ``limit / window`` per
+    second. A token is only kept for requests the shared limiter admitted, so an empty
+    bucket means this process alone has already let ``limit`` requests through in the
+    last window, and the request can be rejected without asking Redis.
+
+    :param maxsize: Maximum number of buckets kept.
+    :type maxsize: int
+    :param timer: Monotonic clock, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    def __init__(self, maxsize: int = 10000, timer: Callable[[], float] = time.monotonic):
+        self.timer = timer
+        self._buckets = TTLCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def take(self, keys: Keys, window: float) -> float:
+        """
+        Take one token from the bucket of every key.
+
+        :param keys: The keys and their limits.
+        :type keys: List[Tuple[str, int]]
+        :param window: Length of the window in seconds.
+        :type window: float
+        :return: 0 if the tokens were taken, otherwise seconds until they would be available.
+        :rtype: float
+        """
+        now = self.timer()
+        with self._lock:
+            buckets = []
+            wait = 0.0
+            for key, limit in keys:
+                tokens, updated = self._buckets.get(key, (float(limit), now))
+                tokens = min(float(limit), tokens + (now - updated) * limit / window)
+                buckets.append((key, limit, tokens))
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) * window / limit)
+            if wait:
+                return wait
+            for key, limit, tokens in buckets:
+                self._buckets.set(key, (tokens - 1, now), ttl=window)
+            return 0.0
+
+    def refund(self, keys: Keys, window: float) -> None:
+        """
+        Give back the tokens of a request the shared limiter rejected.
+
+        :param keys: The keys and their limits.
+        :type keys: List[Tuple[str, int]]
+        :param window: Length of the window in seconds.
+        :type window: float
+        """
+        with self._lock:
+            for key, limit in keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    self._buckets.set(key, (min(float(limit), bucket[0] + 1), bucket[1]), ttl=window)
+
+
+class MemoryWindows:
+    """
+    In-process sliding-window log with the same semantics as :data:`SLIDING_WINDOW_SCRIPT`.
+
+    Used with ``backend="memory"`` and while Redis is unreachable.
+
+    :param maxsize: Maximum number of keys kept.
+    :type maxsize: int
+    :param timer: Monotonic clock, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    def __init__(self, maxsize: int = 10000, timer: Callable[[], float] = time.monotonic):
+        self.timer = timer
+        self._windows = TTLCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def hit(self, keys: Keys, window: float) -> Tuple[bool, float]:
+        """
+        Record a request under every key if all of them are under their limit.
+
+        :param keys: The keys and their limits.
+        :type keys: List[Tuple[str, int]]
+        :param window: Length of the window in seconds.
+        :type window: float
+        :return: Whether the request is admitted, and if not the seconds to wait.
+        :rtype: Tuple[bool, float]
+        """
+        now = self.timer()
+        with self._lock:
+            logs = []
+            retry_after = 0.0
+            for key, limit in keys:
+                log = self._windows.get(key)
+                if log is None:
+                    log = deque()
+                while log and log[0] <= now - window:
+                    log.popleft()
+                if len(log) >= limit:
+                    retry_after = max(retry_after, log[len(log) - limit] + window - now)
+                logs.append((key, log))
+            if retry_after > 0:
+                return False, retry_after
+            for key, log in logs:
+                log.append(now)
+                self._windows.set(key, log, ttl=window)
+            return True, 0.0
+
+
+def client_address(request: Request) -> str:
+    """
+    Return the address a request came from.
+
+    :param request: The request.
+    :type request: Request
+    :return: The client IP address.
+    :rtype: str
+    """
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def token_subject(request: Request) -> Optional[str]:
+    """
+    Return the subject of a valid bearer access token on a request, if any.
+
+    :param request: The request.
+    :type request: Request
+    :return: The user's email address, or None for anonymous requests.
+    :rtype: str, optional
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = token_codec.decode(token)
+    except JWTError:
+        return None
+    return payload.get("sub") if payload.get("scope") == "access_token" else None
+
+
+class RateLimiter:
+    """
+    Rate limiter whose counters are shared by every worker through Redis.
+
+    Limits are sliding windows kept by :data:`SLIDING_WINDOW_SCRIPT`, checked and
+    recorded atomically in one round trip. Each route has its own quota, counted per
+    user for requests with a valid access token and per client IP for all requests;
+    authenticated users get ``ip_factor`` times the quota on their IP so that users
+    behind one NAT do not starve each other. With ``local_precheck`` a per-process
+    :class:`LocalBuckets` rejects clients that are clearly over their quota before
+    Redis is asked. When Redis is unreachable the limiter falls back to per-process
+    counters for ``redis_retry`` seconds instead of failing requests.
+
+    :param enabled: Whether limits are enforced at all.
+    :type enabled: bool
+    :param backend: ``"redis"`` or ``"memory"``.
+    :type backend: str
+    :param ip_factor: Multiplier of the per-IP quota for authenticated requests.
+    :type ip_factor: int
+    :param local_precheck: Whether to keep local token buckets in front of Redis.
+    :type local_precheck: bool
+    :param redis_retry: Seconds to use local counters for after a Redis error.
+    :type redis_retry: float
+    :param prefix: Prefix of the Redis keys.
+    :type prefix: str
+    :param timer: Monotonic clock, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    def __init__(self, enabled: bool = True, backend: str = "redis", ip_factor: int = 5,
+                 local_precheck: bool = True, redis_retry: float = 5.0, prefix: str = "ratelimit:",
+                 timer: Callable[[], float] = time.monotonic):
+        self.enabled = enabled
+        self.backend = backend
+        self.ip_factor = ip_factor
+        self.redis_retry = redis_retry
+        self.prefix = prefix
+        self.timer = timer
+        self.buckets = LocalBuckets(timer=timer) if local_precheck else None
+        self.memory = MemoryWindows(timer=timer)
+        self._redis_down_until = 0.0
+        self._scripts = {}
+        self._node = uuid.uuid4().hex[:12]
+        self._sequence = itertools.count()
+
+    def keys(self, request: Request, scope: str, limit: int) -> Keys:
+        """
+        Build the keys a request is counted under, with the limit of each.
+
+        :param request: The request.
+        :type request: Request
+        :param scope: Name of the rate-limited route.
+        :type scope: str
+        :param limit: Number of requests allowed per window.
+        :type limit: int
+        :return: The keys and their limits.
+        :rtype: List[Tuple[str, int]]
+        """
+        subject = token_subject(request)
+        ip_key = f"{self.prefix}{scope}:ip:{client_address(request)}"
+        if subject is None:
+            return [(ip_key, limit)]
+        return [(f"{self.prefix}{scope}:user:{subject}", limit), (ip_key, limit * self.ip_factor)]
+
+    def _use_redis(self) -> bool:
+        return self.backend == "redis" and self._redis_down_until <= self.timer()
+
+    def _script(self, client):
+        script = self._scripts.get(id(client))
+        if script is None or script.registered_client is not client:
+            script = self._scripts[id(client)] = client.register_script(SLIDING_WINDOW_SCRIPT)
+        return script
+
+    def _script_args(self, keys: Keys, window: float) -> Tuple[List[str], list]:
+        member = f"{self._node}:{next(self._sequence)}"
+        return [key for key, _ in keys], [int(window * 1000), member, *(limit for _, limit in keys)]
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning("Rate limiter cannot reach Redis, using local counters for %ss: %s", self.redis_retry, error)
+        self._redis_down_until = self.timer() + self.redis_retry
+
+    def _precheck(self, keys: Keys, window: float) -> float:
+        return self.buckets.take(keys, window) if self.buckets is not None else 0.0
+
+    def _settle(self, keys: Keys, window: float, reply) -> Tuple[bool, float]:
+        allowed, value = int(reply[0]), int(reply[1])
+        if not allowed:
+            if self.buckets is not None:
+                self.buckets.refund(keys, window)
+            return False, value / 1000
+        return True, 0.0
+
+    def hit(self, keys: Keys, window: float) -> Tuple[bool, float]:
+        """
+        Count a request under its keys.
+
+        :param keys: The keys and their limits.
+        :type keys: List[Tuple[str, int]]
+        :param window: Length of the window in seconds.
+        :type window: float
+        :return: Whether the request is admitted, and if not the seconds to wait.
+        :rtype: Tuple[bool, float]
+        """
+        client = get_redis() if self._use_redis() else None
+        if client is None:
+            return self.memory.hit(keys, window)
+        wait = self._precheck(keys, window)
+        if wait:
+            return False, wait
+        try:
+            reply = self._script(client)(*self._script_args(keys, window))
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return self.memory.hit(keys, window)
+        return self._settle(keys, window, reply)
+
+    async def hit_async(self, keys: Keys, window: float) -> Tuple[bool, float]:
+        """
+        Async counterpart of :meth:`hit` for ``async def`` routes.
+
+        :param keys: The keys and their limits.
+        :type keys: List[Tuple[str, int]]
+        :param window: Length of the window in seconds.
+        :type window: float
+        :return: Whether the request is admitted, and if not the seconds to wait.
+        :rtype: Tuple[bool, float]
+        """
+        client = get_async_redis() if self._use_redis() else None
+        if client is None:
+            return self.memory.hit(keys, window)
+        wait = self._precheck(keys, window)
+        if wait:
+            return False, wait
+        try:
+            reply = await self._script(client)(*self._script_args(keys, window))
+        except (RedisError, OSError) as e:
+            self._redis_failed(e)
+            return self.memory.hit(keys, window)
+        return self._settle(keys, window, reply)
+
+    def limit(self, rate: str) -> Callable:
+        """
+        Decorate a route to allow at most ``rate`` requests, e.g. ``"5/minute"``.
+
+        The route must take a ``request: Request`` parameter.
+
+        :param rate: The limit in ``limits`` notation.
+        :type rate: str
+        :raises HTTPException 429: From the route, with ``Retry-After``, once the limit is reached.
+        :return: The decorator.
+        :rtype: Callable
+        """
+        item = parse(rate)
+        limit, window = item.amount, float(item.get_expiry())
+
+        def rejected(retry_after: float) -> HTTPException:
+            return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                 detail=f"Rate limit exceeded: {rate}",
+                                 headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+        def decorator(func: Callable) -> Callable:
+            if "request" not in inspect.signature(func).parameters:
+                raise TypeError(f"{func.__qualname__} needs a 'request: Request' parameter to be rate limited")
+            scope = f"{func.__module__}.{func.__qualname__}"
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if self.enabled:
+                        allowed, retry_after = await self.hit_async(self.keys(kwargs["request"], scope, limit), window)
+                        if not allowed:
+                            raise rejected(retry_after)
+                    return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.enabled:
+                    allowed, retry_after = self.hit(self.keys(kwargs["request"], scope, limit), window)
+                    if not allowed:
+                        raise rejected(retry_after)
+                return func(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+
+limiter = RateLimiter(
+    enabled=settings.RATE_LIMIT_ENABLED,
+    backend=settings.RATE_LIMIT_BACKEND,
+    ip_factor=settings.RATE_LIMIT_IP_FACTOR,
+    local_precheck=settings.RATE_LIMIT_LOCAL_PRECHECK,
+    redis_retry=settings.RATE_LIMIT_REDIS_RETRY,
+)
@@ -0,0 +1,67 @@
+from typing import Optional
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # redis is an optional dependency
+    redis = None
+
+from app.core.config import settings
+
+_client = None
+_async_client = None
+
+
+def get_redis() -> Optional["redis.Redis"]:
+    """
+    Return the shared Redis client built from ``settings.REDIS_URL``.
+
+    The client is created lazily on first use and reused afterwards. Connections
+    are only opened when a command is issued.
+
+    :return: The Redis client, or None if the redis package is not installed.
+    :rtype: redis.Redis, optional
+    """
+    global _client
+    if redis is None:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def set_redis(client) -> None:
+    """
+    Replace the shared Redis client, e.g. with a fakeredis instance in tests.
+
+    :param client: The client to use, or None to rebuild it from settings on next use.
+    :type client: redis.Redis, optional
+    """
+    global _client
+    _client = client
+
+
+def get_async_redis() -> Optional["redis.asyncio.Redis"]:
+    """
+    Return the shared asyncio Redis client built from ``settings.REDIS_URL``.
+
+    :return: The asyncio Redis client, or None if the redis package is not installed.
+    :rtype: redis.asyncio.Redis, optional
+    """
+    global _async_client
+    if redis is None:
+        return None
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_client
+
+
+def set_async_redis(client) -> None:
+    """
+    Replace the shared asyncio Redis client, e.g. with a fakeredis instance in tests.
+
+    :param client: The client to use, or None to rebuild it from settings on next use.
+    :type client: redis.asyncio.Redis, optional
+    """
+    global _async_client
+    _async_client = client
@@ -0,0 +1,280 @@
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from jose import JWTError
+from sqlalchemy.orm import Session
+
+try:
+    from redis import RedisError
+except ImportError:  # redis is an optional dependency
+    RedisError = OSError
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.core.tokens import token_codec
+
+logger = logging.getLogger(__name__)
+
+# Rotates the refresh token of a family. A family key holds the ID of the only token of
+# the family that may still be used; presenting any other token of the family means
+# a refresh token was stolen and replayed, so the whole family is revoked.
+#
+# KEYS[1]: the family key, KEYS[2]: the revocation marker of the family
+# ARGV[1]: ID of the presented token, ARGV[2]: ID of its successor, ARGV[3]: lifetime in milliseconds
+# Returns 1 when rotated, -1 on reuse (the family is then revoked), -2 when the family
+# was revoked and 0 when Redis does not know it.
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        return -2
+    end
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('SET', KEYS[2], '1', 'PX', ARGV[3])
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+return 1
+"""
+
+
+def unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+class RefreshTokenStore:
+    """
+    Refresh tokens grouped in families, rotated on every use and revocable.
+
+    Each login starts a family; every refresh replaces the family's token with a new
+    one, and replaying a replaced token revokes the family, logging out both the thief
+    and the victim. Families live in Redis with the lifetime of their last token, so a
+    refresh does not touch the database. Revoked families are remembered for the same
+    lifetime.
+
+    When ``backend`` is ``"database"``, or Redis fails, tokens fall back to
+    ``User.refresh_token``: one family per user, with the same rotation and reuse
+    detection. After a failure Redis is retried every ``redis_retry`` seconds. Tokens
+    Redis does not know, e.g. issued during an outage, are checked against the
+    database and moved to Redis on their next rotation. While Redis is unavailable a
+    token the database does not hold is answered with 503 rather than revoked, since
+    it may belong to a family kept in Redis.
+
+    :param backend: ``"redis"`` or ``"database"``.
+    :type backend: str
+    :param ttl: Lifetime of a refresh token in seconds.
+    :type ttl: int
+    :param redis_retry: Seconds the database is used after Redis fails.
+    :type redis_retry: float
+    :param timer: Monotonic clock, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    prefix = "refresh:"
+
+    def __init__(self, backend: str = "redis", ttl: int = 7 * 24 * 3600, redis_retry: float = 5.0,
+                 timer: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self.redis_retry = redis_retry
+        self.timer = timer
+        self._redis_down_until = 0.0
+        self._scripts = {}
+
+    def _redis(self):
+        if self.backend != "redis" or self._redis_down_until > self.timer():
+            return None
+        return get_redis()
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning("Refresh token store cannot reach Redis, using the database for %ss: %s", self.redis_retry, error)
+        self._redis_down_until = self.timer() + self.redis_retry
+
+    def _script(self, client):
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = self._scripts[id(client)] = client.register_script(ROTATE_SCRIPT)
+        return script
+
+    def _keys(self, family: str) -> Tuple[str, str]:
+        return f"{self.prefix}family:{family}", f"{self.prefix}revoked:{family}"
+
+    def _encode(self, email: str, family: str, token_id: str) -> str:
+        now = datetime.utcnow()
+        return token_codec.encode({
+            "sub": email, "fam": family, "jti": token_id, "scope": "refresh_token",
+            "iat": now, "exp": now + timedelta(seconds=self.ttl),
+        })
+
+    def _claims(self, token: str) -> dict:
+        try:
+            claims = token_codec.decode(token, cache=False)
+        except JWTError:
+            raise unauthorized("Could not validate credentials")
+        if claims.get("scope") != "refresh_token" or not claims.get("sub"):
+            raise unauthorized("Invalid scope for token")
+        return claims
+
+    def _issue_in_redis(self, email: str) -> Optional[str]:
+        client = self._redis()
+        if client is None:
+            return None
+        family, token_id = uuid.uuid4().hex, uuid.uuid4().hex
+        family_key, _ = self._keys(family)
+        user_key = f"{self.prefix}user:{email}"
+        try:
+            with client.pipeline() as pipe:
+                pipe.set(family_key, token_id, px=self.ttl * 1000)
+                pipe.sadd(user_key, family)
+                pipe.pexpire(user_key, self.ttl * 1000)
+                pipe.execute()
+        except RedisError as e:
+            self._redis_failed(e)
+            return None
+        return self._encode(email, family, token_id)
+
+    def issue(self, user, db: Session) -> str:
+        """
+        Start a token family for a user who just logged in.
+
+        :param user: The authenticated user.
+        :type user: User
+        :param db: Database session, used only without Redis.
+        :type db: Session
+        :return: The first refresh token of the family.
+        :rtype: str
+        """
+        from app.repository import users as repository_users
+
+        token = self._issue_in_redis(user.email)
+        if token is None:
+            token = self._encode(user.email, uuid.uuid4().hex, uuid.uuid4().hex)
+            repository_users.update_token(user, token, db)
+        return token
+
+    def rotate(self, token: str, db: Session) -> Tuple[str, str]:
+        """
+        Exchange a refresh token for its successor.
+
+        :param token: The presented refresh token.
+        :type token: str
+        :param db: Database session, used only for tokens Redis does not know.
+        :type db: Session
+        :raises HTTPException: 401 if the token is invalid, revoked or replayed; 503 with
+            ``Retry-After`` if Redis is unavailable and the database does not hold the token.
+        :return: The user's email and the new refresh token.
+        :rtype: Tuple[str, str]
+        """
+        claims = self._claims(token)
+        email, family, token_id = claims["sub"], claims.get("fam"), claims.get("jti")
+        in_redis = self.backend == "redis" and bool(family and token_id)
+        client = self._redis() if in_redis else None
+        if client is not None:
+            new_id = uuid.uuid4().hex
+            try:
+                result = self._script(client)(keys=list(self._keys(family)), args=[token_id, new_id, self.ttl * 1000])
+            except RedisError as e:
+                self._redis_failed(e)
+                client = None
+            else:
+                if result == 1:
+                    return email, self._encode(email, family, new_id)
+                if result == -1:
+                    logger.warning("Refresh token reuse for %s, token family %s revoked", email, family)
+                    raise unauthorized("Refresh token reuse detected")
+                if result == -2:
+                    raise unauthorized("Refresh token revoked")
+        # Without Redis a token the database does not hold may be a live Redis family, not a replay
+        return email, self._rotate_in_database(email, token, db, detect_reuse=not in_redis or client is not None)
+
+    def _rotate_in_database(self, email: str, token: str, db: Session, detect_reuse: bool = True) -> str:
+        from app.repository import users as repository_users
+
+        user = repository_users.get_user_by_email(email, db)
+        if not user:
+            raise unauthorized("User not found")
+        if user.refresh_token != token:
+            if not detect_reuse:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Refresh tokens are temporarily unavailable",
+                    headers={"Retry-After": str(max(1, math.ceil(self.redis_retry)))},
+                )
+            repository_users.update_token(user, None, db)
+            raise unauthorized("Invalid refresh token")
+        new_token = self._issue_in_redis(email)
+        if new_token is not None:
+            # The family moved to Redis, so the stored token must not be accepted again
+            repository_users.update_token(user, None, db)
+        else:
+            new_token = self._encode(email, uuid.uuid4().hex, uuid.uuid4().hex)
+            repository_users.update_token(user, new_token, db)
+        return new_token
+
+    def revoke(self, token: str, db: Session) -> None:
+        """
+        Revoke the family of a refresh token, e.g. on logout.
+
+        :param token: A refresh token of the family.
+        :type token: str
+        :param db: Database session, used only without Redis.
+        :type db: Session
+        :raises HTTPException: 401 if the token is invalid.
+        """
+        from app.repository import users as repository_users
+
+        claims = self._claims(token)
+        family = claims.get("fam")
+        client = self._redis() if family else None
+        if client is not None:
+            family_key, revoked_key = self._keys(family)
+            try:
+                with client.pipeline() as pipe:
+                    pipe.delete(family_key)
+                    pipe.set(revoked_key, "1", px=self.ttl * 1000)
+                    pipe.srem(f"{self.prefix}user:{claims['sub']}", family)
+                    pipe.execute()
+                return
+            except RedisError as e:
+                self._redis_failed(e)
+        user = repository_users.get_user_by_email(claims["sub"], db)
+        if user is not None and user.refresh_token == token:
+            repository_users.update_token(user, None, db)
+
+    def revoke_user(self, email: str) -> None:
+        """
+        Revoke every token family of a user kept in Redis.
+
+        :param email: The user's email.
+        :type email: str
+        """
+        client = self._redis()
+        if client is None:
+            return
+        user_key = f"{self.prefix}user:{email}"
+        try:
+            families = client.smembers(user_key)
+            with client.pipeline() as pipe:
+                for family in families:
+                    family_key, revoked_key = self._keys(family)
+                    pipe.delete(family_key)
+                    pipe.set(revoked_key, "1", px=self.ttl * 1000)
+                pipe.delete(user_key)
+                pipe.execute()
+        except RedisError as e:
+            self._redis_failed(e)
+
+
+refresh_tokens = RefreshTokenStore(
+    backend=settings.REFRESH_TOKEN_BACKEND,
+    ttl=settings.REFRESH_TOKEN_TTL,
+    redis_retry=settings.REFRESH_TOKEN_REDIS_RETRY,
+)
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+try:
+    from redis import RedisError
+except ImportError:  # redis is an optional dependency
+    RedisError = OSError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    """
+    A serialised JSON response with its entity tag.
+    """
+    etag: str
+    body: bytes
+    headers: Dict[str, str]
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Build a strong entity tag from a response body.
+
+    :param body: The serialised body.
+    :type body: bytes
+    :return: The quoted entity tag.
+    :rtype: str
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an ``If-None-Match`` header against an entity tag, using weak comparison.
+
+    :param if_none_match: The header value.
+    :type if_none_match: str, optional
+    :param etag: The current entity tag.
+    :type etag: str
+    :return: Whether the client's copy is current.
+    :rtype: bool
+    """
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
+class ResponseCache:
+    """
+    Per-user cache of serialised GET responses, invalidated by a generation counter.
+
+    Every user has a generation number that is part of all their cache keys. A write
+    to any of the user's contacts bumps the generation, so every page and contact
+    cached before it is never looked up again and ages out of the cache. Entries live
+    in an in-process :class:`TTLCache` or, with ``backend="redis"``, in Redis, which
+    is needed for writes on one worker to invalidate the others.
+
+    Invalidations run after the write is committed, so Redis failures never fail a
+    request: responses are neither looked up nor stored for ``redis_retry`` seconds,
+    and an invalidation lost to the failure is bounded by ``ttl``, after which every
+    entry of the old generation has expired.
+
+    :param enabled: Whether responses are cached at all.
+    :type enabled: bool
+    :param ttl: Lifetime of an entry in seconds.
+    :type ttl: int
+    :param maxsize: Maximum number of in-process entries.
+    :type maxsize: int
+    :param backend: ``"memory"`` or ``"redis"``.
+    :type backend: str
+    :param redis_retry: Seconds the cache is bypassed after Redis fails.
+    :type redis_retry: float
+    :param timer: Monotonic clock, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    prefix = "response:"
+
+    def __init__(self, enabled: bool = True, ttl: int = 60, maxsize: int = 10000, backend: str = "memory",
+                 redis_retry: float = 5.0, timer: Callable[[], float] = time.monotonic):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.backend = backend
+        self.redis_retry = redis_retry
+        self.timer = timer
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis_down_until = 0.0
+        # Generations are never evicted: restarting one from 0 could serve entries cached under it before
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        return get_redis() if self.backend == "redis" else None
+
+    def _async_redis(self):
+        return get_async_redis() if self.backend == "redis" else None
+
+    def _redis_up(self) -> bool:
+        return self._redis_down_until <= self.timer()
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning("Response cache cannot reach Redis, bypassing it for %ss: %s", self.redis_retry, error)
+        self._redis_down_until = self.timer() + self.redis_retry
+
+    def generation(self, user_id: int) -> int:
+        """
+        Return the current generation of a user's cached responses.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+        :raises RedisError: If Redis fails.
+        :return: The generation number.
+        :rtype: int
+        """
+        client = self._redis()
+        if client is not None:
+            key = f"{self.prefix}gen:{user_id}"
+            generation = client.get(key)
+            if generation is None:
+                # Start from the clock so a generation key lost to eviction is not reused
+                client.set(key, time.time_ns(), nx=True)
+                generation = client.get(key)
+            return int(generation)
+        return self._generations.get(user_id, 0)
+
+    def lookup(self, user_id: int, key: str) -> Tuple[Optional[str], Optional[CachedResponse]]:
+        """
+        Look a response up under the user's current generation.
+
+        The generation is read before the caller queries the database, so a response
+        stored after a concurrent write is filed under the old generation and never served.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+        :param key: Key of the response within the user's cache, e.g. ``contact:5``.
+        :type key: str
+        :return: The key to :meth:`store` the response under, and the cached response if any;
+            no key while the cache is disabled or Redis is failing.
+        :rtype: Tuple[str | None, CachedResponse | None]
+        """
+        if not self.enabled:
+            return None, None
+        client = self._redis()
+        if client is not None:
+            if not self._redis_up():
+                return None, None
+            try:
+                scoped = f"{user_id}:{self.generation(user_id)}:{key}"
+                raw = client.get(self.prefix + scoped)
+            except RedisError as e:
+                self._redis_failed(e)
+                return None, None
+            return scoped, self._decode(raw)
+        scoped = f"{user_id}:{self.generation(user_id)}:{key}"
+        return scoped, self.local.get(scoped)
+
+    async def lookup_async(self, user_id: int, key: str) -> Tuple[Optional[str], Optional[CachedResponse]]:
+        """
+        Async counterpart of :meth:`lookup` for ``async def`` routes.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+        :param key: Key of the response within the user's cache.
+        :type key: str
+        :return: The key to :meth:`store_async` the response under, and the cached response if any.
+        :rtype: Tuple[str | None, CachedResponse | None]
+        """
+        client = self._async_redis() if self.enabled else None
+        if client is None:
+            return self.lookup(user_id, key)
+        if not self._redis_up():
+            return None, None
+        try:
+            scoped = f"{user_id}:{await self._generation_async(client, user_id)}:{key}"
+            raw = await client.get(self.prefix + scoped)
+        except RedisError as e:
+            self._redis_failed(e)
+            return None, None
+        return scoped, self._decode(raw)
+
+    async def _generation_async(self, client, user_id: int) -> int:
+        key = f"{self.prefix}gen:{user_id}"
+        generation = await client.get(key)
+        if generation is None:
+            await client.set(key, time.time_ns(), nx=True)
+            generation = await client.get(key)
+        return int(generation)
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[CachedResponse]:
+        if raw is None:
+            return None
+        item = json.loads(raw)
+        return CachedResponse(item["etag"], item["body"].encode(), item["headers"])
+
+    @staticmethod
+    def _encode(cached: CachedResponse) -> str:
+        return json.dumps({"etag": cached.etag, "body": cached.body.decode(), "headers": cached.headers})
+
+    def store(self, scoped: Optional[str], body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        Build a cached response and store it under a key returned by :meth:`lookup`.
+
+        :param scoped: The key from :meth:`lookup`; nothing is stored when None.
+        :type scoped: str, optional
+        :param body: The serialised JSON body.
+        :type body: bytes
+        :param headers: Extra headers to send with the body.
+        :type headers: Dict[str, str], optional
+        :return: The response.
+        :rtype: CachedResponse
+        """
+        cached = CachedResponse(make_etag(body), body, headers or {})
+        if scoped is None:
+            return cached
+        client = self._redis()
+        if client is not None:
+            try:
+                client.set(self.prefix + scoped, self._encode(cached), ex=self.ttl)
+            except RedisError as e:
+                self._redis_failed(e)
+        else:
+            self.local.set(scoped, cached)
+        return cached
+
+    async def store_async(self, scoped: Optional[str], body: bytes,
+                          headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        Async counterpart of :meth:`store` for ``async def`` routes.
+
+        :param scoped: The key from :meth:`lookup_async`; nothing is stored when None.
+        :type scoped: str, optional
+        :param body: The serialised JSON body.
+        :type body: bytes
+        :param headers: Extra headers to send with the body.
+        :type headers: Dict[str, str], optional
+        :return: The response.
+        :rtype: CachedResponse
+        """
+        client = self._async_redis() if scoped is not None else None
+        if client is None:
+            return self.store(scoped, body, headers)
+        cached = CachedResponse(make_etag(body), body, headers or {})
+        try:
+            await client.set(self.prefix + scoped, self._encode(cached), ex=self.ttl)
+        except RedisError as e:
+            self._redis_failed(e)
+        return cached
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drop every cached response of a user by moving them to a new generation.
+
+        Called after the write is committed, so a Redis failure is logged rather than raised.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+        """
+        client = self._redis()
+        if client is not None:
+            key = f"{self.prefix}gen:{user_id}"
+            try:
+                client.set(key, time.time_ns(), nx=True)
+                client.incr(key)
+            except RedisError as e:
+                self._redis_failed(e)
+            return
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    async def invalidate_async(self, user_id: int) -> None:
+        """
+        Async counterpart of :meth:`invalidate` for async repositories.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+        """
+        client = self._async_redis()
+        if client is None:
+            self.invalidate(user_id)
+            return
+        key = f"{self.prefix}gen:{user_id}"
+        try:
+            await client.set(key, time.time_ns(), nx=True)
+            await client.incr(key)
+        except RedisError as e:
+            self._redis_failed(e)
+
+    @staticmethod
+    def respond(request: Request, cached: CachedResponse) -> Response:
+        """
+        Answer a GET with a cached response, or with 304 if the client's copy is current.
+
+        :param request: The request, whose ``If-None-Match`` header is checked.
+        :type request: Request
+        :param cached: The response.
+        :type cached: CachedResponse
+        :return: A 200 response with the body, or a 304 one without.
+        :rtype: Response
+        """
+        headers = {**cached.headers, "ETag": cached.etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(cached.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    backend=settings.RESPONSE_CACHE_BACKEND,
+    redis_retry=settings.RESPONSE_CACHE_REDIS_RETRY,
+)
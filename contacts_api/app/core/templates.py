@@ -0,0 +1,132 @@
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+from app.core.config import settings
+
+TEMPLATE_FOLDER = Path(__file__).resolve().parent.parent / 'templates'
+LOCALE_PATTERN = re.compile(r'[a-z]{2,3}(-[a-z0-9]{2,8})*')
+
+
+class EmailTemplates:
+    """
+    Compiled Jinja email templates with per-locale variants.
+
+    A locale variant lives in a sub-folder named after the locale, e.g.
+    ``uk/email_template.html``. Lookups fall back from ``uk-UA`` to ``uk`` and then to
+    the template in the root folder. Templates are compiled once, by :meth:`preload`
+    at startup or on first use, and the resolved template for every
+    ``(name, locale)`` pair is memoised, so rendering never touches the file system.
+
+    :param folder: Folder holding the templates.
+    :type folder: Path
+    :param default_locale: Locale of the templates in the root folder.
+    :type default_locale: str
+    """
+
+    MAX_RESOLVED = 1024
+
+    def __init__(self, folder: Path = TEMPLATE_FOLDER, default_locale: str = 'en'):
+        self.default_locale = default_locale
+        self.env = Environment(
+            loader=FileSystemLoader(str(folder)),
+            autoescape=select_autoescape(['html', 'xml']),
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self._resolved: Dict[Tuple[str, str], Template] = {}
+        self._lock = threading.Lock()
+
+    def preload(self) -> int:
+        """
+        Compile every template in the folder.
+
+        :return: Number of templates compiled.
+        :rtype: int
+        """
+        names = self.env.list_templates()
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    def _candidates(self, name: str, locale: str) -> List[str]:
+        locale = locale.replace('_', '-').lower()
+        if not LOCALE_PATTERN.fullmatch(locale):
+            return [name]
+        candidates = [f"{locale}/{name}"]
+        if '-' in locale:
+            candidates.append(f"{locale.split('-')[0]}/{name}")
+        candidates.append(name)
+        return candidates
+
+    def get(self, name: str, locale: Optional[str] = None) -> Template:
+        """
+        Return the compiled template for a locale, falling back to the default one.
+
+        :param name: Template file name, e.g. ``email_template.html``.
+        :type name: str
+        :param locale: Locale such as ``uk`` or ``en-GB``.
+        :type locale: str, optional
+        :raises TemplateNotFound: If no variant of the template exists.
+        :return: The compiled template.
+        :rtype: Template
+        """
+        key = (name, locale or self.default_locale)
+        template = self._resolved.get(key)
+        if template is None:
+            template = self.env.select_template(self._candidates(name, key[1]))
+            with self._lock:
+                # Locales come from request headers; do not let them grow the memo without bound
+                if len(self._resolved) < self.MAX_RESOLVED:
+                    self._resolved[key] = template
+        return template
+
+    def render(self, name: str, locale: Optional[str] = None, **context) -> str:
+        """
+        Render a template.
+
+        :param name: Template file name.
+        :type name: str
+        :param locale: Locale of the variant to use.
+        :type locale: str, optional
+        :return: The rendered text.
+        :rtype: str
+        """
+        return self.get(name, locale).render(**context)
+
+    def render_many(self, name: str, contexts: Iterable[dict], locale: Optional[str] = None) -> List[str]:
+        """
+        Render one template for many recipients, resolving the template only once.
+
+        :param name: Template file name.
+        :type name: str
+        :param contexts: One context per message.
+        :type contexts: Iterable[dict]
+        :param locale: Locale of the variant to use.
+        :type locale: str, optional
+        :return: The rendered texts, in the order of ``contexts``.
+        :rtype: List[str]
+        """
+        template = self.get(name, locale)
+        return [template.render(context) for context in contexts]
+
+
+def preferred_locale(accept_language: Optional[str]) -> Optional[str]:
+    """
+    Pick the first language of an ``Accept-Language`` header.
+
+    :param accept_language: The header value, e.g. ``uk-UA,uk;q=0.9,en;q=0.8``.
+    :type accept_language: str, optional
+    :return: The first language tag, or None.
+    :rtype: str, optional
+    """
+    if not accept_language:
+        return None
+    tag = accept_language.split(',')[0].split(';')[0].strip()
+    return tag if tag and tag != '*' else None
+
+
+email_templates = EmailTemplates(default_locale=settings.MAIL_DEFAULT_LOCALE)
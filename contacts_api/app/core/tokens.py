@@ -0,0 +1,250 @@
+import base64
+import calendar
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from jose import JWTError, jwk, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+except ImportError:  # cryptography is optional; without it EdDSA keys are unavailable
+    serialization = None
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+HMAC_ALGORITHMS = ("HS256", "HS384", "HS512")
+ASYMMETRIC_ALGORITHMS = ("ES256", "ES384", "ES512", "RS256", "RS384", "RS512", "EdDSA")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _require_cryptography() -> None:
+    if serialization is None:
+        raise RuntimeError("EdDSA tokens need the cryptography package")
+
+
+class TokenCodec:
+    """
+    Signs and verifies JWTs, keeping the claims of verified tokens until they expire.
+
+    Tokens are signed with ``algorithm``: an HMAC algorithm with ``secret_key``, or an
+    asymmetric one (ES256, RS256, EdDSA...) with ``private_key``, whose public half
+    :meth:`jwks` publishes so other services can verify tokens without the secret.
+    Asymmetric tokens carry ``key_id`` in their ``kid`` header and are verified with
+    the key of that ID only, in its own algorithm; ``public_keys`` adds keys that are
+    only verified, e.g. the previous key while rotating. Tokens without a ``kid`` are
+    verified with ``secret_key`` in ``algorithm`` when it is an HMAC algorithm; with an
+    asymmetric ``algorithm`` they are rejected, unless ``legacy_algorithm`` names the
+    HMAC algorithm they were signed with while clients move over to the new keys.
+
+    Decoding is the most frequent cryptographic operation of the API, so the claims of
+    a verified token are cached under a digest of the token until its ``exp``.
+
+    :param algorithm: Algorithm new tokens are signed with.
+    :type algorithm: str
+    :param secret_key: HMAC secret.
+    :type secret_key: str, optional
+    :param private_key: PEM private key for an asymmetric ``algorithm``.
+    :type private_key: str, optional
+    :param key_id: ID of ``private_key``.
+    :type key_id: str, optional
+    :param public_keys: Extra verification keys as a JWK Set (``{"keys": [...]}``).
+    :type public_keys: dict, optional
+    :param legacy_algorithm: HMAC algorithm of ``secret_key`` tokens still accepted with an asymmetric ``algorithm``.
+    :type legacy_algorithm: str, optional
+    :param cache_size: Maximum number of cached tokens, 0 to disable the cache.
+    :type cache_size: int
+    :param timer: Wall clock in seconds, replaceable in tests.
+    :type timer: Callable[[], float]
+    """
+
+    def __init__(self, algorithm: str = "HS256", secret_key: Optional[str] = None, private_key: Optional[str] = None,
+                 key_id: Optional[str] = None, public_keys: Optional[dict] = None,
+                 legacy_algorithm: Optional[str] = None, cache_size: int = 10000,
+                 timer: Callable[[], float] = time.time):
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        if legacy_algorithm is not None and legacy_algorithm not in HMAC_ALGORITHMS:
+            raise ValueError(f"Legacy tokens must use an HMAC algorithm, not {legacy_algorithm}")
+        # The only algorithm tokens without a kid are verified with
+        self.secret_algorithm = algorithm if algorithm in HMAC_ALGORITHMS else legacy_algorithm
+        self.key_id = key_id
+        self.timer = timer
+        self.cache = TTLCache(maxsize=cache_size, ttl=0) if cache_size else None
+        # kid -> (algorithm, verification key, public JWK)
+        self._keys: Dict[str, Tuple[str, Any, dict]] = {}
+        self._signing_key = None
+
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            if not private_key or not key_id:
+                raise ValueError(f"{algorithm} tokens need a private key and a key ID")
+            if algorithm == "EdDSA":
+                _require_cryptography()
+                self._signing_key = serialization.load_pem_private_key(private_key.encode(), password=None)
+                if not isinstance(self._signing_key, Ed25519PrivateKey):
+                    raise ValueError("EdDSA tokens need an Ed25519 private key")
+                public = self._signing_key.public_key().public_bytes(
+                    serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+                self.add_public_key({"kty": "OKP", "crv": "Ed25519", "x": _b64encode(public), "kid": key_id})
+            else:
+                self._signing_key = private_key
+                public = jwk.construct(private_key, algorithm).public_key().to_dict()
+                self.add_public_key({**public, "kid": key_id})
+        elif algorithm not in HMAC_ALGORITHMS:
+            raise ValueError(f"Unsupported token algorithm {algorithm}")
+        for key in (public_keys or {}).get("keys", []):
+            self.add_public_key(key)
+
+    def add_public_key(self, key: dict) -> None:
+        """
+        Accept tokens signed by the private half of a public JWK.
+
+        :param key: The JWK, with ``kid``; ``alg`` is inferred from the key type when missing.
+        :type key: dict
+        :raises ValueError: If the key has no ID or an unsupported type.
+        """
+        if not key.get("kid"):
+            raise ValueError("Verification keys need a kid")
+        if key.get("kty") == "OKP" and key.get("crv") == "Ed25519":
+            _require_cryptography()
+            algorithm = "EdDSA"
+            verifier = Ed25519PublicKey.from_public_bytes(_b64decode(key["x"]))
+        elif key.get("kty") in ("EC", "RSA"):
+            curves = {"P-256": "ES256", "P-384": "ES384", "P-521": "ES512"}
+            algorithm = key.get("alg") or (curves.get(key.get("crv")) if key["kty"] == "EC" else "RS256")
+            verifier = key
+        else:
+            raise ValueError(f"Unsupported key type {key.get('kty')}")
+        public = {k: v for k, v in key.items() if k not in ("d", "p", "q", "dp", "dq", "qi")}
+        self._keys[key["kid"]] = (algorithm, verifier, {**public, "alg": algorithm, "use": "sig"})
+
+    def jwks(self) -> dict:
+        """
+        Return the public keys tokens are verified with, as a JWK Set.
+
+        :return: The JWK Set.
+        :rtype: dict
+        """
+        return {"keys": [public for _, _, public in self._keys.values()]}
+
+    def encode(self, claims: dict) -> str:
+        """
+        Sign claims into a token.
+
+        :param claims: The claims; ``datetime`` values are converted to timestamps.
+        :type claims: dict
+        :return: The token.
+        :rtype: str
+        """
+        if self.algorithm in HMAC_ALGORITHMS:
+            return jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+        if self.algorithm != "EdDSA":
+            return jwt.encode(claims, self._signing_key, algorithm=self.algorithm, headers={"kid": self.key_id})
+        claims = {k: calendar.timegm(v.utctimetuple()) if isinstance(v, datetime) else v for k, v in claims.items()}
+        header = {"alg": "EdDSA", "typ": "JWT", "kid": self.key_id}
+        signing_input = ".".join(
+            _b64encode(json.dumps(part, separators=(",", ":")).encode()) for part in (header, claims))
+        return signing_input + "." + _b64encode(self._signing_key.sign(signing_input.encode()))
+
+    def _decode_eddsa(self, token: str, verifier: "Ed25519PublicKey") -> dict:
+        try:
+            signing_input, _, signature = token.rpartition(".")
+            verifier.verify(_b64decode(signature), signing_input.encode())
+            claims = json.loads(_b64decode(signing_input.split(".")[1]))
+        except (InvalidSignature, ValueError, IndexError) as e:
+            raise JWTError("Signature verification failed") from e
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload")
+        for claim in ("exp", "nbf"):
+            if claim in claims and (isinstance(claims[claim], bool) or not isinstance(claims[claim], (int, float))):
+                raise JWTClaimsError(f"The {claim} claim must be a number")
+        now = self.timer()
+        if "exp" in claims and claims["exp"] <= now:
+            raise ExpiredSignatureError("Signature has expired")
+        if "nbf" in claims and claims["nbf"] > now:
+            raise JWTClaimsError("The token is not yet valid")
+        return claims
+
+    def _verify(self, token: str) -> dict:
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid")
+        if kid is None:
+            if not self.secret_key or self.secret_algorithm is None:
+                raise JWTError("Token has no key ID")
+            return jwt.decode(token, self.secret_key, algorithms=[self.secret_algorithm])
+        if kid not in self._keys:
+            raise JWTError("Unknown key ID")
+        algorithm, verifier, _ = self._keys[kid]
+        # Only the key's own algorithm is accepted, so a public key can never act as an HMAC secret
+        if header.get("alg") != algorithm:
+            raise JWTError("Algorithm does not match the key")
+        if algorithm == "EdDSA":
+            return self._decode_eddsa(token, verifier)
+        return jwt.decode(token, verifier, algorithms=[algorithm])
+
+    def decode(self, token: str, cache: bool = True) -> dict:
+        """
+        Verify a token and return its claims.
+
+        :param token: The token.
+        :type token: str
+        :param cache: Whether the claims may come from, and are kept in, the cache.
+        :type cache: bool
+        :raises JWTError: If the token is malformed, forged, expired or signed with an unknown key.
+        :return: The claims. They are shared with the cache and must not be modified.
+        :rtype: dict
+        """
+        use_cache = cache and self.cache is not None
+        if use_cache:
+            digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+            claims = self.cache.get(digest)
+            if claims is not None:
+                return claims
+        claims = self._verify(token)
+        if use_cache and isinstance(claims.get("exp"), (int, float)):
+            ttl = claims["exp"] - self.timer()
+            if ttl > 0:
+                self.cache.set(digest, claims, ttl=ttl)
+        return claims
+
+
+def _read(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+def build_token_codec() -> TokenCodec:
+    """
+    Build the codec described by ``ALGORITHM``, ``SECRET_KEY`` and the ``JWT_*`` and ``TOKEN_*`` settings.
+
+    :return: The token codec.
+    :rtype: TokenCodec
+    """
+    public_keys = _read(settings.JWT_PUBLIC_KEYS_FILE)
+    return TokenCodec(
+        algorithm=settings.ALGORITHM,
+        secret_key=settings.SECRET_KEY,
+        private_key=_read(settings.JWT_PRIVATE_KEY_FILE),
+        key_id=settings.JWT_KEY_ID,
+        public_keys=json.loads(public_keys) if public_keys else None,
+        legacy_algorithm=settings.JWT_LEGACY_ALGORITHM,
+        cache_size=settings.TOKEN_CACHE_SIZE if settings.TOKEN_CACHE_ENABLED else 0,
+    )
+
+
+token_codec = build_token_codec()
@@ -1,19 +1,106 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from app.core.config import settings
+from app.db.pool_metrics import pool_metrics, timed_pool_class
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Build the ``create_engine`` keyword arguments for the pool settings.
+
+    With ``DB_PGBOUNCER`` the application keeps no pool of its own (PgBouncer does the
+    pooling) and asyncpg prepared statement caches are disabled, since they do not
+    survive transaction pooling.
+
+    :param url: The database URL.
+    :type url: str
+    :param is_async: Whether the options are for the async engine.
+    :type is_async: bool
+    :return: Keyword arguments for ``create_engine`` or ``create_async_engine``.
+    :rtype: dict
+    """
+    url = make_url(url)
+    metrics = pool_metrics['async' if is_async else 'sync']
+    options = {'pool_pre_ping': settings.DB_POOL_PRE_PING}
+
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory databases live in a single connection; keep SQLAlchemy's default pool
+        return options
+
+    if settings.DB_PGBOUNCER:
+        options['poolclass'] = timed_pool_class(NullPool, metrics)
+        if url.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+        return options
+
+    options.update(
+        poolclass=timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, metrics),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+pool_metrics['sync'].attach(engine.pool)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+_async_engine = None
+_async_session_factory = None
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def async_database_url() -> str:
+    """
+    Return the URL of the async engine.
+
+    ``settings.ASYNC_DATABASE_URL`` wins when set, otherwise ``DATABASE_URL`` is reused
+    with its driver swapped for asyncpg (Postgres) or aiosqlite (SQLite).
+
+    :return: The database URL for the async engine.
+    :rtype: str
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+def get_async_engine():
+    """
+    Return the async engine, creating it on first use.
+
+    :return: The async engine.
+    :rtype: AsyncEngine
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        pool_metrics['async'].attach(_async_engine.sync_engine.pool)
+        _async_session_factory = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, func
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, ForeignKey, Index, DDL, event, func
 from sqlalchemy.orm import relationship
 from .database import Base
-from app.db.database import engine
+
+def utcnow() -> datetime:
+    """
+    Current UTC time as a naive datetime, with microseconds so changes order reliably.
+
+    :return: The current time.
+    :rtype: datetime
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class Contact(Base):
     __tablename__ = 'contacts'
@@ -11,11 +21,97 @@ class Contact(Base):
     email = Column(String, unique=True, index=True)
     phone_number = Column(String, index=True)
     birthday = Column(Date)
+    birthday_doy = Column(SmallInteger, nullable=True)  # Day of year of the birthday, see birthday_doy()
     additional_info = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey('users.id'))  # Foreign key to the User table
+    updated_at = Column(DateTime, nullable=False, default=utcnow, onupdate=utcnow)  # Set by every insert and update
 
     user = relationship("User", back_populates="contacts")  # Relationship to the User model
 
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),  # Keyset pagination per user
+        Index('ix_contacts_user_id_birthday_doy', 'user_id', 'birthday_doy'),  # Upcoming birthdays per user
+        Index('ix_contacts_user_id_updated_at', 'user_id', 'updated_at', 'id'),  # Changes per user
+    )
+
+class ContactTombstone(Base):
+    """
+    Record of a deleted contact, so clients syncing changes learn about the deletion.
+    """
+    __tablename__ = 'contact_tombstones'
+    id = Column(Integer, primary_key=True)
+    contact_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index('ix_contact_tombstones_user_id_deleted_at', 'user_id', 'deleted_at', 'contact_id'),  # Deletions per user
+    )
+
+class ContactCounter(Base):
+    """
+    Materialised count of a user's contacts, kept in step by every write of the contacts repository.
+
+    ``name`` is ``total``, ``month:<1-12>`` for birthdays by month or ``domain:<domain>``
+    for email domains, see :func:`app.repository.contacts.counter_names`.
+    """
+    __tablename__ = 'contact_counters'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    name = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+def birthday_doy(birthday: Optional[date]) -> Optional[int]:
+    """
+    Day of year of a birthday, counted in a leap year so 29 February is always 60
+    and every other date keeps the same number whatever the birth year.
+
+    :param birthday: The birthday.
+    :type birthday: date, optional
+    :return: A number between 1 and 366, or None without a birthday.
+    :rtype: int, optional
+    """
+    if birthday is None:
+        return None
+    return date(2000, birthday.month, birthday.day).timetuple().tm_yday
+
+# Concatenation of the searchable fields, used by the q= search on Postgres
+contact_search_text = (
+    func.coalesce(Contact.first_name, '') + ' ' + func.coalesce(Contact.last_name, '') + ' ' + func.coalesce(Contact.email, '')
+)
+
+# Postgres: trigram GIN indexes so ILIKE '%term%' and similarity() can use an index
+Index('ix_contacts_first_name_trgm', Contact.first_name, postgresql_using='gin',
+      postgresql_ops={'first_name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+Index('ix_contacts_last_name_trgm', Contact.last_name, postgresql_using='gin',
+      postgresql_ops={'last_name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+Index('ix_contacts_email_trgm', Contact.email, postgresql_using='gin',
+      postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+Index('ix_contacts_search_text_trgm', contact_search_text.label('search_text'), postgresql_using='gin',
+      postgresql_ops={'search_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+event.listen(Contact.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+# SQLite: external-content FTS5 table kept in sync by triggers; user_id scopes matches to one tenant
+CONTACTS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+    "first_name, last_name, email, user_id UNINDEXED, content='contacts', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email, user_id) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email, user_id) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    "INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email, user_id) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.user_id); "
+    "INSERT INTO contacts_fts(rowid, first_name, last_name, email, user_id) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.user_id); END",
+]
+
+for _statement in CONTACTS_FTS_DDL:
+    event.listen(Contact.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS contacts_fts').execute_if(dialect='sqlite'))
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
@@ -27,5 +123,3 @@ class User(Base):
     refresh_token = Column(String(255), nullable=True)
 
     contacts = relationship("Contact", back_populates="user", cascade="all, delete-orphan")  # Relationship to the Contact model
-       
-Base.metadata.create_all(bind=engine)
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """
+    Connection pool telemetry for one engine.
+
+    Counters come from the SQLAlchemy pool events (``connect``, ``checkout``, ``checkin``,
+    ``invalidate``). SQLAlchemy has no event for the start of a checkout, so the wait time
+    is recorded by the pool class returned from :func:`timed_pool_class`.
+
+    :param name: Label of the engine in the exported metrics.
+    :type name: str
+    :param samples: Number of recent wait times kept for percentiles.
+    :type samples: int
+    """
+
+    def __init__(self, name: str, samples: int = 1024):
+        self.name = name
+        self.pool = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.max_checked_out = 0
+        self.max_overflow_in_use = 0
+        self._waits = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def attach(self, pool: Pool) -> None:
+        """
+        Listen to the events of a pool.
+
+        :param pool: The engine's pool.
+        :type pool: Pool
+        """
+        self.pool = pool
+        event.listen(pool, 'connect', self._on_connect)
+        event.listen(pool, 'checkout', self._on_checkout)
+        event.listen(pool, 'checkin', self._on_checkin)
+        event.listen(pool, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out())
+            self.max_overflow_in_use = max(self.max_overflow_in_use, self.overflow_in_use())
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        """
+        Record how long a checkout waited for a connection.
+
+        :param seconds: The wait time.
+        :type seconds: float
+        :param timed_out: Whether the checkout gave up with a pool timeout.
+        :type timed_out: bool
+        """
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.timeouts += timed_out
+            self._waits.append(seconds)
+
+    def checked_out(self) -> int:
+        checkedout = getattr(self.pool, 'checkedout', None)
+        return checkedout() if checkedout else 0
+
+    def overflow_in_use(self) -> int:
+        overflow = getattr(self.pool, 'overflow', None)
+        return max(0, overflow()) if overflow else 0
+
+    def snapshot(self) -> dict:
+        """
+        Return the current values of every metric.
+
+        :return: Metric name to value.
+        :rtype: dict
+        """
+        with self._lock:
+            waits = sorted(self._waits)
+
+            def pct(p):
+                return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+
+            size = getattr(self.pool, 'size', None)
+            return {
+                'pool_size': size() if size else 0,
+                'checked_out': self.checked_out(),
+                'overflow_in_use': self.overflow_in_use(),
+                'max_checked_out': self.max_checked_out,
+                'max_overflow_in_use': self.max_overflow_in_use,
+                'connects_total': self.connects,
+                'checkouts_total': self.checkouts,
+                'checkins_total': self.checkins,
+                'invalidations_total': self.invalidations,
+                'timeouts_total': self.timeouts,
+                'wait_seconds_count': self.wait_count,
+                'wait_seconds_sum': self.wait_sum,
+                'wait_seconds_max': self.wait_max,
+                'wait_seconds_p50': pct(0.50),
+                'wait_seconds_p99': pct(0.99),
+            }
+
+
+def timed_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """
+    Subclass a pool class so every checkout reports its wait time to ``metrics``.
+
+    :param base: The pool class to extend, e.g. QueuePool.
+    :type base: type
+    :param metrics: Where wait times are recorded.
+    :type metrics: PoolMetrics
+    :return: The instrumented pool class.
+    :rtype: type
+    """
+
+    class TimedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record_wait(time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.record_wait(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+pool_metrics = {
+    'sync': PoolMetrics('sync'),
+    'async': PoolMetrics('async'),
+}
+
+
+def render_prometheus() -> str:
+    """
+    Render the pool metrics of every engine in the Prometheus text format.
+
+    :return: The metrics page.
+    :rtype: str
+    """
+    lines = []
+    for engine_name, metrics in pool_metrics.items():
+        if metrics.pool is None:
+            continue
+        for key, value in metrics.snapshot().items():
+            lines.append(f'db_pool_{key}{{engine="{engine_name}"}} {value}')
+    return "\n".join(lines) + "\n"
@@ -1,31 +1,48 @@
-from fastapi import FastAPI, Query, Depends, HTTPException, Request
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import extract
-from datetime import date, timedelta
-from typing import List
+from contextlib import asynccontextmanager
 
-from app.db.database import engine, Base, get_db
-from app.db.models import Contact
-from app.routes import contacts as contacts_router, auth as auth_router
-from app.core.auth import auth_service
-from app.schemas import Contact as ContactSchema, User  # Import schema for response model and User
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.rate_limit import limiter
+from app.core.mail_queue import mail_dispatcher
+from app.core.templates import email_templates
+from app.db.database import engine
+from app.db.models import Base
+from app.routes import contacts as contacts_router, contacts_async as contacts_async_router, auth as auth_router, metrics as metrics_router
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.middleware import SlowAPIMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
-limiter = Limiter(key_func=get_remote_address)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create missing tables, compile the email templates and start the background workers
+    with the application, stop the workers on shutdown.
+
+    Nothing here runs at import, so importing the app stays cheap; integrations that
+    are only needed by some requests (Cloudinary, the Gravatar check) are set up on
+    first use instead.
+    """
+    if settings.DB_CREATE_SCHEMA:
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    email_templates.preload()
+    if settings.MAIL_WORKER_ENABLED:
+        await mail_dispatcher.start()
+    yield
+    await mail_dispatcher.stop()
 
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Include routers
 app.include_router(auth_router.router, prefix='/api')
+if settings.DB_ASYNC:
+    # Registered first so its handlers win over the sync ones on the same paths
+    app.include_router(contacts_async_router.router, prefix='/api')
 app.include_router(contacts_router.router, prefix='/api')
-
-# Create session maker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router.router)
 
 app.state.limiter = limiter
 app.add_middleware(
@@ -34,6 +51,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
@@ -49,84 +67,6 @@ def index(request: Request):
     """
     return {"message": "Welcome to my Contacts Project"}
 
-# Search contacts endpoint
-@app.get("/contacts/search/", response_model=List[ContactSchema])
-def search_contacts(
-    name: str = Query(None, description="Filter contacts by first name"),
-    surname: str = Query(None, description="Filter contacts by last name"),
-    email: str = Query(None, description="Filter contacts by email"),
-    current_user: User = Depends(auth_service.get_current_user)  # Ensure user is authorized
-):
-    """
-    Search contacts based on provided filters.
-
-    :param name: Filter contacts by first name.
-    :type name: str, optional
-    :param surname: Filter contacts by last name.
-    :type surname: str, optional
-    :param email: Filter contacts by email.
-    :type email: str, optional
-    :param current_user: The current authenticated user.
-    :type current_user: User
-    :raises HTTPException 401: If user authentication fails.
-    :return: A list of contacts matching the specified filters.
-    :rtype: List[ContactSchema]
-    """
-    with SessionLocal() as db:
-        filters = []
-        if name:
-            filters.append(Contact.first_name.ilike(f"%{name}%"))
-        if surname:
-            filters.append(Contact.last_name.ilike(f"%{surname}%"))
-        if email:
-            filters.append(Contact.email.ilike(f"%{email}%"))
-
-        if filters:
-            query = db.query(Contact).filter(*filters)
-        else:
-            query = db.query(Contact)
-
-        contacts = query.all()
-
-    return contacts
-
-# Upcoming birthdays endpoint
-@app.get("/contacts/birthdays/", response_model=List[ContactSchema])
-def upcoming_birthdays(
-    current_user: User = Depends(auth_service.get_current_user)  # Ensure user is authorized
-):
-    """
-    Retrieve contacts with upcoming birthdays within the next 7 days.
-
-    :param current_user: The current authenticated user.
-    :type current_user: User
-    :raises HTTPException 401: If user authentication fails.
-    :return: A list of contacts with upcoming birthdays.
-    :rtype: List[ContactSchema]
-    """
-    # Calculate dates for the next 7 days
-    start_date = date.today()
-    end_date = start_date + timedelta(days=7)
-
-    # Extract month and day from start and end dates
-    start_month = start_date.month
-    start_day = start_date.day
-    end_month = end_date.month
-    end_day = end_date.day
-
-    with SessionLocal() as db:
-        query = db.query(Contact).filter(
-            (
-                (extract('month', Contact.birthday) == start_month) & (extract('day', Contact.birthday) >= start_day)
-            ) |
-            (
-                (extract('month', Contact.birthday) == end_month) & (extract('day', Contact.birthday) <= end_day)
-            )
-        )
-        contacts = query.all()
-
-    return contacts
-
 # Run the FastAPI application
 if __name__ == "__main__":
     import uvicorn
@@ -1,8 +1,24 @@
-from sqlalchemy.orm import Session
-from app.db.models import Contact  # Import the Contact model from app.db.models
-from app.schemas import ContactCreate, User  # Import the ContactCreate schema and User schema from app.schemas
+import base64
+import csv
+import io
+import json
+import weakref
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import (
+    CompoundSelect, Result, Row, Select, and_, case, column, delete, func, insert, inspect, literal, null, or_, select,
+    table, text, union_all, update, values,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only
+from app.core.response_cache import response_cache
+from app.db.models import Contact, ContactCounter, ContactTombstone, birthday_doy, contact_search_text, utcnow  # Import the Contact model from app.db.models
+from app.schemas import BatchOperation, ContactCreate, User  # Import the ContactCreate schema and User schema from app.schemas
 
-def get_contact(db: Session, contact_id: int, user: User):
+DUPLICATE_EMAIL = "Contact with this email already exists"
+
+def get_contact(db: Session, contact_id: int, user: User, fields: Optional[Iterable[str]] = None):
     """
     Retrieve a specific contact belonging to the authenticated user.
 
@@ -12,15 +28,88 @@ def get_contact(db: Session, contact_id: int, user: User):
     :type contact_id: int
     :param user: The authenticated user.
     :type user: User
+    :param fields: Only load these fields and the ID, see :func:`contact_columns`; the others
+        are loaded on access.
+    :type fields: Iterable[str], optional
     :return: The contact matching the contact_id and belonging to the user.
     :rtype: Contact
     """
-    return db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).first()
+    query = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id)
+    if fields is not None:
+        query = query.options(load_only(*contact_columns(fields)))
+    return query.first()
+
+def encode_cursor(contact_id: int) -> str:
+    """
+    Build the opaque pagination cursor pointing just after a contact.
+
+    :param contact_id: The ID of the last contact on the current page.
+    :type contact_id: int
+    :return: The cursor.
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(json.dumps({"id": contact_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Extract the contact ID from a cursor built by :func:`encode_cursor`.
+
+    :param cursor: The cursor.
+    :type cursor: str
+    :raises ValueError: If the cursor is malformed.
+    :return: The ID of the last contact on the previous page.
+    :rtype: int
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        contact_id = payload["id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(contact_id, int):
+        raise ValueError("Invalid cursor")
+    return contact_id
+
+def encode_change_token(changed_at: datetime, contact_id: int) -> str:
+    """
+    Build the opaque token of a point in a user's change history.
+
+    :param changed_at: Time of the last change the client has seen.
+    :type changed_at: datetime
+    :param contact_id: ID of the contact of that change, to order changes made at the same time.
+    :type contact_id: int
+    :return: The token.
+    :rtype: str
+    """
+    payload = {"at": changed_at.isoformat(), "id": contact_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_change_token(token: str) -> Tuple[datetime, int]:
+    """
+    Extract the point in the change history from a token built by :func:`encode_change_token`.
 
-def get_contacts(db: Session, user: User, skip: int = 0, limit: int = 10):
+    :param token: The token.
+    :type token: str
+    :raises ValueError: If the token is malformed.
+    :return: Time and contact ID of the last change the client has seen.
+    :rtype: Tuple[datetime, int]
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        changed_at, contact_id = datetime.fromisoformat(payload["at"]), payload["id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid token") from e
+    if not isinstance(contact_id, int) or changed_at.tzinfo is not None:
+        raise ValueError("Invalid token")
+    return changed_at, contact_id
+
+def get_contacts(db: Session, user: User, skip: int = 0, limit: int = 10, after: Optional[int] = None):
     """
     Retrieve a list of contacts belonging to the authenticated user with pagination.
 
+    Contacts are ordered by ID. With ``after`` the page starts right after that contact
+    using the ``(user_id, id)`` index (keyset pagination) and ``skip`` is ignored,
+    so deep pages cost the same as the first one.
+
     :param db: Database session.
     :type db: Session
     :param user: The authenticated user.
@@ -29,10 +118,416 @@ def get_contacts(db: Session, user: User, skip: int = 0, limit: int = 10):
     :type skip: int, optional
     :param limit: Maximum number of contacts to return.
     :type limit: int, optional
+    :param after: ID of the last contact of the previous page.
+    :type after: int, optional
     :return: A list of contacts belonging to the user.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    return db.scalars(contacts_page_statement(user, skip=skip, limit=limit, after=after, columns=(Contact,))).all()
+
+# Columns of the Contact schema, in export order
+EXPORT_COLUMNS = (
+    Contact.id, Contact.first_name, Contact.last_name, Contact.email,
+    Contact.phone_number, Contact.birthday, Contact.additional_info,
+)
+
+# Columns of the Contact schema, in its field order, for responses built without ORM objects
+CONTACT_COLUMNS = (
+    Contact.first_name, Contact.last_name, Contact.email, Contact.phone_number,
+    Contact.birthday, Contact.additional_info, Contact.id,
+)
+
+def contact_columns(fields: Optional[Iterable[str]] = None) -> Tuple:
+    """
+    Pick the :data:`CONTACT_COLUMNS` of a sparse fieldset, so reads only select what the response shows.
+
+    :param fields: Names of the contact fields, None for all of them. ``id`` is always included.
+    :type fields: Iterable[str], optional
+    :raises ValueError: If a name is not a contact field.
+    :return: The columns, in schema field order.
+    :rtype: Tuple
+    """
+    if fields is None:
+        return CONTACT_COLUMNS
+    fields = set(fields)
+    unknown = fields - {c.key for c in CONTACT_COLUMNS}
+    if unknown:
+        raise ValueError(f"Unknown contact fields: {', '.join(sorted(unknown))}")
+    return tuple(c for c in CONTACT_COLUMNS if c.key in fields or c.key == 'id')
+
+def contacts_page_statement(user: User, skip: int = 0, limit: int = 10, after: Optional[int] = None,
+                            columns: Sequence = CONTACT_COLUMNS) -> Select:
+    """
+    Build a SELECT of the :data:`CONTACT_COLUMNS` of one page, shared with the async repository.
+
+    :param user: The authenticated user.
+    :type user: User
+    :param skip: Number of contacts to skip.
+    :type skip: int, optional
+    :param limit: Maximum number of contacts to return.
+    :type limit: int, optional
+    :param after: ID of the last contact of the previous page.
+    :type after: int, optional
+    :param columns: The columns to select, see :func:`contact_columns`.
+    :type columns: Sequence, optional
+    :return: The page statement.
+    :rtype: Select
+    """
+    stmt = select(*columns).where(Contact.user_id == user.id).order_by(Contact.id).limit(limit)
+    if after is not None:
+        return stmt.where(Contact.id > after)
+    return stmt.offset(skip)
+
+def get_contact_rows(db: Session, user: User, skip: int = 0, limit: int = 10, after: Optional[int] = None,
+                     columns: Sequence = CONTACT_COLUMNS) -> List[Row]:
+    """
+    Retrieve a page of contacts like :func:`get_contacts`, as rows of :data:`CONTACT_COLUMNS`.
+
+    Only the schema's columns are selected and no ORM objects are built, for list
+    responses that are serialised straight from the rows.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param skip: Number of contacts to skip.
+    :type skip: int, optional
+    :param limit: Maximum number of contacts to return.
+    :type limit: int, optional
+    :param after: ID of the last contact of the previous page.
+    :type after: int, optional
+    :param columns: The columns to select, see :func:`contact_columns`.
+    :type columns: Sequence, optional
+    :return: The rows of the page.
+    :rtype: List[Row]
+    """
+    return db.execute(contacts_page_statement(user, skip=skip, limit=limit, after=after, columns=columns)).all()
+
+def changes_statements(user: User, since: Optional[Tuple[datetime, int]], limit: int) -> Tuple[Select, Optional[Select]]:
+    """
+    Build the SELECTs of contacts changed and deleted after a point, shared with the async repository.
+
+    Both read at most ``limit + 1`` rows in ``(time, contact id)`` order through the
+    ``(user_id, updated_at, id)`` and ``(user_id, deleted_at, contact_id)`` indexes.
+
+    :param user: The authenticated user.
+    :type user: User
+    :param since: Time and contact ID of the last change the client has seen, None for everything.
+    :type since: Tuple[datetime, int], optional
+    :param limit: Maximum number of changes to return.
+    :type limit: int
+    :return: The SELECT of changed contacts, and the one of deletions or None without ``since``.
+    :rtype: Tuple[Select, Select | None]
+    """
+    changed = (
+        select(*CONTACT_COLUMNS, Contact.updated_at)
+        .where(Contact.user_id == user.id)
+        .order_by(Contact.updated_at, Contact.id)
+        .limit(limit + 1)
+    )
+    if since is None:
+        # A client without a token has nothing to delete
+        return changed, None
+    at, contact_id = since
+    changed = changed.where(or_(Contact.updated_at > at, and_(Contact.updated_at == at, Contact.id > contact_id)))
+    deleted = (
+        select(ContactTombstone.contact_id, ContactTombstone.deleted_at)
+        .where(ContactTombstone.user_id == user.id)
+        .where(or_(ContactTombstone.deleted_at > at,
+                   and_(ContactTombstone.deleted_at == at, ContactTombstone.contact_id > contact_id)))
+        .order_by(ContactTombstone.deleted_at, ContactTombstone.contact_id)
+        .limit(limit + 1)
+    )
+    return changed, deleted
+
+def merge_changes(changed: Sequence[Row], deleted: Sequence[Row], since: Optional[Tuple[datetime, int]],
+                  limit: int, settle: float, now: Optional[datetime] = None) -> dict:
+    """
+    Merge the rows of :func:`changes_statements` into one page of changes.
+
+    The token of a page that is not the last points after its last change. The token
+    of the last page points ``settle`` seconds into the past instead: a transaction
+    may commit a change stamped slightly before a sync that did not see it yet, so
+    recent changes are sent again on the next sync rather than lost.
+
+    :param changed: Rows of changed contacts.
+    :type changed: Sequence[Row]
+    :param deleted: Rows of deletions.
+    :type deleted: Sequence[Row]
+    :param since: The point the page starts after.
+    :type since: Tuple[datetime, int], optional
+    :param limit: Maximum number of changes in the page.
+    :type limit: int
+    :param settle: Seconds after which a change is assumed to be committed.
+    :type settle: float
+    :param now: Current time, defaults to now.
+    :type now: datetime, optional
+    :return: The ``changed`` contacts, ``deleted`` contact IDs, ``next`` token and whether there is ``more``.
+    :rtype: dict
+    """
+    # A deletion sorts after an update made at the same instant
+    events = sorted(
+        [(row.updated_at, row.id, 0, row) for row in changed]
+        + [(row.deleted_at, row.contact_id, 1, row) for row in deleted]
+    )
+    more = len(events) > limit
+    events = events[:limit]
+    result = {"changed": [], "deleted": [], "next": None, "more": more}
+    for changed_at, contact_id, kind, row in events:
+        if kind:
+            result["deleted"].append(contact_id)
+        else:
+            contact = row._asdict()
+            del contact["updated_at"]
+            result["changed"].append(contact)
+    if more:
+        result["next"] = encode_change_token(events[-1][0], events[-1][1])
+    else:
+        watermark = ((now or utcnow()) - timedelta(seconds=settle), 0)
+        if since is not None:
+            watermark = max(watermark, since)
+        result["next"] = encode_change_token(*watermark)
+    return result
+
+def get_changes(db: Session, user: User, since: Optional[Tuple[datetime, int]] = None, limit: int = 500,
+                settle: float = 5.0, now: Optional[datetime] = None) -> dict:
+    """
+    Retrieve the contacts of the authenticated user changed or deleted after a point.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param since: Time and contact ID of the last change the client has seen, None for everything.
+    :type since: Tuple[datetime, int], optional
+    :param limit: Maximum number of changes to return.
+    :type limit: int, optional
+    :param settle: Seconds after which a change is assumed to be committed, see :func:`merge_changes`.
+    :type settle: float, optional
+    :param now: Current time, defaults to now.
+    :type now: datetime, optional
+    :return: One page of changes, see :func:`merge_changes`.
+    :rtype: dict
+    """
+    changed, deleted = changes_statements(user, since, limit)
+    changed_rows = db.execute(changed).all()
+    deleted_rows = db.execute(deleted).all() if deleted is not None else []
+    return merge_changes(changed_rows, deleted_rows, since, limit, settle, now)
+
+def purge_tombstones(db: Session, before: datetime) -> int:
+    """
+    Delete the records of contacts deleted before a time.
+
+    Clients whose token is older than that can no longer learn about those deletions
+    and have to download all their contacts again.
+
+    :param db: Database session.
+    :type db: Session
+    :param before: Records of deletions before this time are removed.
+    :type before: datetime
+    :return: Number of records removed.
+    :rtype: int
+    """
+    result = db.execute(delete(ContactTombstone).where(ContactTombstone.deleted_at < before))
+    db.commit()
+    return result.rowcount
+
+def counter_names(email: Optional[str], birthday: Optional[date]) -> List[str]:
+    """
+    Names of the :class:`ContactCounter` rows a contact counts towards.
+
+    :param email: The contact's email.
+    :type email: str, optional
+    :param birthday: The contact's birthday.
+    :type birthday: date, optional
+    :return: ``total``, plus ``month:<1-12>`` and ``domain:<domain>`` when known.
+    :rtype: List[str]
+    """
+    names = ['total']
+    if birthday is not None:
+        names.append(f'month:{birthday.month}')
+    if email and '@' in email:
+        names.append(f"domain:{email.rsplit('@', 1)[1].lower()}")
+    return names
+
+def count_contacts(deltas: Dict[str, int], contacts: Iterable[Tuple[Optional[str], Optional[date]]],
+                   sign: int = 1) -> Dict[str, int]:
+    """
+    Add the counters of contacts to a set of counter deltas.
+
+    :param deltas: Deltas by counter name, updated in place.
+    :type deltas: Dict[str, int]
+    :param contacts: ``(email, birthday)`` of each contact.
+    :type contacts: Iterable[Tuple[str, date]]
+    :param sign: 1 for contacts added, -1 for contacts removed.
+    :type sign: int, optional
+    :return: ``deltas``.
+    :rtype: Dict[str, int]
+    """
+    for email, birthday in contacts:
+        for name in counter_names(email, birthday):
+            deltas[name] = deltas.get(name, 0) + sign
+    return deltas
+
+def update_counters(db: Session, user_id: int, deltas: Dict[str, int]) -> None:
+    """
+    Add deltas to a user's contact counters in the current transaction.
+
+    Missing counters are created by one ``INSERT ... ON CONFLICT DO UPDATE``, in name
+    order so concurrent writers of the same user lock the rows in the same order.
+    The async repository runs it through ``run_sync``.
+
+    :param db: Database session.
+    :type db: Session
+    :param user_id: The owner of the counters.
+    :type user_id: int
+    :param deltas: Deltas by counter name.
+    :type deltas: Dict[str, int]
+    """
+    rows = [{'user_id': user_id, 'name': name, 'count': delta} for name, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == 'postgresql' else sqlite
+    counters = ContactCounter.__table__
+    stmt = dialect.insert(counters)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'name'],
+                                      set_={'count': counters.c.count + stmt.excluded['count']})
+    db.execute(stmt, rows)
+
+def contact_stats_statement(user: User, month: int, domains: int = 10) -> CompoundSelect:
+    """
+    Build the SELECT of the counters behind :func:`merge_contact_stats`, shared with the async repository.
+
+    Its cost does not depend on the number of contacts, but the largest domains are
+    picked in the database from the user's ``domain:`` counters, so it grows with the
+    number of distinct domains; only ``domains`` rows of them are returned.
+
+    :param user: The authenticated user.
+    :type user: User
+    :param month: The month whose birthdays are counted.
+    :type month: int
+    :param domains: Number of email domains to report, the largest first.
+    :type domains: int, optional
+    :return: The SELECT of counter names and counts.
+    :rtype: CompoundSelect
+    """
+    largest = (
+        select(ContactCounter.name, ContactCounter.count)
+        .where(ContactCounter.user_id == user.id, ContactCounter.count > 0, ContactCounter.name.startswith('domain:'))
+        .order_by(ContactCounter.count.desc(), ContactCounter.name)
+        .limit(domains)
+        .subquery()
+    )
+    return union_all(
+        select(ContactCounter.name, ContactCounter.count)
+        .where(ContactCounter.user_id == user.id, ContactCounter.count > 0,
+               ContactCounter.name.in_(['total', f'month:{month}'])),
+        select(largest.c.name, largest.c.count),
+    )
+
+def merge_contact_stats(rows: Sequence[Row], month: int, domains: int = 10) -> dict:
+    """
+    Turn the rows of :func:`contact_stats_statement` into the contact statistics.
+
+    :param rows: Counter names and counts.
+    :type rows: Sequence[Row]
+    :param month: The month whose birthdays are counted.
+    :type month: int
+    :param domains: Number of email domains to report, the largest first.
+    :type domains: int, optional
+    :return: The ``total``, ``birthdays_this_month`` and ``domains`` with their ``count``.
+    :rtype: dict
+    """
+    counts = dict(rows)
+    breakdown = sorted(
+        ((name[len('domain:'):], count) for name, count in counts.items() if name.startswith('domain:')),
+        key=lambda item: (-item[1], item[0]),
+    )
+    return {
+        "total": counts.get('total', 0),
+        "birthdays_this_month": counts.get(f'month:{month}', 0),
+        "domains": [{"domain": domain, "count": count} for domain, count in breakdown[:domains]],
+    }
+
+def get_contact_stats(db: Session, user: User, domains: int = 10, today: Optional[date] = None) -> dict:
+    """
+    Retrieve contact statistics of the authenticated user from the materialised counters.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param domains: Number of email domains to report, the largest first.
+    :type domains: int, optional
+    :param today: The current date, defaults to today.
+    :type today: date, optional
+    :return: The statistics, see :func:`merge_contact_stats`.
+    :rtype: dict
+    """
+    month = (today or date.today()).month
+    return merge_contact_stats(db.execute(contact_stats_statement(user, month, domains)).all(), month, domains)
+
+def reconcile_counters(db: Session, user_ids: Sequence[int]) -> int:
+    """
+    Recount the contacts of some users and repair the counters that drifted.
+
+    Counters can drift when a write races another one on the same contact, or when
+    contacts are changed outside the repository. Contacts are streamed and counted
+    with :func:`counter_names`, so the result matches what the writes maintain.
+
+    Contacts and counters are read by one statement, so from one snapshot, and the
+    difference is added to the counters like a write's deltas. Writes committed
+    meanwhile keep their own deltas, so the job is safe next to the API; only one
+    reconcile may run at a time.
+
+    :param db: Database session.
+    :type db: Session
+    :param user_ids: The users to reconcile.
+    :type user_ids: Sequence[int]
+    :return: Number of counters corrected.
+    :rtype: int
+    """
+    snapshot = union_all(
+        select(Contact.user_id, Contact.email, Contact.birthday,
+               null().label('name'), null().label('count')).where(Contact.user_id.in_(user_ids)),
+        select(ContactCounter.user_id, null(), null(),
+               ContactCounter.name, ContactCounter.count).where(ContactCounter.user_id.in_(user_ids)),
+    )
+    deltas: Dict[int, Dict[str, int]] = {user_id: {} for user_id in user_ids}
+    for user_id, email, birthday, name, count in db.execute(snapshot.execution_options(yield_per=5000)):
+        if name is None:
+            count_contacts(deltas[user_id], [(email, birthday)])
+        else:
+            deltas[user_id][name] = deltas[user_id].get(name, 0) - count
+
+    corrected = 0
+    for user_id in user_ids:
+        corrected += sum(1 for delta in deltas[user_id].values() if delta)
+        update_counters(db, user_id, deltas[user_id])
+    # Counters that dropped to zero are removed as well, without counting as corrected
+    db.execute(delete(ContactCounter).where(ContactCounter.user_id.in_(user_ids), ContactCounter.count == 0))
+    db.commit()
+    return corrected
+
+def stream_contacts(db: Session, user: User, batch_size: int = 1000) -> Result:
+    """
+    Stream every contact of the authenticated user as plain rows, ordered by ID.
+
+    Rows are fetched ``batch_size`` at a time through a server-side cursor where the
+    driver supports one (``yield_per``), so the whole result is never held in memory.
+    Iterate ``result.partitions()`` to consume it batch by batch.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param batch_size: Rows fetched per round trip.
+    :type batch_size: int, optional
+    :return: The streamed result with the :data:`EXPORT_COLUMNS`.
+    :rtype: Result
+    """
+    stmt = select(*EXPORT_COLUMNS).where(Contact.user_id == user.id).order_by(Contact.id)
+    return db.execute(stmt.execution_options(yield_per=batch_size))
 
 def create_contact(db: Session, contact: ContactCreate, user: User):
     """
@@ -47,12 +542,99 @@ def create_contact(db: Session, contact: ContactCreate, user: User):
     :return: The created contact.
     :rtype: Contact
     """
-    db_contact = Contact(**contact.dict(), user_id=user.id)
+    db_contact = Contact(**contact.dict(), user_id=user.id, birthday_doy=birthday_doy(contact.birthday))
     db.add(db_contact)
+    update_counters(db, user.id, count_contacts({}, [(contact.email, contact.birthday)]))
     db.commit()
+    response_cache.invalidate(user.id)
     db.refresh(db_contact)
     return db_contact
 
+def _copy_rows(db: Session, rows: List[dict]) -> None:
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    # QUOTE_NONNUMERIC quotes every string, so only None is written as an unquoted empty value (NULL)
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row[key] if not isinstance(row[key], date) else row[key].isoformat() for key in columns])
+    buffer.seek(0)
+    connection = db.connection()
+    statement = f"COPY contacts ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    except connection.dialect.dbapi.IntegrityError as e:
+        # Raw cursor errors bypass SQLAlchemy; surface them like an executemany failure
+        raise IntegrityError(statement, None, e) from e
+    finally:
+        cursor.close()
+
+def _insert_rows(db: Session, rows: List[dict], use_copy: bool) -> None:
+    if not rows:
+        return
+    bind = db.get_bind()
+    if use_copy and bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg2':
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(Contact.__table__), rows)
+
+def bulk_create_contacts(db: Session, contacts: List[ContactCreate], user: User, use_copy: bool = True) -> Dict[int, str]:
+    """
+    Create many contacts for the authenticated user in one set-based INSERT and one commit.
+
+    Rows whose email is already taken, in the database or earlier in ``contacts``,
+    are skipped and reported. The rest are inserted with ``executemany``, or with
+    ``COPY`` on Postgres. If the insert still hits a constraint (a concurrent writer),
+    the chunk is retried row by row under savepoints so only the offending rows fail.
+
+    :param db: Database session.
+    :type db: Session
+    :param contacts: Validated contacts to create.
+    :type contacts: List[ContactCreate]
+    :param user: The authenticated user.
+    :type user: User
+    :param use_copy: Whether COPY may be used on Postgres.
+    :type use_copy: bool, optional
+    :return: Error message by index in ``contacts`` for every row that was not created.
+    :rtype: Dict[int, str]
+    """
+    if not contacts:
+        return {}
+    # updated_at is set here because COPY skips column defaults
+    now = utcnow()
+    rows = [
+        {**contact.dict(), 'user_id': user.id, 'birthday_doy': birthday_doy(contact.birthday), 'updated_at': now}
+        for contact in contacts
+    ]
+    taken = set(db.scalars(select(Contact.email).where(Contact.email.in_({row['email'] for row in rows}))))
+    errors = {}
+    fresh = []
+    for index, row in enumerate(rows):
+        if row['email'] in taken:
+            errors[index] = DUPLICATE_EMAIL
+        else:
+            taken.add(row['email'])
+            fresh.append((index, row))
+
+    try:
+        _insert_rows(db, [row for _, row in fresh], use_copy)
+        update_counters(db, user.id, count_contacts({}, ((row['email'], row['birthday']) for _, row in fresh)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        for index, row in fresh:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(Contact.__table__), [row])
+            except IntegrityError:
+                errors[index] = DUPLICATE_EMAIL
+        created = ((row['email'], row['birthday']) for index, row in fresh if index not in errors)
+        update_counters(db, user.id, count_contacts({}, created))
+        db.commit()
+    if len(errors) < len(rows):
+        response_cache.invalidate(user.id)
+    return errors
+
 def update_contact(db: Session, contact_id: int, contact: ContactCreate, user: User):
     """
     Update an existing contact belonging to the authenticated user.
@@ -70,9 +652,13 @@ def update_contact(db: Session, contact_id: int, contact: ContactCreate, user: U
     """
     db_contact = get_contact(db, contact_id, user)
     if db_contact:
+        deltas = count_contacts({}, [(db_contact.email, db_contact.birthday)], -1)
         for key, value in contact.dict(exclude_unset=True).items():
             setattr(db_contact, key, value)
+        db_contact.birthday_doy = birthday_doy(db_contact.birthday)
+        update_counters(db, user.id, count_contacts(deltas, [(db_contact.email, db_contact.birthday)]))
         db.commit()
+        response_cache.invalidate(user.id)
         db.refresh(db_contact)
     return db_contact
 
@@ -92,5 +678,353 @@ def delete_contact(db: Session, contact_id: int, user: User):
     db_contact = get_contact(db, contact_id, user)
     if db_contact:
         db.delete(db_contact)
+        db.add(ContactTombstone(contact_id=contact_id, user_id=user.id))
+        update_counters(db, user.id, count_contacts({}, [(db_contact.email, db_contact.birthday)], -1))
         db.commit()
+        response_cache.invalidate(user.id)
     return db_contact
+
+
+# Rows per UPDATE ... FROM statement; SQLite allows at most 500 SELECTs in one UNION ALL
+BATCH_UPDATE_CHUNK = 200
+
+def _values_table(db: Session, rows: List[dict], keys: Sequence[str]):
+    """
+    Build a FROM clause named ``v`` holding ``rows``, typed like the contacts columns.
+
+    Postgres gets a ``VALUES`` list. SQLite cannot name the columns of ``VALUES`` in
+    an alias, so it gets the same rows as a ``UNION ALL`` of SELECTs.
+    """
+    columns = [Contact.__table__.c[key] for key in keys]
+    if db.get_bind().dialect.name == 'postgresql':
+        data = [tuple(row[key] for key in keys) for row in rows]
+        return values(*(column(c.key, c.type) for c in columns), name='v').data(data)
+    selects = [select(*(literal(row[c.key], c.type).label(c.key) for c in columns)) for row in rows]
+    return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery('v')
+
+def apply_batch(db: Session, operations: List[BatchOperation], user: User,
+                atomic: bool = False) -> Tuple[bool, List[dict]]:
+    """
+    Apply many create, update and delete operations in one transaction, set-based.
+
+    All deletes run as one ``DELETE ... WHERE id IN ... RETURNING``, updates as
+    ``UPDATE ... FROM`` a table of new values (one statement per set of updated
+    fields) and creates as one ``INSERT ... RETURNING``, after a single SELECT that
+    checks ownership of updated contacts and claimed emails. Deletes are applied
+    before updates and creates, so their emails can be reused in the same batch.
+
+    Operations that cannot be applied are reported and skipped: 404 for a contact
+    the user does not own, 409 for an email already taken, 422 for a contact that
+    appears in more than one operation. With ``atomic`` any such failure rolls the
+    whole batch back and the other operations are reported with 424.
+
+    :param db: Database session.
+    :type db: Session
+    :param operations: The operations, in request order.
+    :type operations: List[BatchOperation]
+    :param user: The authenticated user.
+    :type user: User
+    :param atomic: Whether to apply all operations or none.
+    :type atomic: bool, optional
+    :raises IntegrityError: If a concurrent write violated a constraint; the transaction is rolled back.
+    :return: Whether the batch was committed, and one result per operation with its
+        ``index``, ``op``, HTTP-like ``status`` and the ``contact`` or the ``error``.
+    :rtype: Tuple[bool, List[dict]]
+    """
+    results: List[Optional[dict]] = [None] * len(operations)
+
+    def fail(index: int, status: int, error: str) -> None:
+        results[index] = {"index": index, "op": operations[index].op, "status": status, "contact": None, "error": error}
+
+    def done(index: int, status: int, row: Row) -> None:
+        results[index] = {"index": index, "op": operations[index].op, "status": status, "contact": row._asdict(), "error": None}
+
+    seen = set()
+    for index, operation in enumerate(operations):
+        if operation.op != 'create':
+            if operation.id in seen:
+                fail(index, 422, "Contact appears in more than one operation")
+            seen.add(operation.id)
+    pending = [index for index, result in enumerate(results) if result is None]
+    deletes = {operations[index].id: index for index in pending if operations[index].op == 'delete'}
+    claims = [index for index in pending if operations[index].op != 'delete']
+    contacts = Contact.__table__
+    deltas: Dict[str, int] = {}
+
+    try:
+        if deletes:
+            stmt = (
+                delete(contacts)
+                .where(contacts.c.user_id == user.id, contacts.c.id.in_(deletes))
+                .returning(*CONTACT_COLUMNS)
+            )
+            deleted = db.execute(stmt).all()
+            if deleted:
+                db.execute(insert(ContactTombstone.__table__),
+                           [{'contact_id': row.id, 'user_id': user.id} for row in deleted])
+            count_contacts(deltas, ((row.email, row.birthday) for row in deleted), -1)
+            for row in deleted:
+                done(deletes.pop(row.id), 200, row)
+            for index in deletes.values():
+                fail(index, 404, "Contact not found")
+
+        # Email and birthday of each owned contact, to move its counters when it is updated
+        owned, taken = {}, {}
+        if claims:
+            update_ids = [operations[index].id for index in claims if operations[index].op == 'update']
+            emails = {operations[index].contact.email for index in claims}
+            stmt = select(contacts.c.id, contacts.c.email, contacts.c.birthday, contacts.c.user_id).where(or_(
+                contacts.c.email.in_(emails),
+                and_(contacts.c.user_id == user.id, contacts.c.id.in_(update_ids)),
+            ))
+            for contact_id, email, birthday, owner_id in db.execute(stmt):
+                taken[email] = contact_id
+                if owner_id == user.id:
+                    owned[contact_id] = (email, birthday)
+
+        groups: Dict[Tuple[str, ...], List[Tuple[int, dict]]] = {}
+        creates = []
+        for index in claims:
+            operation = operations[index]
+            contact_id = getattr(operation, 'id', None)
+            if operation.op == 'update' and contact_id not in owned:
+                fail(index, 404, "Contact not found")
+                continue
+            owner = taken.get(operation.contact.email)
+            if owner is not None and owner != contact_id:
+                fail(index, 409, DUPLICATE_EMAIL)
+                continue
+            # 0 is never an ID, so a created contact's email blocks every later claim
+            taken[operation.contact.email] = contact_id or 0
+            if operation.op == 'create':
+                creates.append(index)
+                continue
+            row = {**operation.contact.dict(exclude_unset=True), 'id': contact_id}
+            row['birthday_doy'] = birthday_doy(operation.contact.birthday)
+            groups.setdefault(tuple(sorted(row)), []).append((index, row))
+
+        for keys, members in groups.items():
+            for start in range(0, len(members), BATCH_UPDATE_CHUNK):
+                chunk = members[start:start + BATCH_UPDATE_CHUNK]
+                indexes = {row['id']: index for index, row in chunk}
+                v = _values_table(db, [row for _, row in chunk], keys)
+                stmt = (
+                    update(contacts)
+                    .where(contacts.c.id == v.c.id, contacts.c.user_id == user.id)
+                    .values({key: v.c[key] for key in keys if key != 'id'})
+                    .returning(*CONTACT_COLUMNS)
+                )
+                for row in db.execute(stmt).all():
+                    count_contacts(deltas, [owned[row.id]], -1)
+                    count_contacts(deltas, [(row.email, row.birthday)])
+                    done(indexes.pop(row.id), 200, row)
+                for index in indexes.values():
+                    fail(index, 404, "Contact not found")
+
+        if creates:
+            rows = [
+                {**operations[index].contact.dict(), 'user_id': user.id,
+                 'birthday_doy': birthday_doy(operations[index].contact.birthday)}
+                for index in creates
+            ]
+            # Emails are unique, so rows are matched by email instead of forcing RETURNING into
+            # parameter order, which SQLite can only do one INSERT per row
+            indexes = {operations[index].contact.email: index for index in creates}
+            for row in db.execute(insert(contacts).returning(*CONTACT_COLUMNS), rows).all():
+                count_contacts(deltas, [(row.email, row.birthday)])
+                done(indexes[row.email], 201, row)
+        update_counters(db, user.id, deltas)
+    except IntegrityError:
+        db.rollback()
+        raise
+
+    failed = any(result["status"] >= 400 for result in results)
+    if atomic and failed:
+        db.rollback()
+        for index, result in enumerate(results):
+            if result["status"] < 400:
+                fail(index, 424, "Not applied because another operation failed")
+        return False, results
+    db.commit()
+    if not all(result["status"] >= 400 for result in results):
+        response_cache.invalidate(user.id)
+    return True, results
+
+
+_contacts_fts = table('contacts_fts', column('rowid'), column('user_id'))
+# Keyed by engine rather than URL: every in-memory SQLite engine has the same URL
+_fts_available = weakref.WeakKeyDictionary()
+
+def _like(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def search_backend(db: Session) -> str:
+    """
+    Pick the search backend supported by the session's database.
+
+    Postgres uses the pg_trgm GIN indexes, SQLite uses the ``contacts_fts`` FTS5 table
+    when it exists with its ``user_id`` column, and anything else falls back to plain
+    ``ILIKE`` scans. The table is looked up once per engine.
+
+    :param db: Database session.
+    :type db: Session
+    :return: One of ``"trigram"``, ``"fts5"`` or ``"like"``.
+    :rtype: str
+    """
+    bind = db.get_bind()
+    if bind.dialect.name == 'postgresql':
+        return 'trigram'
+    if bind.dialect.name == 'sqlite':
+        engine = bind.engine
+        if engine not in _fts_available:
+            inspector = inspect(engine)
+            _fts_available[engine] = inspector.has_table('contacts_fts') and any(
+                c['name'] == 'user_id' for c in inspector.get_columns('contacts_fts'))
+        if _fts_available[engine]:
+            return 'fts5'
+    return 'like'
+
+def search_statement(user: User, name: Optional[str] = None, surname: Optional[str] = None,
+                     email: Optional[str] = None, q: Optional[str] = None, limit: int = 50,
+                     backend: str = 'like') -> Select:
+    """
+    Build the SELECT behind :func:`search_contact_rows`, shared with the async repository.
+
+    :param user: The authenticated user.
+    :type user: User
+    :param name: Substring of the first name.
+    :type name: str, optional
+    :param surname: Substring of the last name.
+    :type surname: str, optional
+    :param email: Substring of the email.
+    :type email: str, optional
+    :param q: Substring of the first name, last name or email.
+    :type q: str, optional
+    :param limit: Maximum number of contacts to return.
+    :type limit: int, optional
+    :param backend: The backend returned by :func:`search_backend`.
+    :type backend: str, optional
+    :return: The search statement.
+    :rtype: Select
+    """
+    fields = [(Contact.first_name, name), (Contact.last_name, surname), (Contact.email, email)]
+    fields = [(field, term) for field, term in fields if term]
+    stmt = select(Contact).where(Contact.user_id == user.id)
+
+    # The trigram tokenizer cannot match terms shorter than three characters
+    if backend == 'fts5' and all(len(term) >= 3 for _, term in fields) and (not q or len(q) >= 3):
+        match = [f"{field.key} : {_fts_phrase(term)}" for field, term in fields]
+        if q:
+            match.append(_fts_phrase(q))
+        if match:
+            stmt = (
+                stmt.join(_contacts_fts, _contacts_fts.c.rowid == Contact.id)
+                .where(text("contacts_fts MATCH :match").bindparams(match=" AND ".join(match)),
+                       _contacts_fts.c.user_id == user.id)
+                .order_by(text("bm25(contacts_fts)"))
+            )
+        return stmt.limit(limit)
+
+    filters = [field.ilike(_like(term), escape='\\') for field, term in fields]
+    if q:
+        filters.append(contact_search_text.ilike(_like(q), escape='\\'))
+    stmt = stmt.where(*filters)
+
+    if backend == 'trigram':
+        ranks = [func.similarity(field, term) for field, term in fields]
+        if q:
+            ranks.append(func.word_similarity(q, contact_search_text))
+        if ranks:
+            stmt = stmt.order_by(sum(ranks[1:], ranks[0]).desc())
+    return stmt.order_by(Contact.id).limit(limit)
+
+def search_contact_rows(db: Session, user: User, name: Optional[str] = None, surname: Optional[str] = None,
+                        email: Optional[str] = None, q: Optional[str] = None, limit: int = 50,
+                        backend: Optional[str] = None, columns: Sequence = CONTACT_COLUMNS) -> List[Row]:
+    """
+    Search the authenticated user's contacts by substring, most relevant first.
+
+    ``name``, ``surname`` and ``email`` match their own field, ``q`` matches any of them.
+    All given filters must match. Contacts are returned as rows of :data:`CONTACT_COLUMNS`.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param name: Substring of the first name.
+    :type name: str, optional
+    :param surname: Substring of the last name.
+    :type surname: str, optional
+    :param email: Substring of the email.
+    :type email: str, optional
+    :param q: Substring of the first name, last name or email.
+    :type q: str, optional
+    :param limit: Maximum number of contacts to return.
+    :type limit: int, optional
+    :param backend: Force a backend instead of detecting it, see :func:`search_backend`.
+    :type backend: str, optional
+    :param columns: The columns to select, see :func:`contact_columns`.
+    :type columns: Sequence, optional
+    :return: The rows of the matching contacts ordered by rank.
+    :rtype: List[Row]
+    """
+    stmt = search_statement(user, name=name, surname=surname, email=email, q=q, limit=limit,
+                            backend=backend or search_backend(db))
+    return db.execute(stmt.with_only_columns(*columns)).all()
+
+def upcoming_birthdays_statement(user: User, days: int = 7, today: Optional[date] = None) -> Select:
+    """
+    Build the SELECT behind :func:`get_upcoming_birthday_rows`, shared with the async repository.
+
+    :param user: The authenticated user.
+    :type user: User
+    :param days: Length of the window in days, today included.
+    :type days: int, optional
+    :param today: The day the window starts, defaults to today.
+    :type today: date, optional
+    :return: The upcoming birthdays statement.
+    :rtype: Select
+    """
+    start_date = today or date.today()
+    start = birthday_doy(start_date)
+    # The window is inclusive at both ends, so it ends days - 1 after today
+    end = birthday_doy(start_date + timedelta(days=days - 1))
+    stmt = select(Contact).where(Contact.user_id == user.id, Contact.birthday_doy.isnot(None))
+
+    # A window of a year or more covers every birthday
+    if days < 365:
+        if start <= end:
+            stmt = stmt.where(Contact.birthday_doy.between(start, end))
+        else:
+            stmt = stmt.where(or_(Contact.birthday_doy >= start, Contact.birthday_doy <= end))
+
+    return stmt.order_by(case((Contact.birthday_doy < start, 1), else_=0), Contact.birthday_doy, Contact.id)
+
+def get_upcoming_birthday_rows(db: Session, user: User, days: int = 7, today: Optional[date] = None,
+                               columns: Sequence = CONTACT_COLUMNS) -> List[Row]:
+    """
+    Retrieve the authenticated user's contacts with a birthday within the next ``days`` days.
+
+    The window is matched against the indexed ``birthday_doy`` column with one range
+    scan, or two when it wraps from December into January. Contacts are ordered by
+    how soon their birthday comes and returned as rows of :data:`CONTACT_COLUMNS`.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The authenticated user.
+    :type user: User
+    :param days: Length of the window in days, today included.
+    :type days: int, optional
+    :param today: The day the window starts, defaults to today.
+    :type today: date, optional
+    :param columns: The columns to select, see :func:`contact_columns`.
+    :type columns: Sequence, optional
+    :return: The rows of the contacts with upcoming birthdays.
+    :rtype: List[Row]
+    """
+    stmt = upcoming_birthdays_statement(user, days=days, today=today)
+    return db.execute(stmt.with_only_columns(*columns)).all()
@@ -0,0 +1,223 @@
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from app.core.response_cache import response_cache
+from app.db.models import Contact, ContactTombstone, birthday_doy
+from app.repository.contacts import (
+    CONTACT_COLUMNS, changes_statements, contact_columns, contact_stats_statement, contacts_page_statement, count_contacts,
+    merge_changes, merge_contact_stats, search_backend, search_statement, upcoming_birthdays_statement,
+    update_counters,
+)
+from app.schemas import ContactCreate, User
+
+async def get_contact(db: AsyncSession, contact_id: int, user: User, fields: Optional[Iterable[str]] = None):
+    """
+    Retrieve a specific contact belonging to the authenticated user.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param contact_id: The ID of the contact to retrieve.
+    :type contact_id: int
+    :param user: The authenticated user.
+    :type user: User
+    :param fields: Only load these fields and the ID; the others must not be accessed.
+    :type fields: Iterable[str], optional
+    :return: The contact matching the contact_id and belonging to the user.
+    :rtype: Contact
+    """
+    stmt = select(Contact).where(Contact.id == contact_id, Contact.user_id == user.id)
+    if fields is not None:
+        stmt = stmt.options(load_only(*contact_columns(fields)))
+    return await db.scalar(stmt)
+
+async def get_contact_rows(db: AsyncSession, user: User, skip: int = 0, limit: int = 10,
+                           after: Optional[int] = None, columns: Sequence = CONTACT_COLUMNS) -> List[Row]:
+    """
+    Retrieve a page of contacts as rows of :data:`~app.repository.contacts.CONTACT_COLUMNS`.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param user: The authenticated user.
+    :type user: User
+    :param skip: Number of contacts to skip.
+    :type skip: int, optional
+    :param limit: Maximum number of contacts to return.
+    :type limit: int, optional
+    :param after: ID of the last contact of the previous page.
+    :type after: int, optional
+    :param columns: The columns to select, see :func:`~app.repository.contacts.contact_columns`.
+    :type columns: Sequence, optional
+    :return: The rows of the page.
+    :rtype: List[Row]
+    """
+    stmt = contacts_page_statement(user, skip=skip, limit=limit, after=after, columns=columns)
+    return (await db.execute(stmt)).all()
+
+async def get_changes(db: AsyncSession, user: User, since: Optional[Tuple[datetime, int]] = None, limit: int = 500,
+                      settle: float = 5.0, now: Optional[datetime] = None) -> dict:
+    """
+    Retrieve the contacts of the authenticated user changed or deleted after a point.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param user: The authenticated user.
+    :type user: User
+    :param since: Time and contact ID of the last change the client has seen, None for everything.
+    :type since: Tuple[datetime, int], optional
+    :param limit: Maximum number of changes to return.
+    :type limit: int, optional
+    :param settle: Seconds after which a change is assumed to be committed.
+    :type settle: float, optional
+    :param now: Current time, defaults to now.
+    :type now: datetime, optional
+    :return: One page of changes, see :func:`app.repository.contacts.merge_changes`.
+    :rtype: dict
+    """
+    changed, deleted = changes_statements(user, since, limit)
+    changed_rows = (await db.execute(changed)).all()
+    deleted_rows = (await db.execute(deleted)).all() if deleted is not None else []
+    return merge_changes(changed_rows, deleted_rows, since, limit, settle, now)
+
+async def get_contact_stats(db: AsyncSession, user: User, domains: int = 10, today: Optional[date] = None) -> dict:
+    """
+    Retrieve contact statistics of the authenticated user from the materialised counters.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param user: The authenticated user.
+    :type user: User
+    :param domains: Number of email domains to report, the largest first.
+    :type domains: int, optional
+    :param today: The current date, defaults to today.
+    :type today: date, optional
+    :return: The statistics, see :func:`app.repository.contacts.merge_contact_stats`.
+    :rtype: dict
+    """
+    month = (today or date.today()).month
+    return merge_contact_stats((await db.execute(contact_stats_statement(user, month, domains))).all(), month, domains)
+
+async def create_contact(db: AsyncSession, contact: ContactCreate, user: User):
+    """
+    Create a new contact for the authenticated user.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param contact: Contact information to create.
+    :type contact: ContactCreate
+    :param user: The authenticated user.
+    :type user: User
+    :return: The created contact.
+    :rtype: Contact
+    """
+    db_contact = Contact(**contact.dict(), user_id=user.id, birthday_doy=birthday_doy(contact.birthday))
+    db.add(db_contact)
+    await db.run_sync(update_counters, user.id, count_contacts({}, [(contact.email, contact.birthday)]))
+    await db.commit()
+    await response_cache.invalidate_async(user.id)
+    await db.refresh(db_contact)
+    return db_contact
+
+async def update_contact(db: AsyncSession, contact_id: int, contact: ContactCreate, user: User):
+    """
+    Update an existing contact belonging to the authenticated user.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param contact_id: The ID of the contact to update.
+    :type contact_id: int
+    :param contact: Updated contact information.
+    :type contact: ContactCreate
+    :param user: The authenticated user.
+    :type user: User
+    :return: The updated contact.
+    :rtype: Contact
+    """
+    db_contact = await get_contact(db, contact_id, user)
+    if db_contact:
+        deltas = count_contacts({}, [(db_contact.email, db_contact.birthday)], -1)
+        for key, value in contact.dict(exclude_unset=True).items():
+            setattr(db_contact, key, value)
+        db_contact.birthday_doy = birthday_doy(db_contact.birthday)
+        await db.run_sync(update_counters, user.id, count_contacts(deltas, [(db_contact.email, db_contact.birthday)]))
+        await db.commit()
+        await response_cache.invalidate_async(user.id)
+        await db.refresh(db_contact)
+    return db_contact
+
+async def delete_contact(db: AsyncSession, contact_id: int, user: User):
+    """
+    Delete a specific contact belonging to the authenticated user.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param contact_id: The ID of the contact to delete.
+    :type contact_id: int
+    :param user: The authenticated user.
+    :type user: User
+    :return: The deleted contact.
+    :rtype: Contact
+    """
+    db_contact = await get_contact(db, contact_id, user)
+    if db_contact:
+        await db.delete(db_contact)
+        db.add(ContactTombstone(contact_id=contact_id, user_id=user.id))
+        await db.run_sync(update_counters, user.id, count_contacts({}, [(db_contact.email, db_contact.birthday)], -1))
+        await db.commit()
+        await response_cache.invalidate_async(user.id)
+    return db_contact
+
+async def search_contact_rows(db: AsyncSession, user: User, name: Optional[str] = None, surname: Optional[str] = None,
+                              email: Optional[str] = None, q: Optional[str] = None, limit: int = 50,
+                              backend: Optional[str] = None, columns: Sequence = CONTACT_COLUMNS) -> List[Row]:
+    """
+    Search the authenticated user's contacts by substring, most relevant first.
+
+    Returns rows of :data:`~app.repository.contacts.CONTACT_COLUMNS` rather than ORM instances.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param user: The authenticated user.
+    :type user: User
+    :param name: Substring of the first name.
+    :type name: str, optional
+    :param surname: Substring of the last name.
+    :type surname: str, optional
+    :param email: Substring of the email.
+    :type email: str, optional
+    :param q: Substring of the first name, last name or email.
+    :type q: str, optional
+    :param limit: Maximum number of contacts to return.
+    :type limit: int, optional
+    :param backend: Force a backend instead of detecting it.
+    :type backend: str, optional
+    :param columns: The columns to select, see :func:`~app.repository.contacts.contact_columns`.
+    :type columns: Sequence, optional
+    :return: The rows of the matching contacts ordered by rank.
+    :rtype: List[Row]
+    """
+    backend = backend or await db.run_sync(search_backend)
+    stmt = search_statement(user, name=name, surname=surname, email=email, q=q, limit=limit, backend=backend)
+    return (await db.execute(stmt.with_only_columns(*columns))).all()
+
+async def get_upcoming_birthday_rows(db: AsyncSession, user: User, days: int = 7,
+                                     today: Optional[date] = None, columns: Sequence = CONTACT_COLUMNS) -> List[Row]:
+    """
+    Retrieve upcoming birthdays as rows of :data:`~app.repository.contacts.CONTACT_COLUMNS`.
+
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param user: The authenticated user.
+    :type user: User
+    :param days: Length of the window in days, today included.
+    :type days: int, optional
+    :param today: The day the window starts, defaults to today.
+    :type today: date, optional
+    :param columns: The columns to select, see :func:`~app.repository.contacts.contact_columns`.
+    :type columns: Sequence, optional
+    :return: The rows of the contacts with upcoming birthdays.
+    :rtype: List[Row]
+    """
+    stmt = upcoming_birthdays_statement(user, days=days, today=today)
+    return (await db.execute(stmt.with_only_columns(*columns))).all()
@@ -1,9 +1,11 @@
-from typing import Union
-from libgravatar import Gravatar
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import bindparam, delete, select, update
 from sqlalchemy.orm import Session
-from app.db.models import User
+from app.db.models import ContactCounter, ContactTombstone, User
 from app.schemas import UserModel
 from app.core.auth import auth_service  # Assuming auth_service is used for password hashing
+from app.core.cache import principal_cache
+from app.core.refresh_tokens import refresh_tokens
 
 def get_user_by_email(email: str, db: Session) -> User:
     """
@@ -31,32 +33,26 @@ def get_user_by_username(db: Session, username: str) -> User:
     """
     return db.query(User).filter(User.username == username).first()
 
-def create_user(body: UserModel, db: Session) -> User:
+def create_user(body: UserModel, db: Session, password_hash: Optional[str] = None) -> User:
     """
     Create a new user in the database.
 
-    This function also attempts to fetch the user's avatar using Gravatar.
+    The avatar is left empty; the Gravatar is resolved after the response, see
+    :func:`app.core.gravatar.assign_avatar`.
 
     :param body: User information to create.
     :type body: UserModel
     :param db: Database session.
     :type db: Session
+    :param password_hash: The already hashed password; hashed here when omitted.
+    :type password_hash: str, optional
     :return: The created user.
     :rtype: User
     """
-    avatar = None
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as e:
-        print(f"Error fetching avatar for {body.email}: {e}")
-        # Handle avatar retrieval errors as needed
-
     new_user = User(
         username=body.username,
         email=body.email,
-        password=auth_service.get_password_hash(body.password),
-        avatar=avatar
+        password=password_hash or auth_service.get_password_hash(body.password),
     )
 
     db.add(new_user)
@@ -79,3 +75,103 @@ def update_token(user: User, token: Union[str, None], db: Session) -> None:
     """
     user.refresh_token = token
     db.commit()
+    principal_cache.invalidate(user.email)
+
+def update_password(user: User, password_hash: str, db: Session) -> None:
+    """
+    Replace the stored password hash of a user, e.g. after a work factor change.
+
+    :param user: The user whose password hash is being replaced.
+    :type user: User
+    :param password_hash: The new password hash.
+    :type password_hash: str
+    :param db: Database session.
+    :type db: Session
+    :return: None
+    :rtype: None
+    """
+    user.password = password_hash
+    db.commit()
+
+def update_avatar(user: User, url: str, db: Session) -> User:
+    """
+    Update the avatar URL for a user.
+
+    :param user: The user whose avatar is being updated.
+    :type user: User
+    :param url: The new avatar URL.
+    :type url: str
+    :param db: Database session.
+    :type db: Session
+    :return: The updated user.
+    :rtype: User
+    """
+    user.avatar = url
+    db.commit()
+    principal_cache.invalidate(user.email)
+    return user
+
+def get_users_without_avatar(db: Session, after_id: int = 0, limit: int = 500) -> List[Tuple[int, str]]:
+    """
+    Retrieve the next batch of users that have no avatar, ordered by ID.
+
+    :param db: Database session.
+    :type db: Session
+    :param after_id: Only users with a greater ID are returned.
+    :type after_id: int
+    :param limit: Maximum number of users to return.
+    :type limit: int
+    :return: The ID and email of each user.
+    :rtype: List[Tuple[int, str]]
+    """
+    stmt = (
+        select(User.id, User.email)
+        .where(User.avatar.is_(None), User.id > after_id)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in db.execute(stmt)]
+
+def set_missing_avatars(avatars: Dict[int, str], db: Session) -> int:
+    """
+    Set the avatar of users that still have none, in one statement.
+
+    Users who uploaded an avatar in the meantime keep it.
+
+    :param avatars: Avatar URL by user ID.
+    :type avatars: Dict[int, str]
+    :param db: Database session.
+    :type db: Session
+    :return: Number of users updated.
+    :rtype: int
+    """
+    if not avatars:
+        return 0
+    stmt = (
+        update(User)
+        .where(User.id == bindparam("user_id"), User.avatar.is_(None))
+        .values(avatar=bindparam("url"))
+        .execution_options(synchronize_session=False)
+    )
+    result = db.connection().execute(stmt, [{"user_id": user_id, "url": url} for user_id, url in avatars.items()])
+    db.commit()
+    return result.rowcount
+
+def delete_user(user: User, db: Session) -> None:
+    """
+    Delete a user together with their contacts and revoke their refresh tokens.
+
+    :param user: The user to delete.
+    :type user: User
+    :param db: Database session.
+    :type db: Session
+    :return: None
+    :rtype: None
+    """
+    email = user.email
+    db.execute(delete(ContactTombstone).where(ContactTombstone.user_id == user.id))
+    db.execute(delete(ContactCounter).where(ContactCounter.user_id == user.id))
+    db.delete(user)
+    db.commit()
+    principal_cache.invalidate(email)
+    refresh_tokens.revoke_user(email)
@@ -1,13 +1,19 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status, Security, File, UploadFile
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, Request, status, Security
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.db.database import get_db
-from app.schemas import UserModel, UserResponse, TokenModel
+from app.schemas import AvatarJob, UserModel, UserResponse, TokenModel
 from app.repository import users as repository_users
 from app.core.auth import auth_service
+from app.core.config import settings
 from app.core.email import send_email, EmailSchema
-from app.core.cloudinary import cloudinary
+from app.core.templates import preferred_locale
+from app.core.gravatar import assign_avatar
+from app.core.avatars import CloudinaryUploader, downsize_image, get_avatar_uploader, process_avatar_upload, read_avatar
+from app.core.jobs import jobs
+from app.core.refresh_tokens import refresh_tokens
 from app.db.models import User  # Import User model
 from app.core.auth import auth_service
 from app.repository.users import get_user_by_email
@@ -17,55 +23,74 @@ router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def signup(body: UserModel, db: Session = Depends(get_db)):
+async def signup(body: UserModel, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
+                 accept_language: Optional[str] = Header(None)):
     """
     Register a new user.
 
     Checks if the user already exists. If not, creates a new user, generates an access token,
-    and sends a verification email.
+    and queues a verification email, in the language of ``Accept-Language``, for background
+    delivery. The password is hashed on the bounded password worker pool, which answers 503
+    with ``Retry-After`` when saturated. The user's Gravatar is looked up after the response
+    is sent, so the returned user has no avatar yet.
 
     :param body: User information to register.
     :type body: UserModel
+    :param background_tasks: Tasks run after the response is sent.
+    :type background_tasks: BackgroundTasks
     :param db: Database session.
     :type db: Session
+    :param accept_language: The Accept-Language header.
+    :type accept_language: str, optional
     :return: Newly created user information.
     :rtype: dict
     """
-    exist_user = repository_users.get_user_by_email(body.email, db)
+    exist_user = await run_in_threadpool(repository_users.get_user_by_email, body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
     
-    new_user = repository_users.create_user(body, db)
+    password_hash = await auth_service.get_password_hash_async(body.password)
+    new_user = await run_in_threadpool(repository_users.create_user, body, db, password_hash)
     token = auth_service.create_access_token(data={"sub": body.email})
     email_schema = EmailSchema(email=body.email)
-    send_email(email=email_schema, token=token)
+    await send_email(email=email_schema, token=token, fullname=body.username, locale=preferred_locale(accept_language))
+    if settings.GRAVATAR_ENABLED:
+        background_tasks.add_task(assign_avatar, new_user.id, new_user.email, db.get_bind())
     
     return {"user": new_user, "detail": "User successfully created. Please check your email to verify your account."}
 
 @router.post("/login", response_model=TokenModel)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Authenticate user credentials and provide an access token.
 
+    Password verification runs on the bounded password worker pool, which answers 503
+    with ``Retry-After`` when saturated. The refresh token starts a new token family.
+
     :param form_data: Form data containing username and password.
     :type form_data: OAuth2PasswordRequestForm
     :param db: Database session.
     :type db: Session
-    :return: Access token information.
+    :return: Access and refresh token information.
     :rtype: dict
     """
-    user = auth_service.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth_service.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
     
     access_token = auth_service.create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await run_in_threadpool(refresh_tokens.issue, user, db)
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.get('/refresh_token', response_model=TokenModel)
 def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
     """
     Refresh the access token using a refresh token.
 
+    The refresh token is rotated: the returned one replaces it, and presenting it again
+    revokes its whole family. Families live in Redis, so the database is not queried
+    unless Redis is unavailable.
+
     :param credentials: HTTP Authorization credentials containing the refresh token.
     :type credentials: HTTPAuthorizationCredentials
     :param db: Database session.
@@ -73,36 +98,98 @@ def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security)
     :return: New access and refresh tokens.
     :rtype: dict
     """
-    token = credentials.credentials
-    email = auth_service.decode_refresh_token(token)
-    user = repository_users.get_user_by_email(email, db)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    if user.refresh_token != token:
-        repository_users.update_token(user, None, db)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
-
+    email, refresh_token = refresh_tokens.rotate(credentials.credentials, db)
     access_token = auth_service.create_access_token(data={"sub": email})
-    refresh_token = auth_service.create_refresh_token(data={"sub": email})
-    repository_users.update_token(user, refresh_token, db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
-@router.post("/upload-avatar", response_model=UserResponse)
-def upload_avatar(file: UploadFile = File(...), current_user: User = Depends(auth_service.get_current_user), db: Session = Depends(get_db)):
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+def logout(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+    """
+    Revoke a refresh token together with every token rotated from it.
+
+    Access tokens already issued stay valid until they expire.
+
+    :param credentials: HTTP Authorization credentials containing the refresh token.
+    :type credentials: HTTPAuthorizationCredentials
+    :param db: Database session.
+    :type db: Session
+    """
+    refresh_tokens.revoke(credentials.credentials, db)
+
+AVATAR_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {"type": "object", "properties": {"file": {"type": "string", "format": "binary"}}, "required": ["file"]},
+        },
+        "image/*": {"schema": {"type": "string", "format": "binary"}},
+    },
+}
+
+@router.post("/upload-avatar", response_model=AvatarJob, status_code=status.HTTP_202_ACCEPTED,
+             openapi_extra={"requestBody": AVATAR_REQUEST_BODY})
+async def upload_avatar(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(auth_service.get_current_user),
+    db: Session = Depends(get_db),
+    uploader: CloudinaryUploader = Depends(get_avatar_uploader),
+):
     """
     Upload and update user avatar.
 
-    :param file: Uploaded file containing the avatar image.
-    :type file: UploadFile
+    The image, sent as a multipart ``file`` field or as the raw body, is streamed and
+    rejected early when too large or not an image, then downsized. The upload to
+    Cloudinary runs in the background; follow it at ``GET /auth/avatar-jobs/{job_id}``.
+
+    :param request: The upload request.
+    :type request: Request
+    :param background_tasks: Tasks run after the response is sent.
+    :type background_tasks: BackgroundTasks
     :param current_user: Current authenticated user.
     :type current_user: User
-    :param db: Database session.
+    :param db: Database session, whose bind the background task writes with.
     :type db: Session
-    :return: Updated user information.
+    :param uploader: Where the avatar is stored.
+    :type uploader: CloudinaryUploader
+    :raises HTTPException 413: If the avatar is too large.
+    :raises HTTPException 415: If the avatar is not a supported image.
+    :raises HTTPException 422: If the image cannot be decoded.
+    :return: The queued upload job.
+    :rtype: AvatarJob
+    """
+    data = await read_avatar(request)
+    data, _ = await run_in_threadpool(downsize_image, data)
+    job = AvatarJob(job_id=jobs.new_id())
+    jobs.register(current_user.id, job)
+    background_tasks.add_task(process_avatar_upload, job, data, current_user.id, db.get_bind(), uploader)
+    return job
+
+@router.get("/avatar-jobs/{job_id}", response_model=AvatarJob)
+def avatar_job_status(job_id: str, current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve the state of an avatar upload.
+
+    :param job_id: ID returned by the upload.
+    :type job_id: str
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: The upload job, with the avatar URL once completed.
+    :rtype: AvatarJob
+    """
+    job = jobs.get(job_id, current_user.id, AvatarJob)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return job
+
+@router.get("/jwks.json")
+def jwks():
+    """
+    Publish the public keys access tokens are signed with, so other services can verify them.
+
+    Empty when tokens are signed with the shared ``SECRET_KEY``.
+
+    :return: The keys as a JWK Set.
     :rtype: dict
     """
-    result = cloudinary.uploader.upload(file.file)
-    user = repository_users.get_user_by_email(current_user.email, db)
-    user.avatar_url = result["secure_url"]
-    db.commit()
-    return {"user": user, "detail": "Avatar updated successfully"}
+    return auth_service.token_codec.jwks()
@@ -1,17 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from typing import List
+import orjson
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.schemas import ContactCreate, Contact, User
+from app.schemas import BatchOperation, BatchResponse, BulkImportJob, ContactChanges, ContactCreate, ContactStats, Contact, User, contact_model
 from app.db.database import get_db
+from app.db.models import utcnow
 from app.repository import contacts, users as repository_users
 from app.core.auth import auth_service
+from app.core.bulk_export import MEDIA_TYPES, export_contacts
+from app.core.bulk_import import FORMATS, LineTooLong, import_contacts
+from app.core.config import settings
+from app.core.jobs import jobs
+from app.core.rate_limit import limiter
+from app.core.response_cache import response_cache
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+router = APIRouter()
 
-limiter = Limiter(key_func=get_remote_address)
+def contacts_json(rows: Sequence[Row]) -> bytes:
+    """
+    Serialise rows of :data:`~app.repository.contacts.CONTACT_COLUMNS` as a JSON list of contacts.
 
-router = APIRouter()
+    The columns have the names and types of the :class:`~app.schemas.Contact` fields,
+    so the rows are encoded directly instead of being validated into one model each.
+
+    :param rows: The contact rows.
+    :type rows: Sequence[Row]
+    :return: The JSON body.
+    :rtype: bytes
+    """
+    return orjson.dumps([row._asdict() for row in rows])
+
+def json_response(body: bytes) -> Response:
+    """
+    Wrap an already serialised JSON body in a response.
+
+    :param body: The JSON body.
+    :type body: bytes
+    :return: The response.
+    :rtype: Response
+    """
+    return Response(body, media_type="application/json")
+
+def contact_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated contact fields to return, e.g. "
+                                                    "first_name,email; id is always included"),
+) -> Optional[FrozenSet[str]]:
+    """
+    Parse the ``fields`` parameter of contact reads into a sparse fieldset.
+
+    Only the requested columns are then selected and returned, so list views do not
+    move unbounded columns such as ``additional_info`` unless asked to.
+
+    :param fields: Comma-separated field names.
+    :type fields: str, optional
+    :raises HTTPException 400: If a name is not a contact field.
+    :return: The field names, or None for every field.
+    :rtype: FrozenSet[str], optional
+    """
+    if fields is None:
+        return None
+    names = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    try:
+        contacts.contact_columns(names)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return names
+
+def fields_key(fields: Optional[FrozenSet[str]]) -> str:
+    """
+    Suffix of the response cache key of a sparse fieldset, empty for every field.
+
+    :param fields: The field names from :func:`contact_fields`.
+    :type fields: FrozenSet[str], optional
+    :return: The key suffix.
+    :rtype: str
+    """
+    return f":fields={','.join(sorted(fields))}" if fields is not None else ""
+
+def parse_change_token(since: Optional[str], now: Optional[datetime] = None) -> Optional[Tuple[datetime, int]]:
+    """
+    Decode the ``since`` token of a changes request.
+
+    :param since: The token from a previous response, None for a first sync.
+    :type since: str, optional
+    :param now: Current time, defaults to now.
+    :type now: datetime, optional
+    :raises HTTPException 400: If the token is invalid.
+    :raises HTTPException 410: If deletions since the token may have been purged.
+    :return: The point in the change history, or None.
+    :rtype: Tuple[datetime, int] | None
+    """
+    if not since:
+        return None
+    try:
+        point = contacts.decode_change_token(since)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
+    if point[0] < (now or utcnow()) - timedelta(days=settings.CHANGES_RETENTION_DAYS):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Token expired, sync all contacts again")
+    return point
 
 @router.post("/contacts/", response_model=Contact)
 @limiter.limit("5/minute")
@@ -37,40 +128,339 @@ def create_contact(
     """
     return contacts.create_contact(db=db, contact=contact, user=current_user)
 
+@router.post("/contacts/bulk", response_model=BulkImportJob)
+@limiter.limit("10/minute")
+async def bulk_import_contacts(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson or csv; defaults to the Content-Type of the body"),
+    job_id: Optional[str] = Query(None, pattern=r"^[A-Za-z0-9_-]{8,64}$", description="Client-chosen ID to poll progress with"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Import many contacts for the authenticated user from a streamed NDJSON or CSV body.
+
+    Valid rows are inserted in chunks; invalid or duplicate rows are skipped and
+    reported with their line number. To follow progress while the body is uploading,
+    pass a ``job_id`` and poll ``GET /contacts/bulk/{job_id}``.
+
+    :param request: HTTP request object.
+    :type request: Request
+    :param format: Body format, ``ndjson`` or ``csv``.
+    :type format: str, optional
+    :param job_id: ID under which the import's progress is published.
+    :type job_id: str, optional
+    :param db: Database session.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException 400: If the format is unknown or the body is not UTF-8.
+    :raises HTTPException 409: If the job ID is already in use.
+    :raises HTTPException 413: If a line is longer than ``BULK_MAX_LINE_LENGTH``.
+    :return: The finished import job with its counters and row errors.
+    :rtype: BulkImportJob
+    """
+    if format is None:
+        format = 'csv' if request.headers.get('content-type', '').startswith('text/csv') else 'ndjson'
+    if format not in FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Format must be ndjson or csv")
+
+    job = BulkImportJob(job_id=job_id or jobs.new_id())
+    if not jobs.register(current_user.id, job):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Import ID already in use")
+    try:
+        return await import_contacts(request.stream(), format, db, current_user, job)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be UTF-8")
+    except LineTooLong as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+@router.get("/contacts/bulk/{job_id}", response_model=BulkImportJob)
+def bulk_import_status(
+    job_id: str,
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Retrieve the progress of a bulk import of the authenticated user.
+
+    :param job_id: ID of the import job.
+    :type job_id: str
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: The import job.
+    :rtype: BulkImportJob
+    """
+    job = jobs.get(job_id, current_user.id, BulkImportJob)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
+
+@router.post("/contacts/batch", response_model=BatchResponse)
+@limiter.limit("10/minute")
+def batch_contacts(
+    request: Request,
+    operations: List[BatchOperation] = Body(...),
+    atomic: bool = Query(False, description="Apply every operation or none"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Create, update and delete many contacts of the authenticated user in one transaction.
+
+    Each operation gets a result with its own status. Operations that fail are
+    skipped and the rest are committed, unless ``atomic`` is set: then nothing is
+    committed and the response status is 409.
+
+    :param request: HTTP request object.
+    :type request: Request
+    :param operations: The operations, each with an ``op`` of create, update or delete.
+    :type operations: List[BatchOperation]
+    :param atomic: Whether to apply every operation or none.
+    :type atomic: bool
+    :param db: Database session.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException 409: If a concurrent write conflicted with the batch.
+    :raises HTTPException 413: If the batch has more than ``BATCH_MAX_OPERATIONS`` operations.
+    :return: Whether the batch was committed and one result per operation.
+    :rtype: BatchResponse
+    """
+    if len(operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch",
+        )
+    try:
+        committed, results = contacts.apply_batch(db, operations, current_user, atomic=atomic)
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The batch conflicts with a concurrent change")
+    body = orjson.dumps({"committed": committed, "results": results})
+    return Response(body, media_type="application/json",
+                    status_code=status.HTTP_200_OK if committed else status.HTTP_409_CONFLICT)
+
+@router.get("/contacts/export", response_class=StreamingResponse)
+@limiter.limit("10/minute")
+def export_contacts_stream(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Download every contact of the authenticated user as NDJSON or CSV.
+
+    The body is streamed batch by batch from a server-side cursor, so memory use is
+    the same for ten contacts or a million.
+
+    :param request: HTTP request object.
+    :type request: Request
+    :param format: Export format, ``ndjson`` or ``csv``.
+    :type format: str
+    :param db: Database session, whose bind the export reads from.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: The streamed export.
+    :rtype: StreamingResponse
+    """
+    return StreamingResponse(
+        export_contacts(db.get_bind(), current_user, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
 @router.get("/contacts/", response_model=List[Contact])
 def read_contacts(
+    request: Request,
     skip: int = 0, 
     limit: int = 10, 
+    after: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; switches to keyset pagination"),
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)
 ):
     """
     Retrieve contacts for the authenticated user with optional pagination.
 
+    Offset pagination uses ``skip``. Passing ``after`` switches to keyset pagination,
+    which stays fast on deep pages. Whenever a full page is returned, the cursor for
+    the next page is sent in the ``X-Next-Cursor`` header.
+
+    Pages are served from the user's response cache until one of their contacts
+    changes. The ``ETag`` of the page can be sent back in ``If-None-Match`` to get
+    ``304 Not Modified`` while it is unchanged.
+
+    :param request: HTTP request object.
+    :type request: Request
     :param skip: Number of contacts to skip.
     :type skip: int
     :param limit: Maximum number of contacts to return.
     :type limit: int
+    :param after: Opaque cursor returned by a previous page.
+    :type after: str, optional
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
     :param db: Database session.
     :type db: Session
     :param current_user: Current authenticated user.
     :type current_user: User
+    :raises HTTPException 400: If the cursor is invalid.
     :return: List of contacts.
     :rtype: List[Contact]
     """
-    return contacts.get_contacts(db=db, user=current_user, skip=skip, limit=limit)
+    after_id = None
+    if after:
+        try:
+            after_id = contacts.decode_cursor(after)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    key, cached = response_cache.lookup(current_user.id, f"page:{skip}:{limit}:{after_id or ''}{fields_key(fields)}")
+    if cached is None:
+        page = contacts.get_contact_rows(db=db, user=current_user, skip=skip, limit=limit, after=after_id,
+                                         columns=contacts.contact_columns(fields))
+        headers = {}
+        if page and len(page) == limit:
+            headers["X-Next-Cursor"] = contacts.encode_cursor(page[-1].id)
+        cached = response_cache.store(key, contacts_json(page), headers)
+    return response_cache.respond(request, cached)
+
+@router.get("/contacts/search/", response_model=List[Contact])
+def search_contacts(
+    name: str = Query(None, description="Filter contacts by first name"),
+    surname: str = Query(None, description="Filter contacts by last name"),
+    email: str = Query(None, description="Filter contacts by email"),
+    q: str = Query(None, description="Search first name, last name and email at once"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of results"),
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Search the authenticated user's contacts, most relevant first.
+
+    :param name: Filter contacts by first name.
+    :type name: str, optional
+    :param surname: Filter contacts by last name.
+    :type surname: str, optional
+    :param email: Filter contacts by email.
+    :type email: str, optional
+    :param q: Search first name, last name and email at once.
+    :type q: str, optional
+    :param limit: Maximum number of results.
+    :type limit: int, optional
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
+    :param db: Database session.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: A list of contacts matching the specified filters.
+    :rtype: List[Contact]
+    """
+    rows = contacts.search_contact_rows(db=db, user=current_user, name=name, surname=surname, email=email, q=q,
+                                        limit=limit, columns=contacts.contact_columns(fields))
+    return json_response(contacts_json(rows))
+
+@router.get("/contacts/birthdays/", response_model=List[Contact])
+def upcoming_birthdays(
+    days: int = Query(7, ge=1, le=366, description="Length of the window in days"),
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Retrieve the authenticated user's contacts with birthdays within the next ``days`` days.
+
+    :param days: Length of the window in days.
+    :type days: int
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
+    :param db: Database session.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: A list of contacts with upcoming birthdays.
+    :rtype: List[Contact]
+    """
+    rows = contacts.get_upcoming_birthday_rows(db=db, user=current_user, days=days,
+                                               columns=contacts.contact_columns(fields))
+    return json_response(contacts_json(rows))
+
+@router.get("/contacts/changes", response_model=ContactChanges)
+def read_changes(
+    since: Optional[str] = Query(None, description="Token from the previous response; omit for a first sync"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Maximum number of changes"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Retrieve the authenticated user's contacts changed or deleted since a previous sync.
+
+    Returns the ``changed`` contacts, the IDs of ``deleted`` ones and the token to
+    pass as ``since`` next time. While ``more`` is true, request the next page right
+    away. A contact may be sent again, so clients apply changes as upserts.
+
+    :param since: Token from the previous response.
+    :type since: str, optional
+    :param limit: Maximum number of changes, defaults to ``CHANGES_PAGE_SIZE``.
+    :type limit: int, optional
+    :param db: Database session.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException 400: If the token is invalid.
+    :raises HTTPException 410: If the token is too old; the client has to sync everything again.
+    :return: One page of changes.
+    :rtype: ContactChanges
+    """
+    changes = contacts.get_changes(db, current_user, since=parse_change_token(since),
+                                   limit=limit or settings.CHANGES_PAGE_SIZE, settle=settings.CHANGES_SETTLE_SECONDS)
+    return json_response(orjson.dumps(changes))
+
+@router.get("/contacts/stats", response_model=ContactStats)
+def read_stats(
+    domains: int = Query(10, ge=0, le=100, description="Number of email domains to report"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+    Retrieve the number of contacts of the authenticated user, of birthdays this month and of contacts by email domain.
+
+    Served from counters kept up to date by every contact write, so the cost does not
+    grow with the number of contacts.
+
+    :param domains: Number of email domains to report, the largest first.
+    :type domains: int
+    :param db: Database session.
+    :type db: Session
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: The statistics.
+    :rtype: ContactStats
+    """
+    return json_response(orjson.dumps(contacts.get_contact_stats(db, current_user, domains=domains)))
 
 @router.get("/contacts/{contact_id}", response_model=Contact)
 def read_contact(
     contact_id: int, 
+    request: Request,
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)
 ):
     """
     Retrieve a specific contact by ID for the authenticated user.
 
+    Served from the user's response cache, with ``ETag`` and ``If-None-Match``
+    support, like :func:`read_contacts`.
+
     :param contact_id: ID of the contact to retrieve.
     :type contact_id: int
+    :param request: HTTP request object.
+    :type request: Request
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
     :param db: Database session.
     :type db: Session
     :param current_user: Current authenticated user.
@@ -78,10 +468,14 @@ def read_contact(
     :return: Contact information.
     :rtype: Contact
     """
-    db_contact = contacts.get_contact(db=db, contact_id=contact_id, user=current_user)
-    if db_contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    return db_contact
+    key, cached = response_cache.lookup(current_user.id, f"contact:{contact_id}{fields_key(fields)}")
+    if cached is None:
+        db_contact = contacts.get_contact(db=db, contact_id=contact_id, user=current_user, fields=fields)
+        if db_contact is None:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        model = Contact if fields is None else contact_model(fields)
+        cached = response_cache.store(key, model.model_validate(db_contact).model_dump_json().encode())
+    return response_cache.respond(request, cached)
 
 @router.put("/contacts/{contact_id}", response_model=Contact)
 def update_contact(
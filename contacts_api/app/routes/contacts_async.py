@@ -0,0 +1,287 @@
+"""
+Contact routes on the async database stack.
+
+Included ahead of :mod:`app.routes.contacts` when ``DB_ASYNC`` is enabled, so these
+handlers take over the hot CRUD, search and birthday paths while every other
+contact route keeps running on the sync stack. Item paths only match integer IDs so
+they do not shadow sync routes such as ``/contacts/export``.
+"""
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import FrozenSet, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.schemas import ContactChanges, ContactCreate, ContactStats, Contact, User, contact_model
+from app.db.database import get_async_db
+from app.repository import contacts as repository_contacts, contacts_async as contacts
+from app.core.auth import auth_service
+from app.core.rate_limit import limiter
+from app.core.response_cache import response_cache
+from app.routes.contacts import contact_fields, contacts_json, fields_key, json_response, parse_change_token
+
+router = APIRouter()
+
+@router.post("/contacts/", response_model=Contact)
+@limiter.limit("5/minute")
+async def create_contact_async(
+    contact: ContactCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Create a new contact for the authenticated user.
+
+    :param contact: Contact information to create.
+    :type contact: ContactCreate
+    :param request: HTTP request object.
+    :type request: Request
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: Newly created contact information.
+    :rtype: Contact
+    """
+    return await contacts.create_contact(db=db, contact=contact, user=current_user)
+
+@router.get("/contacts/", response_model=List[Contact])
+async def read_contacts_async(
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[str] = Query(None, description="Cursor from X-Next-Cursor; switches to keyset pagination"),
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Retrieve contacts for the authenticated user with optional pagination.
+
+    Pages are served from the user's response cache, with ``ETag`` and ``If-None-Match`` support.
+
+    :param request: HTTP request object.
+    :type request: Request
+    :param skip: Number of contacts to skip.
+    :type skip: int
+    :param limit: Maximum number of contacts to return.
+    :type limit: int
+    :param after: Opaque cursor returned by a previous page.
+    :type after: str, optional
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException 400: If the cursor is invalid.
+    :return: List of contacts.
+    :rtype: List[Contact]
+    """
+    after_id = None
+    if after:
+        try:
+            after_id = repository_contacts.decode_cursor(after)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    key, cached = await response_cache.lookup_async(current_user.id, f"page:{skip}:{limit}:{after_id or ''}{fields_key(fields)}")
+    if cached is None:
+        page = await contacts.get_contact_rows(db=db, user=current_user, skip=skip, limit=limit, after=after_id,
+                                               columns=repository_contacts.contact_columns(fields))
+        headers = {}
+        if page and len(page) == limit:
+            headers["X-Next-Cursor"] = repository_contacts.encode_cursor(page[-1].id)
+        cached = await response_cache.store_async(key, contacts_json(page), headers)
+    return response_cache.respond(request, cached)
+
+@router.get("/contacts/search/", response_model=List[Contact])
+async def search_contacts_async(
+    name: str = Query(None, description="Filter contacts by first name"),
+    surname: str = Query(None, description="Filter contacts by last name"),
+    email: str = Query(None, description="Filter contacts by email"),
+    q: str = Query(None, description="Search first name, last name and email at once"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of results"),
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Search the authenticated user's contacts, most relevant first.
+
+    :param name: Filter contacts by first name.
+    :type name: str, optional
+    :param surname: Filter contacts by last name.
+    :type surname: str, optional
+    :param email: Filter contacts by email.
+    :type email: str, optional
+    :param q: Search first name, last name and email at once.
+    :type q: str, optional
+    :param limit: Maximum number of results.
+    :type limit: int, optional
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: A list of contacts matching the specified filters.
+    :rtype: List[Contact]
+    """
+    rows = await contacts.search_contact_rows(db=db, user=current_user, name=name, surname=surname, email=email, q=q,
+                                              limit=limit, columns=repository_contacts.contact_columns(fields))
+    return json_response(contacts_json(rows))
+
+@router.get("/contacts/birthdays/", response_model=List[Contact])
+async def upcoming_birthdays_async(
+    days: int = Query(7, ge=1, le=366, description="Length of the window in days"),
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Retrieve the authenticated user's contacts with birthdays within the next ``days`` days.
+
+    :param days: Length of the window in days.
+    :type days: int
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: A list of contacts with upcoming birthdays.
+    :rtype: List[Contact]
+    """
+    rows = await contacts.get_upcoming_birthday_rows(db=db, user=current_user, days=days,
+                                                     columns=repository_contacts.contact_columns(fields))
+    return json_response(contacts_json(rows))
+
+@router.get("/contacts/changes", response_model=ContactChanges)
+async def read_changes_async(
+    since: Optional[str] = Query(None, description="Token from the previous response; omit for a first sync"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Maximum number of changes"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Retrieve the authenticated user's contacts changed or deleted since a previous sync.
+
+    :param since: Token from the previous response.
+    :type since: str, optional
+    :param limit: Maximum number of changes, defaults to ``CHANGES_PAGE_SIZE``.
+    :type limit: int, optional
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :raises HTTPException 400: If the token is invalid.
+    :raises HTTPException 410: If the token is too old; the client has to sync everything again.
+    :return: One page of changes.
+    :rtype: ContactChanges
+    """
+    changes = await contacts.get_changes(db, current_user, since=parse_change_token(since),
+                                         limit=limit or settings.CHANGES_PAGE_SIZE,
+                                         settle=settings.CHANGES_SETTLE_SECONDS)
+    return json_response(orjson.dumps(changes))
+
+@router.get("/contacts/stats", response_model=ContactStats)
+async def read_stats_async(
+    domains: int = Query(10, ge=0, le=100, description="Number of email domains to report"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Retrieve the number of contacts of the authenticated user, of birthdays this month and of contacts by email domain.
+
+    :param domains: Number of email domains to report, the largest first.
+    :type domains: int
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: The statistics.
+    :rtype: ContactStats
+    """
+    return json_response(orjson.dumps(await contacts.get_contact_stats(db, current_user, domains=domains)))
+
+@router.get("/contacts/{contact_id:int}", response_model=Contact)
+async def read_contact_async(
+    contact_id: int,
+    request: Request,
+    fields: Optional[FrozenSet[str]] = Depends(contact_fields),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Retrieve a specific contact by ID for the authenticated user, through the response cache.
+
+    :param contact_id: ID of the contact to retrieve.
+    :type contact_id: int
+    :param request: HTTP request object.
+    :type request: Request
+    :param fields: Contact fields to return, all of them when not given.
+    :type fields: FrozenSet[str], optional
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: Contact information.
+    :rtype: Contact
+    """
+    key, cached = await response_cache.lookup_async(current_user.id, f"contact:{contact_id}{fields_key(fields)}")
+    if cached is None:
+        db_contact = await contacts.get_contact(db=db, contact_id=contact_id, user=current_user, fields=fields)
+        if db_contact is None:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        model = Contact if fields is None else contact_model(fields)
+        cached = await response_cache.store_async(key, model.model_validate(db_contact).model_dump_json().encode())
+    return response_cache.respond(request, cached)
+
+@router.put("/contacts/{contact_id:int}", response_model=Contact)
+async def update_contact_async(
+    contact_id: int,
+    contact: ContactCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Update a specific contact by ID for the authenticated user.
+
+    :param contact_id: ID of the contact to update.
+    :type contact_id: int
+    :param contact: Updated contact information.
+    :type contact: ContactCreate
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: Updated contact information.
+    :rtype: Contact
+    """
+    db_contact = await contacts.update_contact(db=db, contact_id=contact_id, contact=contact, user=current_user)
+    if db_contact is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return db_contact
+
+@router.delete("/contacts/{contact_id:int}", response_model=Contact)
+async def delete_contact_async(
+    contact_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(auth_service.get_current_user_async)
+):
+    """
+    Delete a specific contact by ID for the authenticated user.
+
+    :param contact_id: ID of the contact to delete.
+    :type contact_id: int
+    :param db: Async database session.
+    :type db: AsyncSession
+    :param current_user: Current authenticated user.
+    :type current_user: User
+    :return: Deleted contact information.
+    :rtype: Contact
+    """
+    db_contact = await contacts.delete_contact(db=db, contact_id=contact_id, user=current_user)
+    if db_contact is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return db_contact
@@ -0,0 +1,38 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.core.config import settings
+from app.db.pool_metrics import render_prometheus
+
+router = APIRouter(tags=["metrics"])
+bearer = HTTPBearer(auto_error=False)
+
+def require_metrics_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> None:
+    """
+    Let only scrapers presenting ``METRICS_TOKEN`` through, when one is configured.
+
+    :param credentials: The bearer token of the request.
+    :type credentials: HTTPAuthorizationCredentials, optional
+    :raises HTTPException 401: If the token is missing or wrong.
+    """
+    if settings.METRICS_TOKEN is None:
+        return
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+            dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """
+    Export connection pool telemetry in the Prometheus text format.
+
+    Reports, per engine, the pool size, checked-out connections, overflow in use,
+    checkout wait times, timeouts and connection counters.
+
+    :return: The metrics page.
+    :rtype: str
+    """
+    return render_prometheus()
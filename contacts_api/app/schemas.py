@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, create_model
+from typing import Annotated, FrozenSet, List, Literal, Optional, Type, Union
 from datetime import date, datetime
 
 class ContactBase(BaseModel):
@@ -19,6 +20,82 @@ class Contact(ContactBase):
     class Config:
         from_attributes = True  # Updated to Pydantic V2
 
+@lru_cache(maxsize=64)
+def contact_model(fields: FrozenSet[str]) -> Type[BaseModel]:
+    """
+    Build a model with only some :class:`Contact` fields, for sparse fieldset responses.
+
+    Models are built once per field set; there are at most 64 of them since ``id`` is
+    always included.
+
+    :param fields: Names of the fields to keep.
+    :type fields: FrozenSet[str]
+    :return: The model, validating from ORM attributes like :class:`Contact`.
+    :rtype: Type[BaseModel]
+    """
+    picked = {name: (field.annotation, field) for name, field in Contact.model_fields.items()
+              if name in fields or name == 'id'}
+    return create_model(f"Contact[{','.join(picked)}]", __config__=ConfigDict(from_attributes=True), **picked)
+
+class BulkRowError(BaseModel):
+    line: int
+    error: str
+
+class BulkImportJob(BaseModel):
+    job_id: str
+    status: str = "running"
+    processed: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: List[BulkRowError] = []
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    contact: ContactCreate
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    contact: ContactCreate
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+BatchOperation = Annotated[Union[BatchCreate, BatchUpdate, BatchDelete], Field(discriminator="op")]
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    contact: Optional[Contact] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchResult]
+
+class ContactChanges(BaseModel):
+    changed: List[Contact]
+    deleted: List[int]
+    next: str
+    more: bool
+
+class DomainCount(BaseModel):
+    domain: str
+    count: int
+
+class ContactStats(BaseModel):
+    total: int
+    birthdays_this_month: int
+    domains: List[DomainCount]
+
+class AvatarJob(BaseModel):
+    job_id: str
+    status: str = "queued"
+    url: Optional[str] = None
+    error: Optional[str] = None
+
 class UserBase(BaseModel):
     username: str = Field(..., min_length=5, max_length=16)
     email: EmailStr
@@ -44,6 +121,16 @@ class User(UserBase):
     class Config:
         from_attributes = True  # Updated to Pydantic V2
 
+class Principal(BaseModel):
+    id: int
+    username: Optional[str] = None
+    email: str
+    created_at: Optional[datetime] = None
+    avatar: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 class UserResponse(BaseModel):
     user: User
     detail: str = "User successfully created"
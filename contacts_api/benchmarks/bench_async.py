@@ -0,0 +1,43 @@
+"""
+Load test of the sync and async database stacks.
+
+Starts the app under uvicorn once with ``DB_ASYNC=false`` and once with
+``DB_ASYNC=true`` and drives ``GET /api/contacts/`` with an increasing number of
+concurrent clients.
+
+Run from the ``contacts_api`` directory (a Postgres ``DATABASE_URL`` gives the
+meaningful numbers; SQLite serialises writers and hides most of the difference)::
+
+    python -m benchmarks.bench_async --concurrency 10 100 500
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import SessionLocal, bearer, create_user, load, report, reset_database, run_server, seed_contacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        seed_contacts(db, user, 1000)
+        headers = bearer(user)
+
+    results = {}
+    for mode in ("sync", "async"):
+        with run_server(args.port, env={"DB_ASYNC": str(mode == "async")}) as base_url:
+            for concurrency in args.concurrency:
+                results[f"{mode} x{concurrency}"] = asyncio.run(
+                    load(base_url, "GET", "/api/contacts/", args.requests, concurrency, headers=headers)
+                )
+    report("GET /api/contacts/ sync vs async stack", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Bulk import throughput for ``POST /api/contacts/bulk``.
+
+Streams ``--rows`` contacts (100,000 by default) as NDJSON and as CSV through the
+endpoint and compares the rate with ``create_contact``, which inserts and commits one
+contact at a time (timed on ``--single`` rows).
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_bulk_import
+"""
+import argparse
+import json
+import resource
+import time
+from datetime import date
+
+from benchmarks.common import SessionLocal, app, bearer, create_user, reset_database
+
+from starlette.testclient import TestClient
+from app.repository import contacts as repository_contacts
+from app.schemas import ContactCreate
+
+
+def contact(n: int, prefix: str) -> dict:
+    return {
+        "first_name": f"First{n}",
+        "last_name": f"Last{n}",
+        "email": f"{prefix}{n}@example.com",
+        "phone_number": f"{n:010d}",
+        "birthday": date(1980 + n % 30, n % 12 + 1, n % 28 + 1).isoformat(),
+    }
+
+
+def ndjson_body(rows: int, prefix: str):
+    for n in range(rows):
+        yield (json.dumps(contact(n, prefix)) + "\n").encode()
+
+
+def csv_body(rows: int, prefix: str):
+    yield b"first_name,last_name,email,phone_number,birthday\n"
+    for n in range(rows):
+        yield (",".join(contact(n, prefix).values()) + "\n").encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=2_000)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        headers = bearer(user)
+
+        started = time.perf_counter()
+        for n in range(args.single):
+            repository_contacts.create_contact(db, ContactCreate(**contact(n, "single")), user)
+        single_rate = args.single / (time.perf_counter() - started)
+
+    results = {}
+    with TestClient(app) as client:
+        for fmt, body in (("ndjson", ndjson_body), ("csv", csv_body)):
+            started = time.perf_counter()
+            response = client.post(
+                "/api/contacts/bulk", params={"format": fmt}, content=body(args.rows, fmt), headers=headers,
+            )
+            elapsed = time.perf_counter() - started
+            job = response.json()
+            assert response.status_code == 200 and job["inserted"] == args.rows, job
+            results[fmt] = (elapsed, args.rows / elapsed)
+
+    print(f"Import of {args.rows} contacts")
+    print(f"{'scenario':<28}{'seconds':>10}{'rows/s':>12}")
+    print(f"{'create_contact (one by one)':<28}{args.rows / single_rate:>10.1f}{single_rate:>12.0f}")
+    for fmt, (elapsed, rate) in results.items():
+        print(f"{'bulk ' + fmt:<28}{elapsed:>10.1f}{rate:>12.0f}")
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Rendering time of verification emails.
+
+Renders ``--messages`` verification emails (10,000 by default) three ways:
+
+* ``fresh environment``: a new Jinja environment and template load per message, as
+  building ``FastMail(conf)`` with a template folder for every email did;
+* ``cached template``: :data:`app.core.templates.email_templates` per message;
+* ``render_many``: one batch call for all messages.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_email_templates
+"""
+import argparse
+import time
+
+from benchmarks.common import report, summarise
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from app.core.templates import TEMPLATE_FOLDER, email_templates
+
+
+def context(n: int) -> dict:
+    return {"fullname": f"user{n}", "verification_link": f"https://example.com/verify?token={n:032d}"}
+
+
+def timed(render, messages: int) -> dict:
+    samples = []
+    started = time.perf_counter()
+    for n in range(messages):
+        t0 = time.perf_counter()
+        render(n)
+        samples.append(time.perf_counter() - t0)
+    return summarise(samples, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--locale", default=None)
+    args = parser.parse_args()
+
+    def fresh(n):
+        env = Environment(loader=FileSystemLoader(str(TEMPLATE_FOLDER)), autoescape=select_autoescape(["html"]))
+        return env.get_template("email_template.html").render(context(n))
+
+    email_templates.preload()
+    results = {
+        "fresh environment": timed(fresh, args.messages),
+        "cached template": timed(
+            lambda n: email_templates.render("email_template.html", locale=args.locale, **context(n)), args.messages
+        ),
+    }
+
+    started = time.perf_counter()
+    email_templates.render_many("email_template.html", (context(n) for n in range(args.messages)), locale=args.locale)
+    elapsed = time.perf_counter() - started
+    per_message = elapsed / args.messages
+    results["render_many"] = {"rps": args.messages / elapsed, "p50_ms": per_message * 1000,
+                              "p95_ms": per_message * 1000, "p99_ms": per_message * 1000}
+
+    report(f"Rendering {args.messages} verification emails (render_many shows the mean)", results)
+    for name, r in results.items():
+        print(f"{name:<28}{args.messages / r['rps']:>10.2f} s total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Peak memory and throughput of the contact export.
+
+Seeds ``--rows`` contacts (1,000,000 by default) and compares the streaming export
+behind ``GET /api/contacts/export`` with loading every contact through
+``get_contacts(...).all()`` and serialising it as ``List[Contact]``, as paging the list
+endpoint does. Each scenario runs in a forked child so its peak RSS is its own.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_export
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from typing import List
+
+from benchmarks.common import SessionLocal, create_user, engine, reset_database, seed_contacts
+
+from pydantic import TypeAdapter
+from app.core.bulk_export import export_contacts
+from app.repository import contacts as repository_contacts
+from app.schemas import Contact
+
+
+def stream_export(user, rows: int, fmt: str) -> int:
+    return sum(len(chunk) for chunk in export_contacts(engine, user, fmt))
+
+
+def load_all(user, rows: int, fmt: str) -> int:
+    with SessionLocal() as db:
+        contacts = repository_contacts.get_contacts(db, user, limit=rows)
+        return len(TypeAdapter(List[Contact]).dump_json(contacts))
+
+
+def child(queue, scenario, user, rows, fmt):
+    started = time.perf_counter()
+    size = scenario(user, rows, fmt)
+    elapsed = time.perf_counter() - started
+    queue.put((elapsed, size, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        seed_contacts(db, user, args.rows)
+        db.refresh(user)
+        db.expunge(user)
+    engine.dispose()  # children must not share the parent's pooled connections
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    context = multiprocessing.get_context("fork")
+    print(f"Export of {args.rows} contacts (parent RSS before fork {baseline:.0f} MiB)")
+    print(f"{'scenario':<28}{'seconds':>10}{'rows/s':>12}{'MiB out':>10}{'peak RSS MiB':>14}")
+    for name, scenario, fmt in (
+        ("stream ndjson", stream_export, "ndjson"),
+        ("stream csv", stream_export, "csv"),
+        ("load all + List[Contact]", load_all, "json"),
+    ):
+        queue = context.Queue()
+        process = context.Process(target=child, args=(queue, scenario, user, args.rows, fmt))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise SystemExit(f"{name} failed")
+        elapsed, size, rss = queue.get()
+        print(f"{name:<28}{elapsed:>10.1f}{args.rows / elapsed:>12.0f}{size / 2 ** 20:>10.0f}{rss:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+CRUD latency during a login storm.
+
+Measures ``GET /api/contacts/`` alone, then again while ``--logins`` concurrent
+clients hammer ``POST /api/auth/login``. Logins turned away by the password pool
+show up as errors (503) rather than as slower CRUD requests.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_login_storm
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import SessionLocal, auth_service, bearer, create_user, load, report, reset_database, run_server, seed_contacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_WORKERS for the server")
+    parser.add_argument("--queue-size", type=int, default=32, help="PASSWORD_QUEUE_SIZE for the server")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        user.password = auth_service.get_password_hash("secret")
+        db.commit()
+        seed_contacts(db, user, 100)
+        headers = bearer(user)
+    credentials = {"username": user.email, "password": "secret"}
+
+    async def storm(base_url):
+        crud = asyncio.ensure_future(load(base_url, "GET", "/api/contacts/", args.requests, args.concurrency, headers=headers))
+        logins = load(base_url, "POST", "/api/auth/login", args.logins * 4, args.logins, data=credentials)
+        return await asyncio.gather(crud, logins)
+
+    results = {}
+    env = {"PASSWORD_WORKERS": str(args.workers), "PASSWORD_QUEUE_SIZE": str(args.queue_size)}
+    with run_server(args.port, env=env) as base_url:
+        results["CRUD alone"] = asyncio.run(
+            load(base_url, "GET", "/api/contacts/", args.requests, args.concurrency, headers=headers)
+        )
+        results["CRUD during storm"], results["login storm"] = asyncio.run(storm(base_url))
+    report("CRUD p99 during a login storm", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Offset against keyset (cursor) pagination for ``GET /api/contacts/``.
+
+Fetches page ``--page`` (10,000 by default) of ``--limit`` contacts both with
+``skip=`` and with ``after=<cursor>``.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_pagination
+"""
+import argparse
+
+from benchmarks.common import SessionLocal, app, bearer, create_user, measure, report, reset_database, seed_contacts
+
+from starlette.testclient import TestClient
+from app.db.models import Contact
+from app.repository import contacts as repository_contacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    skip = (args.page - 1) * args.limit
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        seed_contacts(db, user, skip + args.limit)
+        headers = bearer(user)
+        last_id = db.query(Contact.id).filter(Contact.user_id == user.id).order_by(Contact.id).offset(skip - 1).limit(1).scalar()
+    cursor = repository_contacts.encode_cursor(last_id)
+
+    with TestClient(app) as client:
+        offset_page = client.get("/api/contacts/", params={"skip": skip, "limit": args.limit}, headers=headers).json()
+        cursor_page = client.get("/api/contacts/", params={"after": cursor, "limit": args.limit}, headers=headers).json()
+        assert offset_page == cursor_page, "offset and cursor pages differ"
+
+        results = {
+            "offset": measure(
+                lambda: client.get("/api/contacts/", params={"skip": skip, "limit": args.limit}, headers=headers),
+                args.iterations,
+            ),
+            "cursor": measure(
+                lambda: client.get("/api/contacts/", params={"after": cursor, "limit": args.limit}, headers=headers),
+                args.iterations,
+            ),
+        }
+    report(f"GET /api/contacts/ page {args.page} (limit {args.limit})", results)
+
+
+if __name__ == "__main__":
+    main()
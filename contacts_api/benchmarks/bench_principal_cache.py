@@ -0,0 +1,40 @@
+"""
+Requests/sec for ``GET /api/contacts/`` with the principal cache on and off.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_principal_cache
+"""
+import argparse
+
+from benchmarks.common import SessionLocal, app, bearer, create_user, measure, report, reset_database, seed_contacts
+
+from starlette.testclient import TestClient
+from app.core.cache import principal_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        seed_contacts(db, user, 100)
+        headers = bearer(user)
+
+    results = {}
+    with TestClient(app) as client:
+        for enabled in (False, True):
+            principal_cache.enabled = enabled
+            principal_cache.local.clear()
+            client.get("/api/contacts/", headers=headers)
+            results[f"cache {'on' if enabled else 'off'}"] = measure(
+                lambda: client.get("/api/contacts/", headers=headers), args.requests
+            )
+    report("GET /api/contacts/", results)
+
+
+if __name__ == "__main__":
+    main()
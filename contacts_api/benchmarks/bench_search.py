@@ -0,0 +1,51 @@
+"""
+Contact search latency with the indexed backend against plain ILIKE scans.
+
+Seeds ``--contacts`` rows (1M by default) and runs the same searches through
+``search_contact_rows`` with the detected backend (pg_trgm on Postgres, FTS5 on
+SQLite) and with the ``like`` fallback.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_search --contacts 1000000
+"""
+import argparse
+import time
+
+from benchmarks.common import SessionLocal, create_user, measure, report, reset_database, seed_contacts
+
+from app.repository import contacts as repository_contacts
+
+SEARCHES = {
+    "name=First12345": {"name": "First12345"},
+    "surname=Last99": {"surname": "Last99"},
+    "email=c4242": {"email": "c4242"},
+    "q=Last777": {"q": "Last777"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        started = time.perf_counter()
+        seed_contacts(db, user, args.contacts)
+        print(f"seeded {args.contacts} contacts in {time.perf_counter() - started:.1f}s")
+
+        backend = repository_contacts.search_backend(db)
+        results = {}
+        for label, params in SEARCHES.items():
+            for name in (backend, "like"):
+                results[f"{label} [{name}]"] = measure(
+                    lambda: repository_contacts.search_contact_rows(db, user, backend=name, **params), args.iterations
+                )
+    report(f"search over {args.contacts} contacts", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Cost of turning 1,000 contacts into a JSON response body.
+
+Each scenario builds the body of ``GET /api/contacts/?limit=1000`` (``--contacts``):
+
+* ``ORM + response_model``: ORM objects validated through ``List[Contact]`` with
+  ``from_attributes`` and encoded with the stdlib ``json`` module, as FastAPI's
+  default ``JSONResponse`` did;
+* ``ORM + ORJSONResponse``: the same validation, encoded with ``orjson``;
+* ``rows + orjson``: rows of :data:`app.repository.contacts.CONTACT_COLUMNS`
+  encoded by :func:`app.routes.contacts.contacts_json`, with no model per row.
+
+``serialise`` scenarios time the encoding of already loaded contacts, ``fetch +``
+scenarios include the query.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+from typing import List
+
+from benchmarks.common import SessionLocal, create_user, measure, report, reset_database, seed_contacts
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from app.repository import contacts
+from app.routes.contacts import contacts_json
+from app.schemas import Contact
+
+adapter = TypeAdapter(List[Contact])
+
+
+def response_model_body(page) -> bytes:
+    return JSONResponse(adapter.dump_python(adapter.validate_python(page, from_attributes=True), mode="json")).body
+
+
+def orjson_response_body(page) -> bytes:
+    return ORJSONResponse(adapter.dump_python(adapter.validate_python(page, from_attributes=True), mode="json")).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    reset_database()
+    with SessionLocal() as db:
+        user = create_user(db)
+        seed_contacts(db, user, args.contacts)
+
+        page = contacts.get_contacts(db, user, limit=args.contacts)
+        rows = contacts.get_contact_rows(db, user, limit=args.contacts)
+        assert response_model_body(page) == contacts_json(rows)
+
+        def fetch_objects():
+            db.expunge_all()
+            return contacts.get_contacts(db, user, limit=args.contacts)
+
+        results = {
+            "serialise ORM + model": measure(lambda: response_model_body(page), args.iterations),
+            "serialise ORM + orjson": measure(lambda: orjson_response_body(page), args.iterations),
+            "serialise rows + orjson": measure(lambda: contacts_json(rows), args.iterations),
+            "fetch + ORM + model": measure(lambda: response_model_body(fetch_objects()), args.iterations),
+            "fetch + rows + orjson": measure(
+                lambda: contacts_json(contacts.get_contact_rows(db, user, limit=args.contacts)), args.iterations
+            ),
+        }
+    report(f"JSON body of {args.contacts} contacts (req/s = bodies per second)", results)
+
+
+if __name__ == "__main__":
+    main()
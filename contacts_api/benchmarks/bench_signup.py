@@ -0,0 +1,100 @@
+"""
+Signup latency under load with background email delivery.
+
+Starts a local aiosmtpd server that takes ``--smtp-delay`` seconds to accept each
+message, runs the app against it and sends ``--requests`` signups with
+``--concurrency`` clients. Signups only enqueue the verification email, so their
+latency should not include the SMTP round trip; the time until the last email
+arrives shows the delivery throughput of the background worker.
+
+For comparison, ``inline SMTP send`` times what signup used to wait for on every
+request: a fresh connection, handshake and send.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_signup
+"""
+import argparse
+import asyncio
+import socket
+import time
+from email.message import EmailMessage
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+
+from benchmarks.common import load, measure, report, reset_database, run_server
+
+
+class SlowHandler:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--smtp-delay", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    handler = SlowHandler(args.smtp_delay)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+
+    def send_inline():
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = "bench@example.com", "user@example.com", "Email Verification"
+        message.set_content("<p>Hi</p>", subtype="html")
+        asyncio.run(aiosmtplib.send(message, hostname="127.0.0.1", port=controller.port))
+
+    results = {"inline SMTP send": measure(send_inline, 20)}
+    handler.received = 0
+
+    reset_database()
+    env = {
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(controller.port),
+        "MAIL_SSL": "False",
+        "MAIL_TLS": "False",
+        "MAIL_USE_CREDENTIALS": "False",
+        "MAIL_QUEUE_BACKEND": "memory",
+        "BCRYPT_ROUNDS": "4",  # keep hashing out of the measurement
+    }
+
+    def signup(n):
+        # UserModel also requires id and created_at; the server ignores both
+        return {"json": {"id": 0, "created_at": "2024-01-01T00:00:00", "username": f"user{n:06d}",
+                         "email": f"user{n}@example.com", "password": "secret"}}
+
+    try:
+        with run_server(args.port, env=env) as base_url:
+            started = time.perf_counter()
+            results["signup (queued email)"] = asyncio.run(
+                load(base_url, "POST", "/api/auth/signup", args.requests, args.concurrency, build=signup)
+            )
+            while handler.received < args.requests and time.perf_counter() - started < 300:
+                time.sleep(0.05)
+            drained = time.perf_counter() - started
+    finally:
+        controller.stop()
+
+    report(f"POST /api/auth/signup x{args.requests}, SMTP accepts in {args.smtp_delay * 1000:.0f} ms", results)
+    print(f"{handler.received} emails delivered {drained:.1f}s after the first signup")
+
+
+if __name__ == "__main__":
+    main()
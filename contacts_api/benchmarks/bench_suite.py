@@ -0,0 +1,204 @@
+"""
+End-to-end benchmark of the main API endpoints, compared against a stored baseline.
+
+Seeds the database with :mod:`benchmarks.seed`, starts the app under uvicorn and
+drives each scenario with concurrent httpx clients, spreading requests over the
+seeded users:
+
+* ``login``: ``POST /api/auth/login`` (bcrypt bound, so it gets ``--login-requests``);
+* ``list``: ``GET /api/contacts/`` pages;
+* ``search``: ``GET /api/contacts/search/`` with a name prefix;
+* ``birthdays``: ``GET /api/contacts/birthdays/``;
+* ``create``: ``POST /api/contacts/`` with unique contacts;
+* ``bulk import``: ``POST /api/contacts/bulk`` with ``--bulk-size`` NDJSON rows each.
+
+Rate limits are switched off in the server so they do not turn load into 429s,
+and each scenario is warmed up with ``--warmup`` unmeasured requests. Throughput
+and p50/p95/p99 per scenario are printed and, with ``--output``, saved as JSON. With ``--baseline`` each scenario is compared against a previous output;
+the exit status is 1 when a p95 grew, or the throughput fell, by more than
+``--tolerance`` percent. Baselines only compare on the machine, database and
+arguments they were recorded with; ``benchmarks/baselines/sqlite.json`` holds a run
+with the default arguments on SQLite.
+
+Run from the ``contacts_api`` directory; ``DATABASE_URL`` picks SQLite or Postgres::
+
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baselines/sqlite.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.common import load, report, run_server
+from benchmarks.seed import PASSWORD, fake_pool, seed
+
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+
+SCENARIOS = ("login", "list", "search", "birthdays", "create", "bulk import")
+
+
+def login_all(base_url: str, emails: list) -> list:
+    """
+    Log every seeded user in once and build their request headers.
+
+    :param base_url: The server URL.
+    :type base_url: str
+    :param emails: Emails of the users.
+    :type emails: list
+    :return: One set of headers per user.
+    :rtype: list
+    """
+    async def login(client, email):
+        response = await client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def run():
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            return await asyncio.gather(*(login(client, email) for email in emails))
+
+    return asyncio.run(run())
+
+
+def run_scenarios(base_url: str, emails: list, headers: list, args) -> dict:
+    """
+    Run the selected scenarios one after the other.
+
+    :param base_url: The server URL.
+    :type base_url: str
+    :param emails: Emails of the seeded users.
+    :type emails: list
+    :param headers: Request headers of each user, from :func:`login_all`.
+    :type headers: list
+    :param args: Parsed command line.
+    :type args: argparse.Namespace
+    :return: Output of :func:`benchmarks.common.load` by scenario.
+    :rtype: dict
+    """
+    pool = fake_pool(1000, args.seed + 1)
+    serial = itertools.count()
+
+    def as_user(n):
+        return {"headers": headers[n % len(headers)]}
+
+    def new_contact():
+        contact = dict(pool[next(serial) % len(pool)])
+        local, domain = contact["email"].split("@")
+        contact["email"] = f"{local}.new{next(serial)}@{domain}"
+        return contact
+
+    def create(n):
+        return {**as_user(n), "json": new_contact()}
+
+    def bulk(n):
+        body = "\n".join(json.dumps(new_contact()) for _ in range(args.bulk_size))
+        return {"headers": {**headers[n % len(headers)], "Content-Type": "application/x-ndjson"}, "content": body}
+
+    def login(n):
+        return {"data": {"username": emails[n % len(emails)], "password": PASSWORD}}
+
+    def search(n):
+        return {**as_user(n), "params": {"q": pool[n % len(pool)]["first_name"][:3]}}
+
+    requests, concurrency = args.requests, args.concurrency
+    plans = {
+        "login": ("POST", "/api/auth/login", args.login_requests, login),
+        "list": ("GET", "/api/contacts/", requests, lambda n: {**as_user(n), "params": {"limit": 50}}),
+        "search": ("GET", "/api/contacts/search/", requests, search),
+        "birthdays": ("GET", "/api/contacts/birthdays/", requests, lambda n: {**as_user(n), "params": {"days": 7}}),
+        "create": ("POST", "/api/contacts/", requests, create),
+        "bulk import": ("POST", "/api/contacts/bulk", args.bulk_requests, bulk),
+    }
+    results = {}
+    for name in args.scenarios:
+        method, path, count, build = plans[name]
+        warmup = min(args.warmup, count // 10)
+        if warmup:
+            asyncio.run(load(base_url, method, path, warmup, concurrency, build=build))
+        results[name] = asyncio.run(load(base_url, method, path, count, concurrency, build=build))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Print the change of every scenario against a baseline and list the regressions.
+
+    :param results: Results of this run by scenario.
+    :type results: dict
+    :param baseline: Results of the baseline run by scenario.
+    :type baseline: dict
+    :param tolerance: Allowed worsening in percent.
+    :type tolerance: float
+    :return: Names of the scenarios that regressed.
+    :rtype: list
+    """
+    regressions = []
+    print(f"\nAgainst the baseline (tolerance {tolerance:.0f}%)")
+    print(f"{'scenario':<28}{'req/s':>12}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<28}{'(new)':>12}")
+            continue
+        delta = {key: (result[key] / before[key] - 1) * 100 if before[key] else 0.0
+                 for key in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+        regressed = delta["rps"] < -tolerance or delta["p95_ms"] > tolerance
+        print(f"{name:<28}{delta['rps']:>+11.1f}%{delta['p50_ms']:>+9.1f}%{delta['p95_ms']:>+9.1f}%"
+              f"{delta['p99_ms']:>+9.1f}%{'  REGRESSED' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--contacts", type=int, default=1000, help="Contacts per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--bulk-requests", type=int, default=20)
+    parser.add_argument("--bulk-size", type=int, default=1000, help="Contacts per bulk import")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests before each scenario, at most a tenth of it")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against the results saved in this file")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="Allowed worsening in percent")
+    args = parser.parse_args()
+
+    emails = seed(args.users, args.contacts, seed=args.seed)
+    env = {"RATE_LIMIT_ENABLED": "False", "MAIL_WORKER_ENABLED": "False"}
+    with run_server(args.port, env=env, workers=args.workers) as base_url:
+        headers = login_all(base_url, emails)
+        results = run_scenarios(base_url, emails, headers, args)
+    report(f"{args.users} users x {args.contacts} contacts, concurrency {args.concurrency}", results)
+
+    if args.output:
+        document = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": make_url(settings.DATABASE_URL).get_backend_name(),
+            "python": platform.python_version(),
+            "arguments": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline["results"], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Search and birthday latency for one user as the number of tenants grows.
+
+Every tenant gets ``--contacts`` contacts, so the table grows with the tenant
+count while the caller's own data stays the same size. With per-user
+filtering the latency should stay roughly flat.
+
+Run from the ``contacts_api`` directory::
+
+    python -m benchmarks.bench_tenants --tenants 1 10 100 1000
+"""
+import argparse
+
+from benchmarks.common import SessionLocal, app, bearer, create_user, measure, report, reset_database, seed_contacts
+
+from starlette.testclient import TestClient
+
+ENDPOINTS = {
+    "search q=Last1": ("/api/contacts/search/", {"q": "Last1"}),
+    "birthdays": ("/api/contacts/birthdays/", {}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    with TestClient(app) as client:
+        for tenants in args.tenants:
+            reset_database()
+            with SessionLocal() as db:
+                users = [create_user(db, f"tenant{n}@example.com") for n in range(tenants)]
+                for user in users:
+                    seed_contacts(db, user, args.contacts)
+                headers = bearer(users[0])
+            for label, (path, params) in ENDPOINTS.items():
+                results[f"{label} @ {tenants} tenants"] = measure(
+                    lambda: client.get(path, params=params, headers=headers), args.iterations
+                )
+    report(f"per-user latency ({args.contacts} contacts per tenant)", results)
+
+
+if __name__ == "__main__":
+    main()
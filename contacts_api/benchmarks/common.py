@@ -0,0 +1,250 @@
+"""
+Shared setup for the benchmark scripts.
+
+Importing this module fills in any settings missing from the environment so the
+benchmarks run against a throwaway SQLite database. Point ``DATABASE_URL`` at a
+Postgres instance before running to benchmark the real thing.
+"""
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Callable, Optional
+
+import httpx
+
+_DB_PATH = os.path.join(tempfile.gettempdir(), "contacts_bench.db")
+
+_DEFAULTS = {
+    "DATABASE_URL": f"sqlite:///{_DB_PATH}",
+    "REDIS_URL": "redis://localhost:6379/0",
+    "POSTGRES_DB": "contacts",
+    "POSTGRES_USER": "contacts",
+    "POSTGRES_PASSWORD": "contacts",
+    "SECRET_KEY": "benchmark-secret",
+    "ALGORITHM": "HS256",
+    "MAIL_USERNAME": "bench@example.com",
+    "MAIL_PASSWORD": "bench",
+    "MAIL_FROM": "bench@example.com",
+    "MAIL_PORT": "465",
+    "MAIL_SERVER": "localhost",
+    "MAIL_TLS": "False",
+    "MAIL_SSL": "True",
+    "CLOUDINARY_CLOUD_NAME": "bench",
+    "CLOUDINARY_API_KEY": "bench",
+    "CLOUDINARY_API_SECRET": "bench",
+}
+
+for _key, _value in _DEFAULTS.items():
+    os.environ.setdefault(_key, _value)
+
+from app.main import app  # noqa: E402  (imported first to settle the auth/users import cycle)
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.db.models import Base, Contact, User, birthday_doy  # noqa: E402
+from app.core.auth import auth_service  # noqa: E402
+from app.core.cache import principal_cache  # noqa: E402
+
+
+def reset_database():
+    """
+    Drop and recreate every table and forget cached principals.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    principal_cache.local.clear()
+
+
+def create_user(db, email: str = "bench@example.com") -> User:
+    """
+    Insert a user directly, skipping password hashing.
+
+    :param db: Database session.
+    :type db: Session
+    :param email: The user's email.
+    :type email: str
+    :return: The created user.
+    :rtype: User
+    """
+    user = User(username=email.split("@")[0][:16], email=email, password="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def seed_contacts(db, user: User, count: int, batch: int = 5000):
+    """
+    Bulk insert ``count`` synthetic contacts for a user.
+
+    :param db: Database session.
+    :type db: Session
+    :param user: The owner of the contacts.
+    :type user: User
+    :param count: Number of contacts to insert.
+    :type count: int
+    :param batch: Rows per INSERT statement.
+    :type batch: int
+    """
+    for start in range(0, count, batch):
+        rows = [
+            {
+                "first_name": f"First{n}",
+                "last_name": f"Last{n}",
+                "email": f"u{user.id}.c{n}@example.com",
+                "phone_number": f"{n:010d}",
+                "birthday": date(1980 + n % 30, n % 12 + 1, n % 28 + 1),
+                "birthday_doy": birthday_doy(date(1980 + n % 30, n % 12 + 1, n % 28 + 1)),
+                "additional_info": None,
+                "user_id": user.id,
+            }
+            for n in range(start, min(start + batch, count))
+        ]
+        db.execute(Contact.__table__.insert(), rows)
+        db.commit()
+
+
+def bearer(user: User) -> dict:
+    """
+    Build an Authorization header with a fresh access token for a user.
+
+    :param user: The user to authenticate as.
+    :type user: User
+    :return: The request headers.
+    :rtype: dict
+    """
+    return {"Authorization": f"Bearer {auth_service.create_access_token(data={'sub': user.email})}"}
+
+
+def measure(func, iterations: int) -> dict:
+    """
+    Call ``func`` repeatedly and summarise the latencies.
+
+    :param func: The callable to time.
+    :type func: Callable[[], Any]
+    :param iterations: Number of calls.
+    :type iterations: int
+    :return: Throughput and latency percentiles in milliseconds.
+    :rtype: dict
+    """
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return summarise(samples, elapsed)
+
+
+def report(title: str, results: dict):
+    """
+    Print a small table of benchmark results.
+
+    :param title: Heading for the table.
+    :type title: str
+    :param results: Mapping of scenario name to the output of :func:`measure`.
+    :type results: dict
+    """
+    print(title)
+    print(f"{'scenario':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r.get('errors', 0):>8}")
+
+
+def summarise(samples: list, elapsed: float) -> dict:
+    """
+    Summarise latency samples in seconds like :func:`measure` does.
+
+    :param samples: Latencies in seconds.
+    :type samples: list
+    :param elapsed: Wall-clock duration of the run in seconds.
+    :type elapsed: float
+    :return: Throughput and latency percentiles in milliseconds.
+    :rtype: dict
+    """
+    samples = sorted(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return {"rps": len(samples) / elapsed, "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+@contextlib.contextmanager
+def run_server(port: int = 8765, env: Optional[dict] = None, workers: int = 1):
+    """
+    Run the app under uvicorn in a subprocess for the duration of the block.
+
+    :param port: Port to listen on.
+    :type port: int
+    :param env: Extra environment variables for the server.
+    :type env: dict, optional
+    :param workers: Number of uvicorn workers.
+    :type workers: int
+    :return: The base URL of the server.
+    :rtype: str
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **(env or {})},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(base_url + "/docs", timeout=0.5)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def load(base_url: str, method: str, path: str, requests: int, concurrency: int,
+               build: Optional[Callable[[int], dict]] = None, **kwargs) -> dict:
+    """
+    Send ``requests`` requests with ``concurrency`` in flight and summarise the latencies.
+
+    :param base_url: The server URL.
+    :type base_url: str
+    :param method: HTTP method.
+    :type method: str
+    :param path: Request path.
+    :type path: str
+    :param requests: Total number of requests.
+    :type requests: int
+    :param concurrency: Number of concurrent clients.
+    :type concurrency: int
+    :param build: Returns extra request arguments for the n-th request, e.g. a unique body.
+    :type build: Callable[[int], dict], optional
+    :return: Throughput, latency percentiles in milliseconds and the error count.
+    :rtype: dict
+    """
+    samples, errors = [], 0
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for n in remaining:
+                t0 = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs, **(build(n) if build else {}))
+                    errors += response.status_code >= 400
+                except httpx.HTTPError:
+                    errors += 1
+                samples.append(time.perf_counter() - t0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {**summarise(samples, elapsed), "errors": errors}
@@ -0,0 +1,141 @@
+"""
+Load a benchmark database with ``--users`` users of ``--contacts`` contacts each.
+
+Contacts are built from :func:`fakecontacts.generate_fake_data`. Faker is slow, so a
+pool of ``--pool`` fake records is generated once, from a fixed ``--seed``, and
+reused with a unique email per contact; the same arguments always produce the
+same data. Rows are inserted in batches with one multi-row INSERT each, and every
+user gets the same password, hashed once.
+
+Run from the ``contacts_api`` directory; ``DATABASE_URL`` picks the database::
+
+    python -m benchmarks.seed --users 10 --contacts 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+from typing import List
+
+from benchmarks.common import SessionLocal, auth_service, reset_database
+from app.db.models import Contact, User, birthday_doy
+
+# fakecontacts.py lives next to the contacts_api directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import fakecontacts  # noqa: E402
+
+PASSWORD = "benchmark"
+
+
+def user_email(n: int) -> str:
+    """
+    Email of the n-th seeded user.
+
+    :param n: Index of the user, from 0.
+    :type n: int
+    :return: The email.
+    :rtype: str
+    """
+    return f"bench{n}@example.com"
+
+
+def fake_pool(size: int, seed: int) -> List[dict]:
+    """
+    Generate fake contacts reproducibly.
+
+    :param size: Number of contacts.
+    :type size: int
+    :param seed: Seed of Faker and of :mod:`random`, which ``generate_fake_data`` both use.
+    :type seed: int
+    :return: Contacts as returned by ``generate_fake_data``.
+    :rtype: List[dict]
+    """
+    fakecontacts.fake.seed_instance(seed)
+    random.seed(seed)
+    return [fakecontacts.generate_fake_data() for _ in range(size)]
+
+
+def contact_rows(pool: List[dict], user_id: int, start: int, stop: int) -> List[dict]:
+    """
+    Build contact rows ``start`` to ``stop`` of a user from the fake pool.
+
+    :param pool: Fake contacts from :func:`fake_pool`.
+    :type pool: List[dict]
+    :param user_id: Owner of the contacts.
+    :type user_id: int
+    :param start: Index of the first contact.
+    :type start: int
+    :param stop: Index after the last contact.
+    :type stop: int
+    :return: Rows for an INSERT into ``contacts``.
+    :rtype: List[dict]
+    """
+    rows = []
+    for n in range(start, stop):
+        fake = pool[(user_id * 7919 + n) % len(pool)]
+        local, domain = fake["email"].split("@")
+        birthday = date.fromisoformat(fake["birthday"])
+        rows.append({
+            **fake,
+            "email": f"{local}.u{user_id}.c{n}@{domain}",
+            "birthday": birthday,
+            "birthday_doy": birthday_doy(birthday),
+            "user_id": user_id,
+        })
+    return rows
+
+
+def seed(users: int, contacts: int, pool_size: int = 1000, seed: int = 42, batch: int = 5000) -> List[str]:
+    """
+    Recreate the database and fill it with users and their contacts.
+
+    :param users: Number of users.
+    :type users: int
+    :param contacts: Number of contacts per user.
+    :type contacts: int
+    :param pool_size: Number of distinct fake records to draw contacts from.
+    :type pool_size: int
+    :param seed: Random seed.
+    :type seed: int
+    :param batch: Rows per INSERT statement.
+    :type batch: int
+    :return: Emails of the users, whose password is :data:`PASSWORD`.
+    :rtype: List[str]
+    """
+    reset_database()
+    pool = fake_pool(pool_size, seed)
+    password = auth_service.get_password_hash(PASSWORD)
+    emails = [user_email(n) for n in range(users)]
+    with SessionLocal() as db:
+        db.execute(User.__table__.insert(), [
+            {"username": email.split("@")[0], "email": email, "password": password} for email in emails
+        ])
+        db.commit()
+        user_ids = db.scalars(User.__table__.select().with_only_columns(User.id).order_by(User.id)).all()
+        for user_id in user_ids:
+            for start in range(0, contacts, batch):
+                db.execute(Contact.__table__.insert(), contact_rows(pool, user_id, start, min(start + batch, contacts)))
+            db.commit()
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--contacts", type=int, default=1000, help="Contacts per user")
+    parser.add_argument("--pool", type=int, default=1000, help="Distinct fake records")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args.users, args.contacts, args.pool, args.seed)
+    elapsed = time.perf_counter() - started
+    total = args.users * args.contacts
+    print(f"Seeded {args.users} users and {total} contacts in {elapsed:.1f} s ({total / elapsed:.0f} contacts/s)")
+
+
+if __name__ == "__main__":
+    main()
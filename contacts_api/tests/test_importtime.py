@@ -0,0 +1,82 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+import tempfile
+import unittest
+from typing import Dict
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget for `import app.main` in one worker; override with IMPORT_TIME_BUDGET_MS on slow machines
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 3000))
+
+# Integrations set up on first use, which importing the app must not pull in
+LAZY_MODULES = ("httpx", "cloudinary")
+
+
+def import_times(env: Dict[str, str]) -> Dict[str, int]:
+    """
+    Import the app in a fresh interpreter under ``-X importtime``.
+
+    :param env: Environment of the interpreter.
+    :type env: Dict[str, str]
+    :return: Cumulative import time in microseconds by module.
+    :rtype: Dict[str, int]
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode:
+        raise AssertionError(f"import app.main failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        # A database in a missing directory: any connection made at import fails the import
+        database = os.path.join(cls.tmp.name, "missing", "app.db")
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+        # The first run also writes the bytecode caches, so the fastest of a few runs is kept
+        runs = [import_times(env) for _ in range(3)]
+        cls.times = min(runs, key=lambda times: times["app.main"])
+        cls.database = database
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_import_does_not_touch_the_database(self):
+        self.assertFalse(os.path.exists(os.path.dirname(self.database)))
+
+    def test_lazy_integrations_are_not_imported(self):
+        self.assertEqual([module for module in LAZY_MODULES if module in self.times], [])
+
+    def test_import_time_budget(self):
+        elapsed_ms = self.times["app.main"] / 1000
+        slowest = sorted(
+            ((module, cumulative) for module, cumulative in self.times.items() if module.startswith("app.")),
+            key=lambda item: -item[1],
+        )[:5]
+        self.assertLess(
+            elapsed_ms, BUDGET_MS,
+            f"import app.main took {elapsed_ms:.0f} ms, over the {BUDGET_MS:.0f} ms budget; slowest app modules: "
+            + ", ".join(f"{module} {cumulative / 1000:.0f} ms" for module, cumulative in slowest),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import unittest
+from unittest import mock
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from app.main import app
+from app.core import avatars
+from app.core.auth import auth_service
+from app.db.database import get_db
+from app.db.models import Base, User as UserModel
+
+
+class FakeUploader:
+    """Stands in for Cloudinary and remembers what it was given."""
+
+    def __init__(self, fail: bool = False):
+        self.uploads = []
+        self.fail = fail
+
+    def upload(self, data: bytes, public_id: str) -> str:
+        if self.fail:
+            raise ConnectionError("Cloudinary unavailable")
+        self.uploads.append((public_id, data))
+        return f"https://images.example.com/{public_id}.jpg"
+
+
+def image_bytes(size=(2000, 1000), mode="RGB", format="JPEG") -> bytes:
+    output = io.BytesIO()
+    Image.new(mode, size, "red").save(output, format=format)
+    return output.getvalue()
+
+
+class TestAvatarUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="testuser", email="avatar@example.com", password="x")
+            db.add(user)
+            db.commit()
+            self.user_id = user.id
+        self.uploader = FakeUploader()
+
+        def override_get_db():
+            with self.Session() as db:
+                yield db
+
+        self.overrides = dict(app.dependency_overrides)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[avatars.get_avatar_uploader] = lambda: self.uploader
+        app.dependency_overrides[auth_service.get_current_user] = lambda: UserModel(id=self.user_id, email="avatar@example.com")
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(self.overrides)
+        self.engine.dispose()
+
+    def avatar_url(self):
+        with self.Session() as db:
+            return db.get(UserModel, self.user_id).avatar
+
+    def test_multipart_upload_is_downsized_and_persisted(self):
+        response = self.client.post("/api/auth/upload-avatar", files={"file": ("me.jpg", image_bytes(), "image/jpeg")})
+        self.assertEqual(response.status_code, 202, response.text)
+        job = self.client.get(f"/api/auth/avatar-jobs/{response.json()['job_id']}").json()
+
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["url"], f"https://images.example.com/ContactsAPI/avatars/{self.user_id}.jpg")
+        self.assertEqual(self.avatar_url(), job["url"])
+        public_id, data = self.uploader.uploads[0]
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (512, 256))
+
+    def test_raw_body_keeps_transparency(self):
+        body = image_bytes(size=(64, 64), mode="RGBA", format="PNG")
+        response = self.client.post("/api/auth/upload-avatar", content=body, headers={"Content-Type": "image/png"})
+        self.assertEqual(response.status_code, 202, response.text)
+        self.assertEqual(Image.open(io.BytesIO(self.uploader.uploads[0][1])).format, "PNG")
+
+    def test_limits_are_enforced_before_upload(self):
+        with mock.patch.object(avatars.settings, "AVATAR_MAX_BYTES", 1000):
+            too_large = self.client.post("/api/auth/upload-avatar", content=image_bytes(), headers={"Content-Type": "image/jpeg"})
+            streamed = self.client.post("/api/auth/upload-avatar", content=iter([image_bytes()]), headers={"Content-Type": "image/jpeg"})
+        not_image = self.client.post("/api/auth/upload-avatar", content=b"#!/bin/sh\necho hi\n", headers={"Content-Type": "image/png"})
+        wrong_type = self.client.post("/api/auth/upload-avatar", content=b"{}", headers={"Content-Type": "application/json"})
+        disguised = self.client.post("/api/auth/upload-avatar", files={"file": ("me.png", b"GIF89a but broken", "image/png")})
+
+        self.assertEqual([r.status_code for r in (too_large, streamed, not_image, wrong_type, disguised)], [413, 413, 415, 415, 422])
+        self.assertEqual(self.uploader.uploads, [])
+
+    def test_failed_upload_is_reported_on_the_job(self):
+        self.uploader.fail = True
+        response = self.client.post("/api/auth/upload-avatar", content=image_bytes(), headers={"Content-Type": "image/jpeg"})
+        job = self.client.get(f"/api/auth/avatar-jobs/{response.json()['job_id']}").json()
+        self.assertEqual((job["status"], job["error"]), ("failed", "Cloudinary unavailable"))
+        self.assertIsNone(self.avatar_url())
+        self.assertEqual(self.client.get("/api/auth/avatar-jobs/unknown").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import unittest
+from datetime import date
+from unittest import mock
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from typing import List
+from app.main import app
+from app.core.auth import auth_service
+from app.core.rate_limit import limiter
+from app.db.database import get_db
+from app.db.models import Base, Contact, User as UserModel
+from app.repository import contacts as repository_contacts
+from app.schemas import BatchOperation, ContactCreate, Principal
+
+
+def contact_body(n: int, **changes) -> dict:
+    body = {"first_name": f"First{n}", "last_name": f"Last{n}", "email": f"contact{n}@example.com",
+            "phone_number": f"{n:010d}", "birthday": date(1990, 1, 1 + n).isoformat()}
+    return {**body, **changes}
+
+
+operations_adapter = TypeAdapter(List[BatchOperation])
+
+
+class TestApplyBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="batchuser", email="batch@example.com", password="x")
+            other = UserModel(username="otheruser", email="other@example.com", password="x")
+            db.add_all([user, other])
+            db.commit()
+            self.user, self.other = Principal.model_validate(user), Principal.model_validate(other)
+            self.ids = [repository_contacts.create_contact(db, ContactCreate(**contact_body(n)), self.user).id
+                        for n in range(3)]
+            self.foreign_id = repository_contacts.create_contact(db, ContactCreate(**contact_body(9)), self.other).id
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def apply(self, operations, atomic=False):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        operations = operations_adapter.validate_python(operations)
+        event.listen(self.engine, "before_cursor_execute", record)
+        try:
+            with self.Session() as db:
+                committed, results = repository_contacts.apply_batch(db, operations, self.user, atomic=atomic)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", record)
+        return committed, results, statements
+
+    def emails(self):
+        with self.Session() as db:
+            return set(db.scalars(select(Contact.email).where(Contact.user_id == self.user.id)))
+
+    def test_mixed_batch_is_applied_set_based(self):
+        committed, results, statements = self.apply([
+            {"op": "create", "contact": contact_body(5)},
+            {"op": "update", "id": self.ids[0], "contact": contact_body(0, first_name="Renamed")},
+            {"op": "delete", "id": self.ids[1]},
+            {"op": "create", "contact": contact_body(6)},
+            {"op": "update", "id": self.ids[2], "contact": contact_body(2, first_name="Also")},
+        ])
+        self.assertTrue(committed)
+        self.assertEqual([r["status"] for r in results], [201, 200, 200, 201, 200])
+        self.assertEqual([r["index"] for r in results], list(range(5)))
+        self.assertEqual(results[0]["contact"]["email"], "contact5@example.com")
+        self.assertEqual(results[3]["contact"]["email"], "contact6@example.com")
+        self.assertEqual(results[1]["contact"]["first_name"], "Renamed")
+        self.assertEqual(results[2]["contact"]["id"], self.ids[1])
+        self.assertEqual(
+            self.emails(),
+            {"contact0@example.com", "contact2@example.com", "contact5@example.com", "contact6@example.com"})
+        # One DELETE and its tombstones, one SELECT, one UPDATE for both updates, one INSERT for both
+        # creates and one upsert of the counters
+        self.assertEqual(len(statements), 6)
+
+    def test_failures_are_reported_per_operation(self):
+        committed, results, _ = self.apply([
+            {"op": "update", "id": self.foreign_id, "contact": contact_body(7)},
+            {"op": "delete", "id": 10_000},
+            {"op": "create", "contact": contact_body(1)},
+            {"op": "create", "contact": contact_body(5)},
+            {"op": "create", "contact": contact_body(5, first_name="Again")},
+            {"op": "delete", "id": self.ids[0]},
+            {"op": "update", "id": self.ids[0], "contact": contact_body(0)},
+        ])
+        self.assertTrue(committed)
+        self.assertEqual([r["status"] for r in results], [404, 404, 409, 201, 409, 200, 422])
+        self.assertIsNone(results[2]["contact"])
+        self.assertEqual(self.emails(), {"contact1@example.com", "contact2@example.com", "contact5@example.com"})
+
+    def test_deleted_emails_can_be_reused(self):
+        committed, results, _ = self.apply([
+            {"op": "create", "contact": contact_body(0, first_name="New")},
+            {"op": "delete", "id": self.ids[0]},
+        ])
+        self.assertEqual([r["status"] for r in results], [201, 200])
+        self.assertNotEqual(results[0]["contact"]["id"], self.ids[0])
+
+    def test_atomic_batch_rolls_back_on_any_failure(self):
+        committed, results, _ = self.apply([
+            {"op": "create", "contact": contact_body(5)},
+            {"op": "delete", "id": 10_000},
+        ], atomic=True)
+        self.assertFalse(committed)
+        self.assertEqual([r["status"] for r in results], [424, 404])
+        self.assertEqual(self.emails(), {f"contact{n}@example.com" for n in range(3)})
+
+    def test_partial_update_keeps_unset_fields(self):
+        with self.Session() as db:
+            db.get(Contact, self.ids[0]).additional_info = "keep me"
+            db.commit()
+        _, results, _ = self.apply([{"op": "update", "id": self.ids[0], "contact": contact_body(0, first_name="X")}])
+        self.assertEqual(results[0]["contact"]["additional_info"], "keep me")
+        self.assertEqual(results[0]["contact"]["first_name"], "X")
+
+
+class TestBatchRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="batchuser", email="batch@example.com", password="x")
+            db.add(user)
+            db.commit()
+            self.user = Principal.model_validate(user)
+
+        def override_get_db():
+            with self.Session() as db:
+                yield db
+
+        patcher = mock.patch.object(limiter, "enabled", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.overrides = dict(app.dependency_overrides)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[auth_service.get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(self.overrides)
+        self.engine.dispose()
+
+    def test_batch(self):
+        response = self.client.post("/api/contacts/batch", json=[
+            {"op": "create", "contact": contact_body(1)},
+            {"op": "delete", "id": 10_000},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["committed"])
+        self.assertEqual([r["status"] for r in body["results"]], [201, 404])
+        self.assertEqual(body["results"][0]["contact"]["birthday"], "1990-01-02")
+
+    def test_atomic_failure_is_a_conflict(self):
+        response = self.client.post("/api/contacts/batch", params={"atomic": True},
+                                    json=[{"op": "delete", "id": 10_000}])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()["committed"])
+
+    def test_unknown_operation_is_rejected(self):
+        response = self.client.post("/api/contacts/batch", json=[{"op": "merge", "id": 1}])
+        self.assertEqual(response.status_code, 422)
+
+    def test_too_many_operations(self):
+        with mock.patch("app.routes.contacts.settings.BATCH_MAX_OPERATIONS", 1):
+            response = self.client.post("/api/contacts/batch", json=[{"op": "delete", "id": 1}] * 2)
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == '__main__':
+    unittest.main()
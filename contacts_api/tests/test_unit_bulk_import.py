@@ -0,0 +1,131 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from unittest import mock
+import fakeredis
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core import bulk_export, bulk_import
+from app.core.jobs import JobRegistry
+from app.core.redis_client import set_redis
+from app.db.models import Base, Contact, User as UserModel
+from app.schemas import AvatarJob, BulkImportJob
+
+
+async def stream(body: bytes, size: int = 7):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def collect(body: bytes, fmt: str):
+    async def run():
+        return [record async for record in bulk_import.iter_records(stream(body), fmt)]
+    return asyncio.run(run())
+
+
+class TestBulkImport(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.owner = UserModel(username="testuser", email="testuser@example.com", password="x")
+        self.db.add(self.owner)
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_ndjson_records_survive_chunk_boundaries(self):
+        body = '{"first_name": "Zoë"}\n\nnot json\n[1]\r\n{"a": 1}'.encode()
+        self.assertEqual(collect(body, "ndjson"), [
+            (1, {"first_name": "Zoë"}), (3, "Invalid JSON"), (4, "Expected a JSON object"), (5, {"a": 1}),
+        ])
+
+    def test_csv_records_with_header_and_multiline_cells(self):
+        body = b'first_name,additional_info\r\nJohn,"line one\nline two"\nJane,\nBob\n"open'
+        self.assertEqual(collect(body, "csv"), [
+            (2, {"first_name": "John", "additional_info": "line one\nline two"}),
+            (4, {"first_name": "Jane"}),
+            (5, "Expected 2 fields, got 1"),
+            (6, "Unterminated quoted field"),
+        ])
+
+    def test_long_lines_are_rejected_before_they_are_buffered(self):
+        with mock.patch.object(bulk_import.settings, "BULK_MAX_LINE_LENGTH", 20):
+            self.assertEqual(collect(b'{"a": 1}\n' * 3, "ndjson"), [(n, {"a": 1}) for n in (1, 2, 3)])
+            for body, fmt in ((b'{"a": 1}\n' + b"x" * 100, "ndjson"), (b'first_name\n"' + b"x\n" * 20, "csv")):
+                with self.assertRaises(bulk_import.LineTooLong):
+                    collect(body, fmt)
+
+    def test_import_reports_invalid_and_duplicate_rows(self):
+        body = (
+            "first_name,last_name,email,phone_number,birthday\n"
+            "John,Doe,john@example.com,1,1990-01-01\n"
+            "Jane,Doe,not-an-email,2,1990-01-02\n"
+            "Jim,Doe,john@example.com,3,1990-01-03\n"
+            "Ann,Lee,ann@example.com,4,1990-02-29\n"
+            "Amy,Lee,amy@example.com,5,1990-03-01\n"
+        ).encode()
+        job = BulkImportJob(job_id="job")
+        with mock.patch.object(bulk_import.settings, "BULK_CHUNK_SIZE", 2):
+            asyncio.run(bulk_import.import_contacts(stream(body), "csv", self.db, self.owner, job))
+
+        self.assertEqual((job.status, job.processed, job.inserted, job.failed), ("completed", 5, 2, 3))
+        self.assertEqual([error.line for error in job.errors], [3, 4, 5])
+        self.assertIn("email", job.errors[0].error)
+        self.assertEqual(job.errors[1].error, "Contact with this email already exists")
+        stored = self.db.execute(select(Contact.email, Contact.birthday_doy, Contact.user_id).order_by(Contact.id)).all()
+        self.assertEqual(stored, [("john@example.com", 1, self.owner.id), ("amy@example.com", 61, self.owner.id)])
+
+    def test_export_round_trips_through_import(self):
+        body = b"first_name,last_name,email,phone_number,birthday,additional_info\n" + b"".join(
+            f'F{n},L{n},c{n}@example.com,{n},1990-01-0{n + 1},"a, b"\n'.encode() for n in range(5)
+        )
+        job = BulkImportJob(job_id="job")
+        asyncio.run(bulk_import.import_contacts(stream(body), "csv", self.db, self.owner, job))
+        other = UserModel(username="otheruser", email="other@example.com", password="x")
+        self.db.add(other)
+        self.db.commit()
+
+        with mock.patch.object(bulk_export.settings, "EXPORT_BATCH_SIZE", 2):
+            chunks = list(bulk_export.export_contacts(self.engine, self.owner, "csv"))
+            lines = b"".join(bulk_export.export_contacts(self.engine, self.owner, "ndjson")).splitlines()
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(chunks[0], b"id,first_name,last_name,email,phone_number,birthday,additional_info\n")
+        self.assertEqual(len(lines), 5)
+        self.assertIn(b'"birthday": "1990-01-01", "additional_info": "a, b"', lines[0])
+        self.assertEqual(list(bulk_export.export_contacts(self.engine, other, "ndjson")), [])
+
+        self.db.execute(Contact.__table__.delete())
+        self.db.commit()
+        job = BulkImportJob(job_id="again")
+        asyncio.run(bulk_import.import_contacts(stream(b"".join(chunks)), "csv", self.db, self.owner, job))
+        self.assertEqual((job.inserted, job.failed), (5, 0))
+
+
+class TestJobRegistry(unittest.TestCase):
+
+    def test_redis_backend_is_shared_by_workers(self):
+        set_redis(fakeredis.FakeRedis(decode_responses=True))
+        self.addCleanup(set_redis, None)
+        worker, other_worker = JobRegistry(backend="redis"), JobRegistry(backend="redis")
+        job = BulkImportJob(job_id="import-1")
+        self.assertTrue(worker.register(1, job))
+        self.assertFalse(other_worker.register(1, BulkImportJob(job_id="import-1")))
+        job.processed = 10
+        worker.save(1, job)
+        self.assertEqual(other_worker.get("import-1", 1, BulkImportJob).processed, 10)
+        self.assertIsNone(other_worker.get("import-1", 2, BulkImportJob))
+        self.assertIsNone(other_worker.get("import-1", 1, AvatarJob))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+import fakeredis
+from fakeredis.aioredis import FakeRedis as AsyncFakeRedis
+from redis import ConnectionError as RedisConnectionError
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache, PrincipalCache
+from app.core.auth import auth_service
+from app.core.redis_client import set_async_redis, set_redis
+from app.db.models import User
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_entry_expires_after_ttl(self):
+        timer = FakeTimer()
+        cache = TTLCache(maxsize=10, ttl=5, timer=timer)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        timer.now = 5
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+
+class TestPrincipalCache(unittest.TestCase):
+
+    def setUp(self):
+        self.user = User(id=1, username='johndoe', email='johndoe@example.com', created_at=datetime.now())
+
+    def test_set_and_invalidate(self):
+        cache = PrincipalCache(ttl=60)
+        principal = cache.set(self.user.email, self.user)
+        self.assertEqual(principal.id, 1)
+        self.assertEqual(cache.get(self.user.email), principal)
+        cache.invalidate(self.user.email)
+        self.assertIsNone(cache.get(self.user.email))
+
+    def test_disabled_cache_never_hits(self):
+        cache = PrincipalCache(enabled=False)
+        cache.set(self.user.email, self.user)
+        self.assertIsNone(cache.get(self.user.email))
+
+    def test_get_current_user_queries_database_once(self):
+        cache = PrincipalCache(ttl=60)
+        token = auth_service.create_access_token(data={"sub": self.user.email})
+        with patch('app.core.auth.principal_cache', cache), \
+                patch('app.core.auth.repository_users.get_user_by_email', return_value=self.user) as get_user_mock:
+            first = auth_service.get_current_user(token, MagicMock(spec=Session))
+            second = auth_service.get_current_user(token, MagicMock(spec=Session))
+        get_user_mock.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(second.email, 'johndoe@example.com')
+
+
+    def test_redis_failure_bypasses_the_cache(self):
+        client = fakeredis.FakeRedis(decode_responses=True)
+        set_redis(client)
+        self.addCleanup(set_redis, None)
+        timer = FakeTimer()
+        cache = PrincipalCache(ttl=60, backend="redis", redis_retry=5, timer=timer)
+        cache.set(self.user.email, self.user)
+        down = RedisConnectionError("down")
+        with patch.object(client, "get", side_effect=down), patch.object(client, "delete", side_effect=down):
+            self.assertIsNone(cache.get(self.user.email))
+            # The user row is already committed when the cache is invalidated
+            cache.invalidate(self.user.email)
+        # Redis is left alone until the retry delay has passed
+        with patch.object(client, "get") as get:
+            self.assertIsNone(cache.get(self.user.email))
+            get.assert_not_called()
+        timer.now = 5
+        self.assertEqual(cache.get(self.user.email).id, 1)
+
+    def test_get_current_user_async_uses_the_asyncio_client(self):
+        server = fakeredis.FakeServer()
+        set_redis(fakeredis.FakeRedis(server=server, decode_responses=True))
+        set_async_redis(AsyncFakeRedis(server=server, decode_responses=True))
+        self.addCleanup(set_redis, None)
+        self.addCleanup(set_async_redis, None)
+        cache = PrincipalCache(ttl=60, backend="redis")
+        token = auth_service.create_access_token(data={"sub": self.user.email})
+        db = MagicMock()
+
+        async def scenario():
+            db.scalar = AsyncMock(return_value=self.user)
+            first = await auth_service.get_current_user_async(token, db)
+            second = await auth_service.get_current_user_async(token, db)
+            await cache.invalidate_async(self.user.email)
+            return first, second
+
+        with patch('app.core.auth.principal_cache', cache):
+            first, second = asyncio.run(scenario())
+        db.scalar.assert_awaited_once()
+        self.assertEqual(first, second)
+        self.assertIsNone(cache.get(self.user.email))
+
+if __name__ == '__main__':
+    unittest.main()
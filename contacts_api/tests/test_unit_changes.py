@@ -0,0 +1,165 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from typing import List
+from app.main import app
+from app.core.auth import auth_service
+from app.db.database import get_db
+from app.db.models import Base, ContactTombstone, User as UserModel, utcnow
+from app.repository import contacts as repository_contacts
+from app.schemas import BatchOperation, ContactCreate, Principal
+
+
+def contact_body(n: int, **changes) -> dict:
+    body = {"first_name": f"First{n}", "last_name": f"Last{n}", "email": f"contact{n}@example.com",
+            "phone_number": f"{n:010d}", "birthday": date(1990, 1, 1 + n).isoformat()}
+    return {**body, **changes}
+
+
+class TestChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="syncuser", email="sync@example.com", password="x")
+            other = UserModel(username="otheruser", email="other@example.com", password="x")
+            db.add_all([user, other])
+            db.commit()
+            self.user, self.other = Principal.model_validate(user), Principal.model_validate(other)
+            self.ids = [repository_contacts.create_contact(db, ContactCreate(**contact_body(n)), self.user).id
+                        for n in range(3)]
+            repository_contacts.create_contact(db, ContactCreate(**contact_body(9)), self.other)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def changes(self, token=None, limit=500, settle=0.0, now=None):
+        since = repository_contacts.decode_change_token(token) if token else None
+        with self.Session() as db:
+            return repository_contacts.get_changes(db, self.user, since=since, limit=limit, settle=settle, now=now)
+
+    def test_first_sync_returns_every_contact(self):
+        changes = self.changes()
+        self.assertEqual([c["id"] for c in changes["changed"]], self.ids)
+        self.assertEqual(changes["deleted"], [])
+        self.assertFalse(changes["more"])
+        self.assertNotIn("updated_at", changes["changed"][0])
+
+    def test_only_changes_since_the_token_are_returned(self):
+        token = self.changes()["next"]
+        self.assertEqual(self.changes(token)["changed"], [])
+        with self.Session() as db:
+            repository_contacts.update_contact(db, self.ids[1], ContactCreate(**contact_body(1, first_name="New")), self.user)
+            repository_contacts.delete_contact(db, self.ids[2], self.user)
+            repository_contacts.create_contact(db, ContactCreate(**contact_body(5)), self.user)
+        changes = self.changes(token)
+        self.assertEqual([(c["id"], c["first_name"]) for c in changes["changed"]],
+                         [(self.ids[1], "New"), (self.ids[2] + 2, "First5")])
+        self.assertEqual(changes["deleted"], [self.ids[2]])
+        self.assertEqual(self.changes(changes["next"])["changed"], [])
+
+    def test_batch_writes_are_tracked(self):
+        token = self.changes()["next"]
+        operations = TypeAdapter(List[BatchOperation]).validate_python([
+            {"op": "update", "id": self.ids[0], "contact": contact_body(0, last_name="Batched")},
+            {"op": "delete", "id": self.ids[1]},
+        ])
+        with self.Session() as db:
+            repository_contacts.apply_batch(db, operations, self.user)
+        changes = self.changes(token)
+        self.assertEqual([c["last_name"] for c in changes["changed"]], ["Batched"])
+        self.assertEqual(changes["deleted"], [self.ids[1]])
+
+    def test_pages_follow_each_other(self):
+        token = self.changes()["next"]
+        with self.Session() as db:
+            repository_contacts.update_contact(db, self.ids[0], ContactCreate(**contact_body(0, first_name="A")), self.user)
+            repository_contacts.delete_contact(db, self.ids[1], self.user)
+            repository_contacts.update_contact(db, self.ids[2], ContactCreate(**contact_body(2, first_name="C")), self.user)
+        first = self.changes(token, limit=2)
+        self.assertTrue(first["more"])
+        self.assertEqual([c["id"] for c in first["changed"]], [self.ids[0]])
+        self.assertEqual(first["deleted"], [self.ids[1]])
+        second = self.changes(first["next"], limit=2)
+        self.assertFalse(second["more"])
+        self.assertEqual([c["id"] for c in second["changed"]], [self.ids[2]])
+        self.assertEqual(second["deleted"], [])
+
+    def test_last_token_lags_by_the_settle_time(self):
+        now = utcnow()
+        changes = self.changes(settle=3600, now=now)
+        at, contact_id = repository_contacts.decode_change_token(changes["next"])
+        self.assertEqual(at, now - timedelta(seconds=3600))
+        # Changes inside the settle window are sent again
+        self.assertEqual(len(self.changes(changes["next"])["changed"]), 3)
+
+    def test_token_round_trip(self):
+        at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        self.assertEqual(repository_contacts.decode_change_token(repository_contacts.encode_change_token(at, 7)), (at, 7))
+        with self.assertRaises(ValueError):
+            repository_contacts.decode_change_token("not-a-token")
+
+    def test_purge_tombstones(self):
+        with self.Session() as db:
+            repository_contacts.delete_contact(db, self.ids[0], self.user)
+            self.assertEqual(repository_contacts.purge_tombstones(db, utcnow() - timedelta(days=1)), 0)
+            self.assertEqual(repository_contacts.purge_tombstones(db, utcnow() + timedelta(seconds=1)), 1)
+            self.assertEqual(db.scalars(select(ContactTombstone)).all(), [])
+
+
+class TestChangesRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="syncuser", email="sync@example.com", password="x")
+            db.add(user)
+            db.commit()
+            self.user = Principal.model_validate(user)
+            repository_contacts.create_contact(db, ContactCreate(**contact_body(1)), self.user)
+
+        def override_get_db():
+            with self.Session() as db:
+                yield db
+
+        self.overrides = dict(app.dependency_overrides)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[auth_service.get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(self.overrides)
+        self.engine.dispose()
+
+    def test_changes(self):
+        response = self.client.get("/api/contacts/changes")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([c["email"] for c in body["changed"]], ["contact1@example.com"])
+        self.assertEqual(self.client.get("/api/contacts/changes", params={"since": body["next"]}).status_code, 200)
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get("/api/contacts/changes", params={"since": "garbage"}).status_code, 400)
+        old = repository_contacts.encode_change_token(utcnow() - timedelta(days=31), 0)
+        with mock.patch("app.routes.contacts.settings.CHANGES_RETENTION_DAYS", 30):
+            self.assertEqual(self.client.get("/api/contacts/changes", params={"since": old}).status_code, 410)
+
+
+if __name__ == '__main__':
+    unittest.main()
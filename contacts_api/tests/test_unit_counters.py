@@ -0,0 +1,183 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from unittest import mock
+from datetime import date
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from typing import List
+from app.main import app
+from app.core.auth import auth_service
+from app.core.counters import reconcile_all
+from app.db.database import get_db
+from app.db.models import Base, ContactCounter, User as UserModel
+from app.repository import contacts as repository_contacts, contacts_async
+from app.schemas import BatchOperation, ContactCreate, Principal
+
+
+def contact(n: int, domain: str = "example.com", month: int = 1, **changes) -> ContactCreate:
+    body = {"first_name": f"First{n}", "last_name": f"Last{n}", "email": f"contact{n}@{domain}",
+            "phone_number": f"{n:010d}", "birthday": date(1990, month, 1 + n % 28)}
+    return ContactCreate(**{**body, **changes})
+
+
+class TestContactCounters(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="stats", email="stats@example.com", password="x")
+            db.add(user)
+            db.commit()
+            self.user = Principal.model_validate(user)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def counters(self) -> dict:
+        with self.Session() as db:
+            return dict(db.execute(select(ContactCounter.name, ContactCounter.count)
+                                   .where(ContactCounter.user_id == self.user.id, ContactCounter.count != 0)).all())
+
+    def assert_consistent(self):
+        with self.Session() as db:
+            self.assertEqual(repository_contacts.reconcile_counters(db, [self.user.id]), 0)
+
+    def test_writes_keep_counters_in_step(self):
+        with self.Session() as db:
+            first = repository_contacts.create_contact(db, contact(1, month=3), self.user)
+            second = repository_contacts.create_contact(db, contact(2, domain="Mail.org"), self.user)
+            repository_contacts.update_contact(db, first.id, contact(1, domain="mail.org", month=4), self.user)
+            repository_contacts.delete_contact(db, second.id, self.user)
+            errors = repository_contacts.bulk_create_contacts(db, [contact(3), contact(4), contact(3)], self.user)
+            self.assertEqual(list(errors), [2])
+        self.assertEqual(self.counters(), {"total": 3, "month:1": 2, "month:4": 1,
+                                           "domain:example.com": 2, "domain:mail.org": 1})
+        self.assert_consistent()
+
+    def test_batch_moves_counters(self):
+        with self.Session() as db:
+            ids = [repository_contacts.create_contact(db, contact(n), self.user).id for n in range(3)]
+            operations = TypeAdapter(List[BatchOperation]).validate_python([
+                {"op": "delete", "id": ids[0]},
+                {"op": "update", "id": ids[1], "contact": contact(1, domain="other.net", month=6).model_dump(mode="json")},
+                {"op": "create", "contact": contact(7, month=6).model_dump(mode="json")},
+                {"op": "update", "id": 999999, "contact": contact(8).model_dump(mode="json")},
+            ])
+            committed, _ = repository_contacts.apply_batch(db, operations, self.user)
+            self.assertTrue(committed)
+        self.assertEqual(self.counters(), {"total": 3, "month:1": 1, "month:6": 2,
+                                           "domain:example.com": 2, "domain:other.net": 1})
+        self.assert_consistent()
+
+    def test_reconcile_repairs_drift(self):
+        with self.Session() as db:
+            for n in range(3):
+                repository_contacts.create_contact(db, contact(n), self.user)
+            db.execute(update(ContactCounter).where(ContactCounter.name == "total").values(count=10))
+            db.add(ContactCounter(user_id=self.user.id, name="domain:gone.com", count=2))
+            db.execute(update(ContactCounter).where(ContactCounter.name == "month:1").values(count=0))
+            db.commit()
+        self.assertEqual(reconcile_all(self.engine, batch_size=1), 3)
+        self.assertEqual(self.counters(), {"total": 3, "month:1": 3, "domain:example.com": 3})
+
+    def test_reconcile_keeps_writes_made_after_its_snapshot(self):
+        with self.Session() as db:
+            repository_contacts.create_contact(db, contact(1), self.user)
+            db.execute(update(ContactCounter).where(ContactCounter.name == "total").values(count=5))
+            db.commit()
+            apply = repository_contacts.update_counters
+            written = []
+
+            def write_then_apply(db, user_id, deltas):
+                if not written:
+                    # A contact created after the reconcile read its snapshot
+                    written.append(user_id)
+                    repository_contacts.create_contact(db, contact(2, domain="new.org"), self.user)
+                apply(db, user_id, deltas)
+
+            with mock.patch.object(repository_contacts, "update_counters", side_effect=write_then_apply):
+                self.assertEqual(repository_contacts.reconcile_counters(db, [self.user.id]), 1)
+        self.assertEqual(self.counters(), {"total": 2, "month:1": 2, "domain:example.com": 1, "domain:new.org": 1})
+        self.assert_consistent()
+
+    def test_stats(self):
+        with self.Session() as db:
+            for n in range(4):
+                repository_contacts.create_contact(db, contact(n, domain="b.com" if n else "a.com", month=2 + n % 2), self.user)
+            stats = repository_contacts.get_contact_stats(db, self.user, domains=1, today=date(2024, 3, 15))
+        self.assertEqual(stats, {"total": 4, "birthdays_this_month": 2, "domains": [{"domain": "b.com", "count": 3}]})
+
+
+class TestStatsRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        Session = sessionmaker(bind=self.engine)
+        with Session() as db:
+            user = UserModel(username="route", email="stats-route@example.com", password="x")
+            db.add(user)
+            db.commit()
+            repository_contacts.create_contact(db, contact(1, month=date.today().month), Principal.model_validate(user))
+
+        def override_get_db():
+            with Session() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        token = auth_service.create_access_token(data={"sub": "stats-route@example.com"})
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+
+    def test_stats_route(self):
+        with TestClient(app) as client:
+            response = client.get("/api/contacts/stats", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"total": 1, "birthdays_this_month": 1,
+                                           "domains": [{"domain": "example.com", "count": 1}]})
+
+
+class TestAsyncContactCounters(unittest.TestCase):
+
+    def test_async_writes_keep_counters_in_step(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        async def scenario():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with session_factory() as db:
+                db.add(UserModel(id=1, username="async", email="async@example.com", password="x"))
+                await db.commit()
+                user = Principal(id=1, email="async@example.com")
+                first = await contacts_async.create_contact(db, contact(1), user)
+                second = await contacts_async.create_contact(db, contact(2), user)
+                await contacts_async.update_contact(db, first.id, contact(1, domain="mail.org", month=5), user)
+                await contacts_async.delete_contact(db, second.id, user)
+                stats = await contacts_async.get_contact_stats(db, user, today=date(2024, 5, 1))
+                corrected = await db.run_sync(repository_contacts.reconcile_counters, [1])
+            await engine.dispose()
+            return stats, corrected
+
+        stats, corrected = asyncio.run(scenario())
+        self.assertEqual(stats, {"total": 1, "birthdays_this_month": 1, "domains": [{"domain": "mail.org", "count": 1}]})
+        self.assertEqual(corrected, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from datetime import date
+from unittest import mock
+from app.core import email as email_module
+from app.core.mail_queue import MemoryMailQueue
+from app.core.templates import EmailTemplates, preferred_locale
+from app.schemas import Contact
+
+
+class TestEmailTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.templates = EmailTemplates()
+
+    def test_locale_variants_fall_back_to_default(self):
+        self.assertGreaterEqual(self.templates.preload(), 4)
+        self.assertEqual(self.templates.get("email_template.html", "uk-UA").name, "uk/email_template.html")
+        self.assertEqual(self.templates.get("email_template.html", "uk").name, "uk/email_template.html")
+        self.assertEqual(self.templates.get("email_template.html", "de").name, "email_template.html")
+        self.assertEqual(self.templates.get("email_template.html", "../uk").name, "email_template.html")
+        self.assertIs(self.templates.get("email_template.html"), self.templates.get("email_template.html", "en"))
+
+    def test_render_escapes_context(self):
+        html = self.templates.render("email_template.html", fullname="<b>Jo</b>", verification_link="https://x/?a=1&b=2")
+        self.assertIn("Hi &lt;b&gt;Jo&lt;/b&gt;", html)
+        self.assertIn('href="https://x/?a=1&amp;b=2"', html)
+
+    def test_render_many_keeps_order(self):
+        bodies = self.templates.render_many(
+            "email_template.html", ({"fullname": f"user{n}", "verification_link": ""} for n in range(3)), locale="uk",
+        )
+        self.assertEqual([("Привіт, user%d!" % n) in body for n, body in enumerate(bodies)], [True] * 3)
+
+    def test_preferred_locale(self):
+        self.assertEqual(preferred_locale("uk-UA,uk;q=0.9,en;q=0.8"), "uk-UA")
+        self.assertIsNone(preferred_locale("*"))
+        self.assertIsNone(preferred_locale(None))
+
+    def test_birthday_reminders_are_queued_in_one_batch(self):
+        queue = MemoryMailQueue()
+        contact = Contact(id=1, first_name="Jane", last_name="Doe", email="jane@example.com",
+                          phone_number="1", birthday=date(1990, 5, 17))
+        reminders = [("a@example.com", "Alice", [contact]), ("b@example.com", "Bob", [])]
+        with mock.patch.object(email_module.mail_dispatcher, "queue", queue):
+            queued = asyncio.run(email_module.send_birthday_reminders(reminders))
+            messages = asyncio.run(queue.pop_batch(10, timeout=0))
+        self.assertEqual(queued, 1)
+        self.assertEqual(messages[0].recipients, ["a@example.com"])
+        self.assertIn("Jane Doe &ndash; 17 May", messages[0].body)
+
+
+if __name__ == '__main__':
+    unittest.main()
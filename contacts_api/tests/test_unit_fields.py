@@ -0,0 +1,104 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import unittest
+from datetime import date
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from app.main import app
+from app.core.auth import auth_service
+from app.db.database import get_db
+from app.db.models import Base, User as UserModel
+from app.repository import contacts as repository_contacts
+from app.schemas import ContactCreate, Principal, contact_model
+
+
+class TestSparseFieldsets(unittest.TestCase):
+
+    def test_contact_columns(self):
+        columns = repository_contacts.contact_columns({"email", "first_name"})
+        self.assertEqual([c.key for c in columns], ["first_name", "email", "id"])
+        self.assertIs(repository_contacts.contact_columns(None), repository_contacts.CONTACT_COLUMNS)
+        with self.assertRaises(ValueError):
+            repository_contacts.contact_columns({"email", "password"})
+
+    def test_statement_selects_only_the_fields(self):
+        user = Principal(id=1, email="fields@example.com")
+        stmt = repository_contacts.contacts_page_statement(
+            user, columns=repository_contacts.contact_columns({"first_name"}))
+        select_list = str(stmt).split("FROM")[0]
+        self.assertIn("first_name", select_list)
+        self.assertNotIn("additional_info", select_list)
+
+    def test_models_are_built_once_per_field_set(self):
+        model = contact_model(frozenset({"email", "first_name"}))
+        self.assertIs(model, contact_model(frozenset({"first_name", "email"})))
+        self.assertEqual(set(model.model_fields), {"id", "first_name", "email"})
+
+
+class TestFieldsRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        Session = sessionmaker(bind=self.engine)
+        with Session() as db:
+            user = UserModel(username="fields", email="fields-route@example.com", password="x")
+            db.add(user)
+            db.commit()
+            self.contact_id = repository_contacts.create_contact(db, ContactCreate(
+                first_name="Ada", last_name="Lovelace", email="ada@example.com", phone_number="0123456789",
+                birthday=date(1990, 12, 10), additional_info="x" * 1000), Principal.model_validate(user)).id
+
+        def override_get_db():
+            with Session() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        token = auth_service.create_access_token(data={"sub": "fields-route@example.com"})
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.record)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        event.remove(self.engine, "before_cursor_execute", self.record)
+        self.engine.dispose()
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if "FROM contacts" in statement:
+            self.statements.append(statement)
+
+    def test_list_returns_only_the_fields(self):
+        with TestClient(app) as client:
+            sparse = client.get("/api/contacts/?fields=first_name,email", headers=self.headers)
+            full = client.get("/api/contacts/", headers=self.headers)
+        self.assertEqual(sparse.status_code, 200)
+        self.assertEqual(sparse.json(), [{"id": self.contact_id, "first_name": "Ada", "email": "ada@example.com"}])
+        self.assertNotIn("additional_info", self.statements[0].split("FROM")[0])
+        # The full page is a separate cache entry
+        self.assertEqual(full.json()[0]["additional_info"], "x" * 1000)
+
+    def test_single_contact_with_fields(self):
+        with TestClient(app) as client:
+            sparse = client.get(f"/api/contacts/{self.contact_id}?fields=last_name", headers=self.headers)
+            full = client.get(f"/api/contacts/{self.contact_id}", headers=self.headers)
+        self.assertEqual(sparse.status_code, 200)
+        self.assertEqual(sparse.json(), {"id": self.contact_id, "last_name": "Lovelace"})
+        self.assertNotIn("additional_info", self.statements[0].split("FROM")[0])
+        self.assertEqual(len(full.json()), 7)
+
+    def test_unknown_field(self):
+        with TestClient(app) as client:
+            response = client.get("/api/contacts/?fields=first_name,password", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Unknown contact fields: password")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import app.main  # noqa: F401  (resolves the auth <-> users import cycle)
+from app.core.gravatar import GravatarResolver, assign_avatar, prewarm_avatars
+from app.db.models import Base, User
+
+
+class TestGravatarResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.missing = set()
+        self.fail = False
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if self.fail:
+                raise httpx.ConnectError("unreachable", request=request)
+            digest = request.url.path.rsplit('/', 1)[-1]
+            return httpx.Response(404 if digest in self.missing else 200)
+
+        self.transport = httpx.MockTransport(handler)
+
+    def test_results_are_cached_by_email_hash(self):
+        resolver = GravatarResolver()
+        url = asyncio.run(resolver.resolve("John@Example.com "))
+        self.assertEqual(url, "https://www.gravatar.com/avatar/" + resolver.email_hash("john@example.com"))
+        self.assertEqual(len(resolver.cache), 1)
+        self.assertEqual(asyncio.run(resolver.resolve("john@example.com")), url)
+        self.assertEqual(len(resolver.cache), 1)
+
+    def test_verified_lookups_cache_misses_but_not_failures(self):
+        resolver = GravatarResolver(verify=True, transport=self.transport)
+        self.missing.add(resolver.email_hash("nobody@example.com"))
+
+        urls = asyncio.run(resolver.resolve_many(["someone@example.com", "nobody@example.com"]))
+        self.assertIsNotNone(urls["someone@example.com"])
+        self.assertIsNone(urls["nobody@example.com"])
+        self.assertEqual(self.requests[0].url.params["d"], "404")
+        asyncio.run(resolver.resolve_many(["someone@example.com", "nobody@example.com"]))
+        self.assertEqual(len(self.requests), 2)
+
+        self.fail = True
+        self.assertIsNone(asyncio.run(resolver.resolve("offline@example.com")))
+        self.assertIsNone(asyncio.run(resolver.resolve("offline@example.com")))
+        self.assertEqual(len(self.requests), 4)
+
+
+class TestAvatarAssignment(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add_all([User(username=f"user{n}", email=f"user{n}@example.com", password="x") for n in range(5)])
+            db.add(User(username="uploaded", email="uploaded@example.com", password="x", avatar="https://images.example.com/me.jpg"))
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def avatars(self):
+        with self.Session() as db:
+            return {user.email: user.avatar for user in db.query(User)}
+
+    def test_prewarm_fills_in_missing_avatars_only(self):
+        resolver = GravatarResolver()
+        updated = asyncio.run(prewarm_avatars(self.engine, batch_size=2, resolver=resolver))
+        avatars = self.avatars()
+        self.assertEqual(updated, 5)
+        self.assertEqual(avatars["uploaded@example.com"], "https://images.example.com/me.jpg")
+        self.assertTrue(all(avatars[f"user{n}@example.com"].startswith("https://www.gravatar.com/") for n in range(5)))
+        self.assertEqual(asyncio.run(prewarm_avatars(self.engine, resolver=resolver)), 0)
+
+    def test_assign_avatar_keeps_an_uploaded_one(self):
+        with self.Session() as db:
+            uploaded = db.query(User).filter_by(email="uploaded@example.com").one().id
+            fresh = db.query(User).filter_by(email="user0@example.com").one().id
+        asyncio.run(assign_avatar(uploaded, "uploaded@example.com", self.engine, GravatarResolver()))
+        asyncio.run(assign_avatar(fresh, "user0@example.com", self.engine, GravatarResolver()))
+        avatars = self.avatars()
+        self.assertEqual(avatars["uploaded@example.com"], "https://images.example.com/me.jpg")
+        self.assertTrue(avatars["user0@example.com"].startswith("https://www.gravatar.com/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
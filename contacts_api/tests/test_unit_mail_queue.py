@@ -0,0 +1,165 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import socket
+import unittest
+from aiosmtpd.controller import Controller
+from fakeredis.aioredis import FakeRedis
+from app.core.mail_queue import MailDispatcher, MailMessage, MemoryMailQueue, RedisMailQueue, SMTPConnectionPool
+
+
+class RecordingHandler:
+    """
+    aiosmtpd handler standing in for the SMTP server.
+
+    Recipients starting with ``bounce`` are refused with 550, messages to ``flaky``
+    recipients are deferred with 451 ``flaky_failures`` times before being accepted.
+    """
+
+    def __init__(self, flaky_failures: int = 0):
+        self.messages = []
+        self.peers = set()
+        self.flaky_failures = flaky_failures
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if envelope.rcpt_tos[0].startswith("flaky") and self.flaky_failures:
+            self.flaky_failures -= 1
+            return "451 Try again later"
+        self.peers.add(session.peer)
+        self.messages.append(envelope)
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestMailDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = RecordingHandler(flaky_failures=2)
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.controller.start()
+
+    def tearDown(self):
+        self.controller.stop()
+
+    def dispatcher(self, queue=None, **kwargs) -> MailDispatcher:
+        pool = SMTPConnectionPool(hostname="127.0.0.1", port=self.controller.port, size=2, timeout=5)
+        options = {"batch_size": 50, "max_attempts": 3, "backoff": 0.01, **kwargs}
+        return MailDispatcher(queue or MemoryMailQueue(), pool, sender="noreply@example.com", **options)
+
+    @staticmethod
+    def message(recipient: str) -> MailMessage:
+        return MailMessage(recipients=[recipient], subject="Email Verification", body="<p>Hi</p>")
+
+    def test_batch_is_delivered_over_pooled_connections(self):
+        async def scenario():
+            dispatcher = self.dispatcher()
+            for n in range(10):
+                await dispatcher.enqueue(self.message(f"user{n}@example.com"))
+            self.assertEqual(await dispatcher.run_once(timeout=0), 10)
+            for n in range(5):
+                await dispatcher.enqueue(self.message(f"later{n}@example.com"))
+            await dispatcher.run_once(timeout=0)
+            await dispatcher.pool.close()
+            return dispatcher
+
+        dispatcher = asyncio.run(scenario())
+        self.assertEqual(dispatcher.sent, 15)
+        self.assertEqual(len(self.handler.messages), 15)
+        self.assertLessEqual(len(self.handler.peers), 2)
+        self.assertIn(b"Subject: Email Verification", self.handler.messages[0].content)
+
+    def test_transient_failures_are_retried_and_permanent_ones_dead_lettered(self):
+        async def scenario():
+            dispatcher = self.dispatcher()
+            await dispatcher.enqueue(self.message("flaky@example.com"))
+            await dispatcher.enqueue(self.message("bounce@example.com"))
+            for _ in range(5):
+                await dispatcher.run_once(timeout=0.1)
+            dead = await dispatcher.queue.dead_letters()
+            pending = await dispatcher.queue.pending()
+            await dispatcher.pool.close()
+            return dispatcher, dead, pending
+
+        dispatcher, dead, pending = asyncio.run(scenario())
+        self.assertEqual([m.rcpt_tos for m in self.handler.messages], [["flaky@example.com"]])
+        self.assertEqual(pending, 0)
+        self.assertEqual([(m.recipients, m.attempts) for m in dead], [(["bounce@example.com"], 1)])
+        self.assertIn("550", dead[0].last_error)
+
+    def test_messages_out_of_attempts_are_dead_lettered(self):
+        self.handler.flaky_failures = 10
+
+        async def scenario():
+            dispatcher = self.dispatcher(max_attempts=2)
+            await dispatcher.enqueue(self.message("flaky@example.com"))
+            for _ in range(3):
+                await dispatcher.run_once(timeout=0.1)
+            dead = await dispatcher.queue.dead_letters()
+            await dispatcher.pool.close()
+            return dead
+
+        dead = asyncio.run(scenario())
+        self.assertEqual([m.attempts for m in dead], [2])
+        self.assertEqual(self.handler.messages, [])
+
+    def test_worker_delivers_in_the_background_with_redis_queue(self):
+        async def scenario():
+            queue = RedisMailQueue(client=FakeRedis(decode_responses=True))
+            dispatcher = self.dispatcher(queue=queue)
+            await dispatcher.start()
+            await dispatcher.enqueue(self.message("flaky@example.com"))
+            await dispatcher.enqueue(self.message("user@example.com"))
+            for _ in range(100):
+                if len(self.handler.messages) == 2:
+                    break
+                await asyncio.sleep(0.05)
+            await dispatcher.stop()
+            return await queue.pending()
+
+        self.assertEqual(asyncio.run(scenario()), 0)
+        self.assertEqual(sorted(m.rcpt_tos[0] for m in self.handler.messages), ["flaky@example.com", "user@example.com"])
+
+
+    def test_redis_queue_requeues_messages_of_a_crashed_worker(self):
+        async def scenario():
+            client = FakeRedis(decode_responses=True)
+            crashed = RedisMailQueue(client=client, consumer="worker-1")
+            for recipient in ("first@example.com", "second@example.com", "third@example.com"):
+                await crashed.push(self.message(recipient))
+            # The worker dies after popping a batch and delivering only its first message
+            batch = await crashed.pop_batch(2, timeout=1)
+            await crashed.ack(batch[0])
+            left = await client.lrange(crashed.processing_key, 0, -1)
+
+            queue = RedisMailQueue(client=client, consumer="worker-1")
+            dispatcher = self.dispatcher(queue=queue)
+            await dispatcher.start()
+            for _ in range(100):
+                if len(self.handler.messages) == 2:
+                    break
+                await asyncio.sleep(0.05)
+            await dispatcher.stop()
+            return left, await client.llen(queue.processing_key), await queue.pending()
+
+        left, processing, pending = asyncio.run(scenario())
+        self.assertEqual(len(left), 1)
+        self.assertEqual((processing, pending), (0, 0))
+        self.assertEqual(sorted(m.rcpt_tos[0] for m in self.handler.messages), ["second@example.com", "third@example.com"])
+
+if __name__ == '__main__':
+    unittest.main()
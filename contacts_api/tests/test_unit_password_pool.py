@@ -0,0 +1,65 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+import bcrypt
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.core.password_pool import PasswordWorkerPool
+from app.core.auth import auth_service
+from app.db.models import User
+
+
+class TestPasswordWorkerPool(unittest.TestCase):
+
+    def test_rejects_work_beyond_capacity(self):
+        pool = PasswordWorkerPool(workers=1, queue_size=1)
+        release = threading.Event()
+
+        async def scenario():
+            running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with self.assertRaises(HTTPException) as ctx:
+                await pool.run(release.wait)
+            release.set()
+            await asyncio.gather(*running)
+            return ctx.exception
+
+        error = asyncio.run(scenario())
+        self.assertEqual(error.status_code, 503)
+        self.assertGreaterEqual(int(error.headers["Retry-After"]), 1)
+        self.assertEqual(pool.pending, 0)
+
+
+class TestPasswordRehash(unittest.TestCase):
+
+    def test_login_rehashes_outdated_work_factor(self):
+        old_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('utf-8')
+        user = User(email='johndoe@example.com', password=old_hash)
+        with patch('app.core.auth.repository_users') as repository_mock:
+            repository_mock.get_user_by_email.return_value = user
+            result = asyncio.run(auth_service.authenticate_user_async(MagicMock(spec=Session), user.email, 'secret'))
+
+        self.assertIs(result, user)
+        repository_mock.update_password.assert_called_once()
+        new_hash = repository_mock.update_password.call_args.args[1]
+        self.assertFalse(auth_service.pwd_context.needs_update(new_hash))
+        self.assertTrue(auth_service.verify_password('secret', new_hash))
+
+    def test_wrong_password_is_rejected_without_rehash(self):
+        old_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('utf-8')
+        user = User(email='johndoe@example.com', password=old_hash)
+        with patch('app.core.auth.repository_users') as repository_mock:
+            repository_mock.get_user_by_email.return_value = user
+            self.assertFalse(auth_service.authenticate_user(MagicMock(spec=Session), user.email, 'wrong'))
+        repository_mock.update_password.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+import unittest
+from unittest import mock
+from fastapi import FastAPI
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+from starlette.testclient import TestClient
+from app.routes import metrics as metrics_routes
+from app.db.pool_metrics import PoolMetrics, timed_pool_class
+
+
+class TestPoolMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.metrics = PoolMetrics('test')
+        self.engine = create_engine(
+            f"sqlite:///{self.tmpdir.name}/pool.db",
+            poolclass=timed_pool_class(QueuePool, self.metrics),
+            pool_size=1, max_overflow=1, pool_timeout=0.05,
+        )
+        self.metrics.attach(self.engine.pool)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_counts_checkouts_overflow_and_timeouts(self):
+        first = self.engine.connect()
+        second = self.engine.connect()
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['checked_out'], 2)
+        self.assertEqual(snapshot['overflow_in_use'], 1)
+        self.assertEqual(snapshot['checkouts_total'], 2)
+        self.assertEqual(snapshot['timeouts_total'], 1)
+        self.assertEqual(snapshot['wait_seconds_count'], 3)
+        self.assertGreaterEqual(snapshot['wait_seconds_max'], 0.05)
+
+        first.close()
+        second.close()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['checked_out'], 0)
+        self.assertEqual(snapshot['checkins_total'], 2)
+        self.assertEqual(snapshot['max_overflow_in_use'], 1)
+
+
+
+class TestMetricsRoute(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(metrics_routes.router)
+        self.client = TestClient(app)
+
+    def test_token_is_required_when_configured(self):
+        with mock.patch.object(metrics_routes.settings, "METRICS_TOKEN", "scraper-secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            wrong = self.client.get("/metrics", headers={"Authorization": "Bearer guess"})
+            self.assertEqual(wrong.status_code, 401)
+            scraped = self.client.get("/metrics", headers={"Authorization": "Bearer scraper-secret"})
+            self.assertEqual(scraped.status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from unittest import mock
+import fakeredis
+from fakeredis.aioredis import FakeRedis as AsyncFakeRedis
+from starlette.requests import Request
+from starlette.testclient import TestClient
+from app.main import app
+from app.core import rate_limit
+from app.core.auth import auth_service
+from app.core.rate_limit import LocalBuckets, RateLimiter
+from app.core.redis_client import set_async_redis, set_redis
+
+
+def make_request(ip: str = "10.0.0.1", token: str = None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (ip, 1234)})
+
+
+class FakeTimer:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=self.server, decode_responses=True)
+        set_redis(self.redis)
+        set_async_redis(AsyncFakeRedis(server=self.server, decode_responses=True))
+
+    def tearDown(self):
+        set_redis(None)
+        set_async_redis(None)
+
+    def test_workers_share_one_quota(self):
+        workers = [RateLimiter(local_precheck=False), RateLimiter(local_precheck=False)]
+        keys = workers[0].keys(make_request(), "route", 4)
+        results = [workers[n % 2].hit(keys, 60)[0] for n in range(6)]
+        self.assertEqual(results, [True, True, True, True, False, False])
+        self.assertEqual(self.redis.zcard(keys[0][0]), 4)
+        allowed, retry_after = workers[1].hit(keys, 60)
+        self.assertFalse(allowed)
+        self.assertTrue(0 < retry_after <= 60)
+
+    def test_users_and_ips_have_their_own_keys(self):
+        limiter = RateLimiter(local_precheck=False, ip_factor=2)
+        token = auth_service.create_access_token(data={"sub": "alice@example.com"})
+        alice = limiter.keys(make_request(token=token), "route", 2)
+        self.assertEqual(alice, [("ratelimit:route:user:alice@example.com", 2), ("ratelimit:route:ip:10.0.0.1", 4)])
+        self.assertEqual(limiter.keys(make_request(token="forged"), "route", 2), [("ratelimit:route:ip:10.0.0.1", 2)])
+
+        self.assertEqual([limiter.hit(alice, 60)[0] for _ in range(3)], [True, True, False])
+        # Alice's quota is spent, but other users behind the same IP still get theirs
+        bob = limiter.keys(make_request(token=auth_service.create_access_token(data={"sub": "bob@example.com"})), "route", 2)
+        self.assertEqual([limiter.hit(bob, 60)[0] for _ in range(3)], [True, True, False])
+        # and the IP as a whole is capped at ip_factor times the quota
+        carol = limiter.keys(make_request(token=auth_service.create_access_token(data={"sub": "carol@example.com"})), "route", 2)
+        self.assertFalse(limiter.hit(carol, 60)[0])
+
+    def test_async_hits_use_the_same_counters(self):
+        limiter = RateLimiter(local_precheck=False)
+        keys = limiter.keys(make_request(), "route", 2)
+        self.assertTrue(limiter.hit(keys, 60)[0])
+
+        async def hits():
+            return [(await limiter.hit_async(keys, 60))[0] for _ in range(2)]
+
+        self.assertEqual(asyncio.run(hits()), [True, False])
+
+    def test_local_buckets_reject_without_redis(self):
+        limiter = RateLimiter()
+        keys = limiter.keys(make_request(), "route", 3)
+        with mock.patch.object(limiter, "_script", wraps=limiter._script) as script:
+            results = [limiter.hit(keys, 60)[0] for _ in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(script.call_count, 3)
+
+    def test_local_buckets_refill_and_refund(self):
+        timer = FakeTimer()
+        buckets = LocalBuckets(timer=timer)
+        keys = [("key", 2)]
+        self.assertEqual([buckets.take(keys, 60) for _ in range(2)], [0.0, 0.0])
+        self.assertEqual(buckets.take(keys, 60), 30.0)
+        buckets.refund(keys, 60)
+        self.assertEqual(buckets.take(keys, 60), 0.0)
+        timer.now += 30
+        self.assertEqual(buckets.take(keys, 60), 0.0)
+
+    def test_falls_back_to_local_counters_when_redis_fails(self):
+        timer = FakeTimer()
+        limiter = RateLimiter(local_precheck=False, redis_retry=5, timer=timer)
+        keys = limiter.keys(make_request(), "route", 2)
+        self.server.connected = False
+        with self.assertLogs(rate_limit.logger, "WARNING"):
+            self.assertTrue(limiter.hit(keys, 60)[0])
+        self.server.connected = True
+        self.assertEqual([limiter.hit(keys, 60)[0] for _ in range(2)], [True, False])
+        self.assertEqual(self.redis.zcard(keys[0][0]), 0)
+        timer.now += 5
+        self.assertTrue(limiter.hit(keys, 60)[0])
+        self.assertEqual(self.redis.zcard(keys[0][0]), 1)
+
+    def test_routes_answer_429_with_retry_after(self):
+        self.assertIs(app.state.limiter, rate_limit.limiter)
+        with TestClient(app) as client:
+            responses = [client.get("/") for _ in range(6)]
+        self.assertEqual([r.status_code for r in responses], [200] * 5 + [429])
+        self.assertGreater(int(responses[-1].headers["Retry-After"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import unittest
+from unittest import mock
+import fakeredis
+from fastapi import HTTPException
+from redis import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from app.main import app
+from app.core.auth import auth_service
+from app.core.refresh_tokens import RefreshTokenStore
+from app.core.redis_client import set_redis
+from app.db.database import get_db
+from app.db.models import Base, User as UserModel
+from app.repository import users as repository_users
+
+
+class FakeTimer:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRefreshTokenStore(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        set_redis(self.redis)
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add(UserModel(username="refresh", email="refresh@example.com", password="x"))
+            db.commit()
+        self.timer = FakeTimer()
+        self.store = RefreshTokenStore(ttl=3600, redis_retry=5.0, timer=self.timer)
+
+    def tearDown(self):
+        set_redis(None)
+        self.engine.dispose()
+
+    def user(self, db):
+        return repository_users.get_user_by_email("refresh@example.com", db)
+
+    def assert_unauthorized(self, func, *args):
+        with self.assertRaises(HTTPException) as raised:
+            func(*args)
+        self.assertEqual(raised.exception.status_code, 401)
+        return raised.exception.detail
+
+    def assert_unavailable(self, token, db):
+        with self.assertRaises(HTTPException) as raised:
+            self.store.rotate(token, db)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(raised.exception.headers, {"Retry-After": "5"})
+
+    def test_rotation_does_not_touch_the_database(self):
+        with self.Session() as db:
+            first = self.store.issue(self.user(db), db)
+            self.assertIsNone(self.user(db).refresh_token)
+        db = mock.MagicMock(spec=Session)
+        email, second = self.store.rotate(first, db)
+        email, third = self.store.rotate(second, db)
+        self.assertEqual(email, "refresh@example.com")
+        self.assertEqual(db.mock_calls, [])
+        self.assertGreater(self.redis.pttl(f"refresh:family:{auth_service.token_codec.decode(third)['fam']}"), 0)
+
+    def test_reuse_revokes_the_family(self):
+        with self.Session() as db:
+            first = self.store.issue(self.user(db), db)
+            other_session = self.store.issue(self.user(db), db)
+            _, second = self.store.rotate(first, db)
+            self.assertEqual(self.assert_unauthorized(self.store.rotate, first, db), "Refresh token reuse detected")
+            # The legitimate holder of the family is logged out as well, other families are not
+            self.assertEqual(self.assert_unauthorized(self.store.rotate, second, db), "Refresh token revoked")
+            self.store.rotate(other_session, db)
+
+    def test_logout_and_user_deletion_revoke(self):
+        with self.Session() as db:
+            token = self.store.issue(self.user(db), db)
+            self.store.revoke(token, db)
+            self.assertEqual(self.assert_unauthorized(self.store.rotate, token, db), "Refresh token revoked")
+            tokens = [self.store.issue(self.user(db), db) for _ in range(2)]
+            self.store.revoke_user("refresh@example.com")
+            for token in tokens:
+                self.assert_unauthorized(self.store.rotate, token, db)
+
+    def test_access_tokens_are_rejected(self):
+        token = auth_service.create_access_token(data={"sub": "refresh@example.com"})
+        with self.Session() as db:
+            self.assertEqual(self.assert_unauthorized(self.store.rotate, token, db), "Invalid scope for token")
+
+    def test_falls_back_to_the_database_and_moves_back_to_redis(self):
+        with self.Session() as db:
+            with mock.patch.object(self.redis, "pipeline", side_effect=RedisConnectionError("down")):
+                first = self.store.issue(self.user(db), db)
+            self.assertEqual(self.user(db).refresh_token, first)
+            # Redis is skipped while it is considered down
+            _, second = self.store.rotate(first, db)
+            self.assertEqual(self.user(db).refresh_token, second)
+            self.assert_unavailable(first, db)
+            self.assertEqual(self.user(db).refresh_token, second)
+
+            first = self.store.issue(self.user(db), db)
+            self.timer.now += 5
+            _, second = self.store.rotate(first, db)
+            self.assertIsNone(self.user(db).refresh_token)
+            self.assert_unauthorized(self.store.rotate, first, db)
+            self.store.rotate(second, mock.MagicMock(spec=Session))
+
+    def test_redis_failing_mid_session_does_not_log_users_out(self):
+        with self.Session() as db:
+            first = self.store.issue(self.user(db), db)
+            _, second = self.store.rotate(first, db)
+            with mock.patch.object(self.redis, "evalsha", side_effect=RedisConnectionError("down")):
+                self.assert_unavailable(second, db)
+            # Redis is skipped while it is considered down, and the user keeps their session
+            self.assert_unavailable(second, db)
+            self.assertIsNone(self.user(db).refresh_token)
+            self.timer.now += 5
+            self.store.rotate(second, db)
+            self.assertEqual(self.assert_unauthorized(self.store.rotate, first, db), "Refresh token reuse detected")
+
+    def test_database_backend(self):
+        store = RefreshTokenStore(backend="database", ttl=3600)
+        with self.Session() as db:
+            token = store.issue(self.user(db), db)
+            _, token = store.rotate(token, db)
+            self.assertEqual(self.user(db).refresh_token, token)
+            store.revoke(token, db)
+            self.assertIsNone(self.user(db).refresh_token)
+        self.assertEqual(self.redis.keys("refresh:*"), [])
+
+
+class TestRefreshRoutes(unittest.TestCase):
+
+    def setUp(self):
+        set_redis(fakeredis.FakeRedis(decode_responses=True))
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        Session = sessionmaker(bind=self.engine)
+        with Session() as db:
+            db.add(UserModel(username="route", email="route@example.com",
+                             password=auth_service.get_password_hash("secret")))
+            db.commit()
+
+        def override_get_db():
+            with Session() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        set_redis(None)
+        self.engine.dispose()
+
+    def test_login_refresh_and_logout(self):
+        with TestClient(app) as client:
+            login = client.post("/api/auth/login", data={"username": "route@example.com", "password": "secret"})
+            self.assertEqual(login.status_code, 200)
+            first = login.json()["refresh_token"]
+            refreshed = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {first}"})
+            self.assertEqual(refreshed.status_code, 200)
+            second = refreshed.json()["refresh_token"]
+            self.assertNotEqual(first, second)
+            logout = client.post("/api/auth/logout", headers={"Authorization": f"Bearer {second}"})
+            self.assertEqual(logout.status_code, 204)
+            again = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {second}"})
+            self.assertEqual(again.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -75,5 +75,116 @@ class TestContactRepository(TestCase):
         mock_db.commit.assert_called_once()
         self.assertEqual(result, mock_contact)
         
+class TestContactCursor(TestCase):
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(contacts.decode_cursor(contacts.encode_cursor(42)), 42)
+
+    def test_invalid_cursor(self):
+        for cursor in ("not-a-cursor", contacts.encode_cursor("42")):
+            with self.assertRaises(ValueError):
+                contacts.decode_cursor(cursor)
+
+class TestContactSearch(TestCase):
+
+    def setUp(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.models import Base, User as UserModel
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        owner = UserModel(username="testuser", email="testuser@example.com", password="x")
+        self.db.add(owner)
+        self.db.commit()
+        self.owner = owner
+        for first_name, last_name, email in [("John", "Doe", "john@example.com"), ("Jane", "Johnson", "jane@example.org"), ("Bob", "Lee", "b_100%@example.com")]:
+            self.db.add(Contact(first_name=first_name, last_name=last_name, email=email, phone_number="1", birthday=datetime(1990, 1, 1), birthday_doy=1, user_id=owner.id))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_backends_return_same_matches(self):
+        self.assertEqual(contacts.search_backend(self.db), "fts5")
+        for params in ({"q": "john"}, {"name": "jo"}, {"surname": "son"}, {"email": "_100%"}):
+            expected = {c.id for c in contacts.search_contact_rows(self.db, self.owner, backend="like", **params)}
+            found = {c.id for c in contacts.search_contact_rows(self.db, self.owner, **params)}
+            self.assertEqual(found, expected, params)
+        self.assertEqual(len(contacts.search_contact_rows(self.db, self.owner, q="john")), 2)
+        self.assertEqual([c.first_name for c in contacts.search_contact_rows(self.db, self.owner, email="_100%")], ["Bob"])
+
+    def test_backend_is_detected_per_engine(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session as OrmSession
+        # Same URL as the engine of setUp, but without the FTS5 table
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE contacts (id INTEGER PRIMARY KEY, user_id INTEGER)")
+        self.assertEqual(contacts.search_backend(self.db), "fts5")
+        with OrmSession(engine) as db:
+            self.assertEqual(contacts.search_backend(db), "like")
+        engine.dispose()
+
+    def test_fts5_matches_are_filtered_on_the_owner(self):
+        stmt = str(contacts.search_statement(self.owner, q="john", backend="fts5"))
+        self.assertIn("contacts_fts.user_id = ", stmt)
+
+    def test_search_and_birthdays_are_scoped_to_user(self):
+        from app.db.models import User as UserModel
+        other = UserModel(username="otheruser", email="other@example.com", password="x")
+        self.db.add(other)
+        self.db.commit()
+        self.db.add(Contact(first_name="John", last_name="Other", email="john@other.com", phone_number="1", birthday=datetime(1990, 1, 3), birthday_doy=3, user_id=other.id))
+        self.db.commit()
+        self.assertEqual({c.user_id for c in contacts.search_contact_rows(self.db, self.owner, q="john", columns=(Contact.user_id,))}, {self.owner.id})
+        upcoming = contacts.get_upcoming_birthday_rows(self.db, self.owner, today=datetime(2024, 1, 1).date(),
+                                                       columns=(Contact.user_id,))
+        self.assertEqual({c.user_id for c in upcoming}, {self.owner.id})
+        self.assertEqual(len(upcoming), 3)
+
+    def test_birthday_window_wraps_into_january(self):
+        from datetime import date
+        owner = User(id=self.owner.id, username="testuser", email="testuser@example.com", created_at=datetime.now())
+        for n, birthday in enumerate([date(1985, 12, 30), date(1992, 2, 29), date(1970, 3, 10)]):
+            contacts.create_contact(self.db, ContactCreate(first_name="B", last_name=str(n), email=f"b{n}@example.com", phone_number="1", birthday=birthday), owner)
+        wrapped = contacts.get_upcoming_birthday_rows(self.db, owner, days=7, today=date(2023, 12, 28))
+        self.assertEqual([c.birthday.month for c in wrapped], [12, 1, 1, 1])
+        self.assertEqual(len(contacts.get_upcoming_birthday_rows(self.db, owner, days=3, today=date(2023, 2, 27))), 1)
+        self.assertEqual(len(contacts.get_upcoming_birthday_rows(self.db, owner, days=365, today=date(2023, 6, 1))), 6)
+        self.assertEqual(contacts.get_upcoming_birthday_rows(self.db, owner, days=30, today=date(2023, 4, 1)), [])
+
+    def test_birthday_window_includes_today_and_ends_a_day_early(self):
+        from datetime import date
+        # The three contacts of setUp have their birthday on 1 January
+        self.assertEqual(len(contacts.get_upcoming_birthday_rows(self.db, self.owner, days=1, today=date(2024, 1, 1))), 3)
+        self.assertEqual(contacts.get_upcoming_birthday_rows(self.db, self.owner, days=7, today=date(2023, 12, 25)), [])
+        self.assertEqual(len(contacts.get_upcoming_birthday_rows(self.db, self.owner, days=8, today=date(2023, 12, 25))), 3)
+
+    def test_keyset_page_matches_offset_page(self):
+        first_page = contacts.get_contact_rows(self.db, self.owner, limit=2)
+        offset_page = contacts.get_contact_rows(self.db, self.owner, skip=2, limit=2)
+        keyset_page = contacts.get_contact_rows(self.db, self.owner, limit=2, after=first_page[-1].id)
+        self.assertEqual([c.id for c in keyset_page], [c.id for c in offset_page])
+
+    def test_rows_serialise_like_the_schema(self):
+        import json
+        from app.routes.contacts import contacts_json
+        from app.schemas import Contact as ContactSchema
+        today = datetime(2024, 1, 1).date()
+        for objects, rows in [
+            (contacts.get_contacts(self.db, self.owner, skip=1, limit=2), contacts.get_contact_rows(self.db, self.owner, skip=1, limit=2)),
+            (self.db.scalars(contacts.search_statement(self.owner, q="john", backend="fts5")).all(),
+             contacts.search_contact_rows(self.db, self.owner, q="john")),
+            (self.db.scalars(contacts.search_statement(self.owner, q="jo")).all(),
+             contacts.search_contact_rows(self.db, self.owner, q="jo", backend="like")),
+            (self.db.scalars(contacts.upcoming_birthdays_statement(self.owner, today=today)).all(),
+             contacts.get_upcoming_birthday_rows(self.db, self.owner, today=today)),
+        ]:
+            expected = [json.loads(ContactSchema.model_validate(c).model_dump_json()) for c in objects]
+            self.assertEqual(json.loads(contacts_json(rows)), expected)
+            self.assertTrue(expected)
+
 if __name__ == '__main__':
     unittest.main()
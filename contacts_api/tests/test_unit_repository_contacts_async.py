@@ -0,0 +1,59 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from datetime import date, datetime
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.repository import contacts_async
+from app.schemas import ContactCreate, User
+from app.db.models import Base, User as UserModel
+
+
+class TestAsyncContactRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.user = User(id=1, username="testuser", email="testuser@example.com", created_at=datetime.now())
+
+        async def prepare():
+            async with self.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with self.session_factory() as db:
+                db.add(UserModel(id=1, username="testuser", email="testuser@example.com", password="x"))
+                await db.commit()
+
+        asyncio.run(prepare())
+
+    def tearDown(self):
+        asyncio.run(self.engine.dispose())
+
+    def test_crud_round_trip(self):
+        async def scenario():
+            async with self.session_factory() as db:
+                body = ContactCreate(first_name="John", last_name="Doe", email="john.doe@example.com", phone_number="1234567890", birthday=date(1990, 1, 1))
+                created = await contacts_async.create_contact(db, body, self.user)
+                self.assertEqual(created.birthday_doy, 1)
+
+                body.first_name = "Jane"
+                updated = await contacts_async.update_contact(db, created.id, body, self.user)
+                self.assertEqual(updated.first_name, "Jane")
+
+                self.assertEqual([r.id for r in await contacts_async.get_contact_rows(db, self.user, limit=10)], [created.id])
+                self.assertEqual([r.first_name for r in await contacts_async.search_contact_rows(db, self.user, q="jane")], ["Jane"])
+                rows = await contacts_async.get_upcoming_birthday_rows(db, self.user, days=3, today=date(2023, 12, 30))
+                self.assertEqual([r.birthday for r in rows], [date(1990, 1, 1)])
+
+                deleted = await contacts_async.delete_contact(db, created.id, self.user)
+                self.assertEqual(deleted.id, created.id)
+                self.assertIsNone(await contacts_async.get_contact(db, created.id, self.user))
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,25 +14,22 @@ from app.core.auth import auth_service
 
 class TestUserRepository(unittest.TestCase):
     
-    @patch('app.repository.users.Gravatar')
+    @patch('libgravatar.Gravatar')
     def test_create_user(self, MockGravatar):
         # Mock necessary dependencies
         mock_db = MagicMock(spec=Session)
         
         # Create a UserCreate instance (which UserModel extends)
         mock_user_create = UserCreate(username='johndoe', email='johndoe@example.com', password='secure')
-        
-        # Mock Gravatar
-        mock_gravatar_instance = MockGravatar.return_value
-        mock_gravatar_instance.get_image.return_value = 'http://example.com/avatar.jpg'
 
         # Call the function
         created_user = users.create_user(mock_user_create, mock_db)
 
-        # Assertions
+        # Assertions: the Gravatar is resolved after signup, not while creating the user
         self.assertEqual(created_user.username, 'johndoe')
         self.assertEqual(created_user.email, 'johndoe@example.com')
-        self.assertEqual(created_user.avatar, 'http://example.com/avatar.jpg')
+        self.assertIsNone(created_user.avatar)
+        MockGravatar.assert_not_called()
         mock_db.add.assert_called_once()
         mock_db.commit.assert_called_once()
         mock_db.refresh.assert_called_once_with(created_user)
@@ -0,0 +1,202 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import unittest
+from datetime import date
+from unittest import mock
+import fakeredis
+from fakeredis.aioredis import FakeRedis as AsyncFakeRedis
+from redis import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from app.main import app
+from app.core.auth import auth_service
+from app.core.redis_client import set_async_redis, set_redis
+from app.core.response_cache import ResponseCache, etag_matches
+from app.db.database import get_db
+from app.db.models import Base, User as UserModel
+from app.repository import contacts as repository_contacts
+from app.schemas import ContactCreate, Principal
+
+
+def contact_body(n: int) -> dict:
+    return {"first_name": f"First{n}", "last_name": f"Last{n}", "email": f"contact{n}@example.com",
+            "phone_number": f"{n:010d}", "birthday": date(1990, 1, 1 + n).isoformat()}
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_generations_scope_the_keys(self):
+        cache = ResponseCache()
+        key, cached = cache.lookup(1, "contact:5")
+        self.assertIsNone(cached)
+        stored = cache.store(key, b'{"id":5}')
+        self.assertEqual(cache.lookup(1, "contact:5")[1], stored)
+        self.assertIsNone(cache.lookup(2, "contact:5")[1])
+        cache.invalidate(1)
+        self.assertIsNone(cache.lookup(1, "contact:5")[1])
+
+    def test_a_response_read_before_a_write_is_not_served_after_it(self):
+        cache = ResponseCache()
+        key, _ = cache.lookup(1, "page:0:10:")
+        cache.invalidate(1)
+        cache.store(key, b"[]")
+        self.assertIsNone(cache.lookup(1, "page:0:10:")[1])
+
+    def test_redis_backend(self):
+        client = fakeredis.FakeRedis(decode_responses=True)
+        set_redis(client)
+        self.addCleanup(set_redis, None)
+        cache, other_worker = ResponseCache(backend="redis"), ResponseCache(backend="redis")
+        key, _ = cache.lookup(1, "contact:5")
+        stored = cache.store(key, b'{"id":5}', {"X-Next-Cursor": "abc"})
+        self.assertEqual(other_worker.lookup(1, "contact:5")[1], stored)
+        other_worker.invalidate(1)
+        self.assertIsNone(cache.lookup(1, "contact:5")[1])
+        self.assertLessEqual(client.ttl("response:" + key), 60)
+
+    def test_redis_failure_bypasses_the_cache(self):
+        client = fakeredis.FakeRedis(decode_responses=True)
+        set_redis(client)
+        self.addCleanup(set_redis, None)
+        cache = ResponseCache(backend="redis", redis_retry=5.0)
+        down = RedisConnectionError("down")
+        with mock.patch.object(client, "get", side_effect=down), mock.patch.object(client, "set", side_effect=down):
+            self.assertEqual(cache.lookup(1, "contact:5"), (None, None))
+            cache.invalidate(1)
+        # Nothing is cached until Redis is retried
+        self.assertEqual(cache.lookup(1, "contact:5"), (None, None))
+        self.assertEqual(cache.store(None, b"[]").body, b"[]")
+        self.assertEqual(client.keys("response:*"), [])
+
+    def test_async_methods_share_the_redis_entries(self):
+        server = fakeredis.FakeServer()
+        set_redis(fakeredis.FakeRedis(server=server, decode_responses=True))
+        set_async_redis(AsyncFakeRedis(server=server, decode_responses=True))
+        self.addCleanup(set_redis, None)
+        self.addCleanup(set_async_redis, None)
+        cache = ResponseCache(backend="redis")
+
+        async def scenario():
+            key, _ = await cache.lookup_async(1, "contact:5")
+            stored = await cache.store_async(key, b'{"id":5}')
+            found = (await cache.lookup_async(1, "contact:5"))[1]
+            await cache.invalidate_async(1)
+            return stored, found, (await cache.lookup_async(1, "contact:5"))[1]
+
+        stored, found, invalidated = asyncio.run(scenario())
+        self.assertEqual(found, stored)
+        self.assertIsNone(invalidated)
+        self.assertIsNone(cache.lookup(1, "contact:5")[1])
+
+    def test_async_redis_failure_bypasses_the_cache(self):
+        client = AsyncFakeRedis(decode_responses=True)
+        set_async_redis(client)
+        self.addCleanup(set_async_redis, None)
+        cache = ResponseCache(backend="redis", redis_retry=5.0)
+        down = RedisConnectionError("down")
+
+        async def scenario():
+            with mock.patch.object(client, "get", side_effect=down), mock.patch.object(client, "set", side_effect=down):
+                result = await cache.lookup_async(1, "contact:5")
+                await cache.invalidate_async(1)
+            return result, await cache.lookup_async(1, "contact:5")
+
+        self.assertEqual(asyncio.run(scenario()), ((None, None), (None, None)))
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a", "b"', '"b"'))
+        self.assertTrue(etag_matches('W/"b"', '"b"'))
+        self.assertTrue(etag_matches('*', '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+
+
+class TestCachedContactRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            user = UserModel(username="cacheuser", email="cache@example.com", password="x")
+            db.add(user)
+            db.commit()
+            self.user = Principal.model_validate(user)
+            for n in range(3):
+                repository_contacts.create_contact(db, ContactCreate(**contact_body(n)), self.user)
+
+        def override_get_db():
+            with self.Session() as db:
+                yield db
+
+        self.cache = ResponseCache()
+        for module in ("app.routes.contacts", "app.routes.contacts_async", "app.repository.contacts"):
+            patcher = mock.patch(f"{module}.response_cache", self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.overrides = dict(app.dependency_overrides)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[auth_service.get_current_user] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(self.overrides)
+        self.engine.dispose()
+
+    def test_pages_are_cached_and_revalidated(self):
+        with mock.patch.object(repository_contacts, "get_contact_rows", wraps=repository_contacts.get_contact_rows) as query:
+            first = self.client.get("/api/contacts/", params={"limit": 2})
+            second = self.client.get("/api/contacts/", params={"limit": 2})
+            not_modified = self.client.get("/api/contacts/", params={"limit": 2}, headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(query.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([c["email"] for c in first.json()], ["contact0@example.com", "contact1@example.com"])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.headers["X-Next-Cursor"], first.headers["X-Next-Cursor"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(not_modified.headers["ETag"], first.headers["ETag"])
+
+    def test_writes_invalidate_pages_and_contacts(self):
+        page = self.client.get("/api/contacts/")
+        contact_id = page.json()[0]["id"]
+        contact = self.client.get(f"/api/contacts/{contact_id}")
+        self.assertEqual(contact.json()["email"], "contact0@example.com")
+
+        with self.Session() as db:
+            repository_contacts.update_contact(db, contact_id, ContactCreate(**{**contact_body(0), "first_name": "Renamed"}), self.user)
+        updated = self.client.get(f"/api/contacts/{contact_id}", headers={"If-None-Match": contact.headers["ETag"]})
+        self.assertEqual(updated.status_code, 200)
+        self.assertEqual(updated.json()["first_name"], "Renamed")
+
+        with self.Session() as db:
+            repository_contacts.create_contact(db, ContactCreate(**contact_body(3)), self.user)
+        self.assertEqual(len(self.client.get("/api/contacts/").json()), 4)
+
+        with self.Session() as db:
+            repository_contacts.delete_contact(db, contact_id, self.user)
+        self.assertEqual(self.client.get(f"/api/contacts/{contact_id}").status_code, 404)
+        self.assertEqual(len(self.client.get("/api/contacts/").json()), 3)
+
+
+    def test_writes_succeed_while_redis_is_down(self):
+        client = fakeredis.FakeRedis(decode_responses=True)
+        set_redis(client)
+        self.addCleanup(set_redis, None)
+        self.cache.backend = "redis"
+        down = RedisConnectionError("down")
+        with mock.patch.object(client, "get", side_effect=down), mock.patch.object(client, "set", side_effect=down):
+            created = self.client.post("/api/contacts/", json=contact_body(3))
+            self.assertEqual(created.status_code, 200)
+            self.assertEqual(len(self.client.get("/api/contacts/").json()), 4)
+
+if __name__ == '__main__':
+    unittest.main()
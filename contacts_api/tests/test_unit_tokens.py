@@ -0,0 +1,137 @@
+import sys
+import os
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import unittest
+from unittest import mock
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import JWTError, jwt
+from starlette.testclient import TestClient
+from app.main import app
+from app.core.tokens import TokenCodec
+
+
+def private_pem(key) -> str:
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption()).decode()
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.ec_pem = private_pem(ec.generate_private_key(ec.SECP256R1()))
+        self.ed_pem = private_pem(ed25519.Ed25519PrivateKey.generate())
+
+    def claims(self, ttl: float = 60) -> dict:
+        return {"sub": "user@example.com", "scope": "access_token", "exp": int(self.clock.now + ttl)}
+
+    def test_round_trip_with_every_algorithm(self):
+        codecs = [
+            TokenCodec("HS256", secret_key="secret", timer=self.clock),
+            TokenCodec("ES256", secret_key="secret", private_key=self.ec_pem, key_id="ec-1", timer=self.clock),
+            TokenCodec("EdDSA", secret_key="secret", private_key=self.ed_pem, key_id="ed-1", timer=self.clock),
+        ]
+        for codec in codecs:
+            with self.subTest(codec.algorithm):
+                token = codec.encode(self.claims())
+                self.assertEqual(jwt.get_unverified_header(token).get("kid"), codec.key_id)
+                self.assertEqual(codec.decode(token, cache=False)["sub"], "user@example.com")
+
+    def test_edge_service_verifies_with_the_published_keys_only(self):
+        for algorithm, pem in (("ES256", self.ec_pem), ("EdDSA", self.ed_pem)):
+            with self.subTest(algorithm):
+                issuer = TokenCodec(algorithm, secret_key="secret", private_key=pem, key_id="k1", timer=self.clock)
+                jwks = issuer.jwks()
+                self.assertEqual([key["kid"] for key in jwks["keys"]], ["k1"])
+                self.assertNotIn("d", jwks["keys"][0])
+                edge = TokenCodec(public_keys=jwks, timer=self.clock)
+                self.assertEqual(edge.decode(issuer.encode(self.claims()))["sub"], "user@example.com")
+                hs_token = TokenCodec("HS256", secret_key="secret").encode(self.claims())
+                with self.assertRaises(JWTError):
+                    edge.decode(hs_token)
+
+    def test_rejects_unknown_kid_and_mismatched_algorithm(self):
+        codec = TokenCodec("EdDSA", secret_key="secret", private_key=self.ed_pem, key_id="ed-1", timer=self.clock)
+        unknown = jwt.encode(self.claims(), "secret", algorithm="HS256", headers={"kid": "other"})
+        # An HMAC token signed with the public key under the key's own ID must not verify
+        public_x = codec.jwks()["keys"][0]["x"]
+        confused = jwt.encode(self.claims(), public_x, algorithm="HS256", headers={"kid": "ed-1"})
+        for token in (unknown, confused):
+            with self.assertRaises(JWTError):
+                codec.decode(token)
+
+    def test_rejects_forged_and_expired_eddsa_tokens(self):
+        codec = TokenCodec("EdDSA", private_key=self.ed_pem, key_id="ed-1", timer=self.clock)
+        other = TokenCodec("EdDSA", private_key=private_pem(ed25519.Ed25519PrivateKey.generate()), key_id="ed-1",
+                           timer=self.clock)
+        with self.assertRaises(JWTError):
+            codec.decode(other.encode(self.claims()))
+        with self.assertRaises(JWTError):
+            codec.decode(codec.encode(self.claims(ttl=-1)))
+
+    def test_secret_tokens_only_in_the_configured_algorithm(self):
+        hs384 = jwt.encode(self.claims(), "secret", algorithm="HS384")
+        with self.assertRaises(JWTError):
+            TokenCodec("HS256", secret_key="secret", timer=self.clock).decode(hs384)
+        hs256 = TokenCodec("HS256", secret_key="secret").encode(self.claims())
+        # After moving to an asymmetric algorithm the secret no longer signs tokens...
+        codec = TokenCodec("ES256", secret_key="secret", private_key=self.ec_pem, key_id="ec-1", timer=self.clock)
+        with self.assertRaises(JWTError):
+            codec.decode(hs256)
+        # ...unless the migration window is opened for its algorithm
+        legacy = TokenCodec("ES256", secret_key="secret", private_key=self.ec_pem, key_id="ec-1",
+                            legacy_algorithm="HS256", timer=self.clock)
+        self.assertEqual(legacy.decode(hs256)["sub"], "user@example.com")
+        with self.assertRaises(JWTError):
+            legacy.decode(hs384)
+
+    def test_rejects_eddsa_tokens_with_a_non_numeric_exp(self):
+        codec = TokenCodec("EdDSA", private_key=self.ed_pem, key_id="ed-1", timer=self.clock)
+        with self.assertRaises(JWTError):
+            codec.decode(codec.encode({**self.claims(), "exp": "tomorrow"}))
+
+    def test_cache_skips_verification_until_exp(self):
+        codec = TokenCodec("HS256", secret_key="secret", timer=self.clock)
+        token = codec.encode(self.claims(ttl=60))
+        with mock.patch.object(codec, "_verify", wraps=codec._verify) as verify:
+            codec.decode(token)
+            codec.decode(token)
+            self.assertEqual(verify.call_count, 1)
+            # The entry lives for exp - now seconds on the cache's own clock
+            started = codec.cache.timer()
+            codec.cache.timer = lambda: started + 61
+            codec.decode(token)
+            self.assertEqual(verify.call_count, 2)
+
+    def test_invalid_tokens_and_uncached_decodes_are_not_stored(self):
+        codec = TokenCodec("HS256", secret_key="secret", timer=self.clock)
+        with self.assertRaises(JWTError):
+            codec.decode("not-a-token")
+        codec.decode(codec.encode(self.claims()), cache=False)
+        self.assertEqual(len(codec.cache), 0)
+
+
+class TestJwksRoute(unittest.TestCase):
+
+    def test_hmac_deployment_publishes_no_keys(self):
+        with TestClient(app) as client:
+            response = client.get("/api/auth/jwks.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"keys": []})
+
+
+if __name__ == '__main__':
+    unittest.main()